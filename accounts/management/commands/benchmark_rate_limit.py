@@ -0,0 +1,51 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.ratelimit import SlidingWindowRateLimiter, get_store
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the rate limiter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Number of requests to count (default: 2000)',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=50,
+            help='Number of distinct client keys the requests are spread over (default: 50)',
+        )
+        parser.add_argument(
+            '--store',
+            choices=['database', 'cache'],
+            default=None,
+            help='Counter store to benchmark (default: RATE_LIMIT_STORE)',
+        )
+
+    def handle(self, *args, **options):
+        limiter = SlidingWindowRateLimiter(rules=[], store=get_store(options['store']))
+        timings = []
+
+        # Counters written by the benchmark are rolled back afterwards
+        with transaction.atomic():
+            for i in range(options['requests']):
+                key = f'benchmark:ip:10.0.0.{i % options["clients"]}'
+                start = time.perf_counter()
+                limiter.hit(key, max_requests=1000000, window=60)
+                timings.append(time.perf_counter() - start)
+            transaction.set_rollback(True)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f'Store: {type(limiter.store).__name__}, {options["requests"]} requests')
+        self.stdout.write(f'Mean: {statistics.mean(timings) * 1e6:.0f}µs')
+        self.stdout.write(f'Median: {statistics.median(timings) * 1e6:.0f}µs')
+        self.stdout.write(self.style.SUCCESS(f'p95: {p95 * 1e6:.0f}µs'))
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from accounts.middleware import SecurityHeadersMiddleware
+
+
+def reference_add_headers(response):
+    """The original per-response header construction, kept for comparison"""
+    csp = (
+        "default-src 'self'; "
+        "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "img-src 'self' data: blob:; "
+        "connect-src 'self'; "
+        "frame-ancestors 'none';"
+    )
+    response['Content-Security-Policy'] = csp
+    response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+    response['Permissions-Policy'] = (
+        'geolocation=(), microphone=(), camera=()'
+    )
+    return response
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of SecurityHeadersMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100000,
+            help='Number of requests per round (default: 100000)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of timed rounds (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        response = HttpResponse()
+        request = RequestFactory().get('/dashboard/')
+
+        def respond(request):
+            return response
+
+        middleware = SecurityHeadersMiddleware(respond)
+        if middleware(request)['Content-Security-Policy'] != reference_add_headers(HttpResponse())['Content-Security-Policy']:
+            raise CommandError('Compiled headers differ from the reference headers.')
+
+        def reference(request):
+            return reference_add_headers(respond(request))
+
+        baseline = self._time(respond, request, options)
+        reference_time = self._time(reference, request, options) - baseline
+        compiled_time = self._time(middleware, request, options) - baseline
+
+        self.stdout.write(f'{options["requests"]} requests per round, median of {options["rounds"]} rounds')
+        self.stdout.write(f'Per-request headers: {reference_time * 1e6:.2f}µs per request')
+        self.stdout.write(f'Compiled headers: {compiled_time * 1e6:.2f}µs per request')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {reference_time / compiled_time:.1f}x'))
+
+    def _time(self, handler, request, options):
+        timings = []
+        for _ in range(options['rounds']):
+            start = time.perf_counter()
+            for _ in range(options['requests']):
+                handler(request)
+            timings.append((time.perf_counter() - start) / options['requests'])
+        return statistics.median(timings)
@@ -1,61 +1,61 @@
 """
-Security middleware for rate limiting and security logging
+Security middleware for rate limiting and security logging, and user role resolution
 """
-from django.core.cache import cache
-from django.http import HttpResponseForbidden
-from django.utils import timezone
-from datetime import timedelta
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+from typing import Dict, Optional, Tuple
 import logging
+import re
+
+from .ratelimit import SlidingWindowRateLimiter
+from .roles import get_user_role
 
 logger = logging.getLogger('django.security')
 
 
+class RoleMiddleware:
+    """
+    Attach the user's role (profile and clinician profile) to request.role.
+
+    Loaded lazily with one joined query the first time it is used, so
+    requests that never check the role do not query for it. Must come after
+    AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: get_user_role(request.user))
+        return self.get_response(request)
+
+
 class RateLimitMiddleware:
     """
-    Simple rate limiting middleware
-    For production, consider using django-ratelimit or django-axes
+    Sliding-window rate limiting for the routes in settings.RATE_LIMITS.
+
+    Counters live in a store shared by all workers (the database by
+    default), so limits hold across gunicorn processes. Must come after
+    AuthenticationMiddleware so signed-in users can be limited per user.
     """
     def __init__(self, get_response):
         self.get_response = get_response
-        # Rate limits: (max_requests, time_window_seconds)
-        self.rate_limits = {
-            '/accounts/login/': (5, 300),  # 5 attempts per 5 minutes
-            '/clinicians/send-practitioner-code/': (10, 3600),  # 10 emails per hour
-        }
+        self.limiter = SlidingWindowRateLimiter()
 
     def __call__(self, request):
-        # Check rate limits for specific paths
-        path = request.path
-        for limit_path, (max_requests, window) in self.rate_limits.items():
-            if path.startswith(limit_path):
-                if self.is_rate_limited(request, limit_path, max_requests, window):
-                    logger.warning(
-                        f'Rate limit exceeded for {request.user} at {path}',
-                        extra={'request': request}
-                    )
-                    return HttpResponseForbidden(
-                        'Too many requests. Please try again later.'
-                    )
+        result = self.limiter.check(request, self.get_client_ip(request))
+        if result is not None and not result.allowed:
+            logger.warning(
+                f'Rate limit exceeded for {getattr(request, "user", "anonymous")} at {request.path}',
+                extra={'request': request}
+            )
+            response = HttpResponse('Too many requests. Please try again later.', status=429)
+            response['Retry-After'] = str(result.retry_after)
+            return response
         
         response = self.get_response(request)
         return response
 
-    def is_rate_limited(self, request, path, max_requests, window):
-        """Check if request exceeds rate limit"""
-        # Use IP address as identifier
-        ip_address = self.get_client_ip(request)
-        cache_key = f'rate_limit:{path}:{ip_address}'
-        
-        # Get current count
-        current_count = cache.get(cache_key, 0)
-        
-        if current_count >= max_requests:
-            return True
-        
-        # Increment count
-        cache.set(cache_key, current_count + 1, window)
-        return False
-
     def get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -66,36 +66,65 @@ class RateLimitMiddleware:
         return ip
 
 
+def compile_header_value(value) -> Optional[str]:
+    """Render a header value from settings; dicts are CSP directives"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return ' '.join(f'{directive} {sources};' for directive, sources in value.items())
+    return str(value)
+
+
+def _header_items(headers: Dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple((name, value) for name, value in headers.items() if value is not None)
+
+
+def compile_security_headers(headers: Dict, routes: Dict):
+    """
+    Compile header settings into immutable (name, value) tuples.
+
+    Returns the default headers, a regex matching the route prefixes (most
+    specific first) and the headers for each of its groups.
+    """
+    default = {name: compile_header_value(value) for name, value in headers.items()}
+    prefixes = sorted(routes, key=len, reverse=True)
+    route_headers = [_header_items(default)]  # group 0: no route matched
+    for prefix in prefixes:
+        overridden = dict(default)
+        overridden.update((name, compile_header_value(value)) for name, value in routes[prefix].items())
+        route_headers.append(_header_items(overridden))
+
+    route_pattern = None
+    if prefixes:
+        route_pattern = re.compile('|'.join(f'({re.escape(prefix)})' for prefix in prefixes))
+    return route_headers[0], route_pattern, tuple(route_headers)
+
+
 class SecurityHeadersMiddleware:
     """
     Add security headers to responses
+
+    Headers come from settings.SECURITY_HEADERS and SECURITY_HEADER_ROUTES and
+    are compiled once when the middleware is created, so each response only
+    matches its route against one regex and sets the prebuilt headers.
     """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.default_headers, self.route_pattern, self.route_headers = compile_security_headers(
+            getattr(settings, 'SECURITY_HEADERS', {}),
+            getattr(settings, 'SECURITY_HEADER_ROUTES', {}),
+        )
 
     def __call__(self, request):
         response = self.get_response(request)
         
-        # Content Security Policy (adjust based on your needs)
-        # This is a restrictive CSP - adjust as needed
-        csp = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "  # unsafe-inline/eval needed for Django admin
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "img-src 'self' data: blob:; "
-            "connect-src 'self'; "
-            "frame-ancestors 'none';"
-        )
-        response['Content-Security-Policy'] = csp
+        headers = self.default_headers
+        if self.route_pattern is not None:
+            match = self.route_pattern.match(request.path_info)
+            if match:
+                headers = self.route_headers[match.lastindex]
         
-        # Referrer Policy
-        response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        
-        # Permissions Policy (formerly Feature Policy)
-        response['Permissions-Policy'] = (
-            'geolocation=(), microphone=(), camera=()'
-        )
+        for name, value in headers:
+            response.headers[name] = value
         
         return response
-
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile_onboarding_completed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Route and client the requests are counted for', max_length=255)),
+                ('window_start', models.BigIntegerField(help_text='Start of the window (Unix time in seconds)')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.BigIntegerField(db_index=True, help_text='When the window no longer affects the sliding count (Unix time in seconds)')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('key', 'window_start'), name='unique_rate_limit_window')],
+            },
+        ),
+    ]
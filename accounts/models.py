@@ -32,3 +32,22 @@ def save_user_profile(sender, instance, **kwargs):
     """Save the profile when the user is saved"""
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+class RateLimitCounter(models.Model):
+    """Request count for one client and route in one fixed rate limit window"""
+    key = models.CharField(max_length=255, help_text="Route and client the requests are counted for")
+    window_start = models.BigIntegerField(help_text="Start of the window (Unix time in seconds)")
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.BigIntegerField(
+        db_index=True,
+        help_text="When the window no longer affects the sliding count (Unix time in seconds)"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window_start'], name='unique_rate_limit_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_start}: {self.count}"
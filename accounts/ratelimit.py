@@ -0,0 +1,193 @@
+"""
+Sliding-window rate limiting shared by all web workers.
+
+Counts are kept per client and route in fixed windows in a shared store, and
+the sliding-window estimate weights the previous window's count by how much
+of it still overlaps the last `window` seconds:
+
+    estimate = previous_count * (1 - elapsed / window) + current_count
+
+Increments are atomic in the store (a single UPDATE ... SET count = count + 1
+for the database store, cache.incr for the cache store), so concurrent
+requests in different gunicorn workers cannot race past the limit.
+
+Rules are configured per route prefix in settings.RATE_LIMITS, with an
+optional separate limit for signed-in users (counted per user rather than
+per IP address). The IP address comes from X-Forwarded-For, which the client
+controls, so it is hashed to keep every counter key a fixed length.
+"""
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import RateLimitCounter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule(NamedTuple):
+    """Limit for requests whose path starts with `path`"""
+    path: str
+    limit: Tuple[int, int]  # (max requests, window seconds) per IP address
+    user_limit: Optional[Tuple[int, int]] = None  # per signed-in user, if different
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of counting one request"""
+    allowed: bool
+    estimate: float
+    limit: int
+    retry_after: int
+
+
+class DatabaseRateLimitStore:
+    """
+    Window counters in the RateLimitCounter table.
+
+    Works on every deployment without extra services. Rows for windows that
+    can no longer affect a decision are deleted whenever a new window starts.
+    """
+
+    def increment(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        """Atomically count a request; returns (current window count, previous window count)"""
+        counters = RateLimitCounter.objects.filter(key=key)
+        updated = counters.filter(window_start=window_start).update(count=F('count') + 1)
+        if not updated:
+            self._start_window(key, window_start, window)
+
+        counts = dict(
+            counters
+            .filter(window_start__in=(window_start, window_start - window))
+            .values_list('window_start', 'count')
+        )
+        return counts.get(window_start, 1), counts.get(window_start - window, 0)
+
+    def _start_window(self, key: str, window_start: int, window: int):
+        try:
+            with transaction.atomic():
+                RateLimitCounter.objects.create(
+                    key=key,
+                    window_start=window_start,
+                    count=1,
+                    expires_at=window_start + 2 * window,
+                )
+        except IntegrityError:
+            # Another worker started the window first
+            RateLimitCounter.objects.filter(key=key, window_start=window_start).update(count=F('count') + 1)
+            return
+        # Windows that ended before this one began are no longer anyone's previous window
+        RateLimitCounter.objects.filter(expires_at__lte=window_start).delete()
+
+
+class CacheRateLimitStore:
+    """
+    Window counters in a Django cache.
+
+    Only shared and atomic when the cache backend is (e.g. Redis or
+    Memcached); the default per-process LocMemCache is neither.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.cache = caches[alias]
+
+    def increment(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        current_key = f'rate_limit:{key}:{window_start}'
+        previous_key = f'rate_limit:{key}:{window_start - window}'
+        # add() only sets a missing key, so the first request in a window cannot be lost
+        if self.cache.add(current_key, 1, 2 * window):
+            current = 1
+        else:
+            try:
+                current = self.cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                self.cache.set(current_key, 1, 2 * window)
+                current = 1
+        return current, self.cache.get(previous_key, 0)
+
+
+STORES = {
+    'database': DatabaseRateLimitStore,
+    'cache': CacheRateLimitStore,
+}
+
+
+def get_store(name: Optional[str] = None):
+    """Create the store named by RATE_LIMIT_STORE (default 'database')"""
+    name = name or getattr(settings, 'RATE_LIMIT_STORE', 'database')
+    try:
+        return STORES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown rate limit store: {name}")
+
+
+def parse_rules(config: Dict[str, Dict]) -> List[RateLimitRule]:
+    """Build rules from settings.RATE_LIMITS, most specific path first"""
+    rules = []
+    for path, options in config.items():
+        user_limit = options.get('user_limit')
+        rules.append(RateLimitRule(
+            path=path,
+            limit=tuple(options['limit']),
+            user_limit=tuple(user_limit) if user_limit else None,
+        ))
+    return sorted(rules, key=lambda rule: len(rule.path), reverse=True)
+
+
+class SlidingWindowRateLimiter:
+    """Applies rate limit rules to requests using a shared counter store"""
+
+    def __init__(self, rules: Optional[List[RateLimitRule]] = None, store=None, clock=time.time):
+        self.rules = rules if rules is not None else parse_rules(getattr(settings, 'RATE_LIMITS', {}))
+        self.store = store or get_store()
+        self.clock = clock
+
+    def match(self, path: str) -> Optional[RateLimitRule]:
+        """Most specific rule for a path, or None if it is not rate limited"""
+        for rule in self.rules:
+            if path.startswith(rule.path):
+                return rule
+        return None
+
+    def hit(self, key: str, max_requests: int, window: int) -> RateLimitResult:
+        """Count a request for key and decide whether it is within the limit"""
+        now = self.clock()
+        window_start = int(now // window) * window
+        current, previous = self.store.increment(key, window_start, window)
+
+        elapsed = now - window_start
+        estimate = previous * (1 - elapsed / window) + current
+        allowed = estimate <= max_requests
+
+        retry_after = 0
+        if not allowed:
+            # Wait until the previous window's weight has decayed enough, or the window rolls over
+            if previous and current <= max_requests:
+                retry_after = math.ceil(window * (1 - (max_requests - current) / previous) - elapsed)
+            else:
+                retry_after = math.ceil(window - elapsed)
+            retry_after = max(1, retry_after)
+
+        return RateLimitResult(allowed=allowed, estimate=estimate, limit=max_requests, retry_after=retry_after)
+
+    def check(self, request, client_ip: str) -> Optional[RateLimitResult]:
+        """Count a request against its route's rule; None if the route is not limited"""
+        rule = self.match(request.path)
+        if rule is None:
+            return None
+
+        user = getattr(request, 'user', None)
+        if rule.user_limit and user is not None and user.is_authenticated:
+            identity, (max_requests, window) = f'user:{user.pk}', rule.user_limit
+        else:
+            ip_hash = hashlib.sha256(str(client_ip).encode()).hexdigest()
+            identity, (max_requests, window) = f'ip:{ip_hash}', rule.limit
+
+        return self.hit(f'{rule.path}:{identity}', max_requests, window)
@@ -0,0 +1,69 @@
+"""
+Resolution of what kind of user is making a request.
+
+`hasattr(user, 'clinician_profile')` queries the database every time it is
+called for a user without a clinician profile, because Django does not cache
+a missing reverse one-to-one. The role is resolved once per user object with
+a single joined query, and the loaded profiles are cached on the user so
+`user.profile` and `user.clinician_profile` do not query again.
+"""
+from typing import NamedTuple, Optional
+
+from django.contrib.auth.models import User
+
+from clinicians.models import Clinician
+
+from .models import UserProfile
+
+# Attribute the resolved role is memoised under on the user object
+ROLE_ATTRIBUTE = '_cached_role'
+
+
+class UserRole(NamedTuple):
+    """Profiles of the current user; both are None for anonymous users"""
+    profile: Optional[UserProfile] = None
+    clinician: Optional[Clinician] = None
+
+    @property
+    def is_clinician(self) -> bool:
+        return self.clinician is not None
+
+
+ANONYMOUS_ROLE = UserRole()
+
+
+def _load_role(user) -> UserRole:
+    loaded = User.objects.select_related('profile', 'clinician_profile').get(pk=user.pk)
+    role = UserRole(
+        profile=getattr(loaded, 'profile', None),
+        clinician=getattr(loaded, 'clinician_profile', None),
+    )
+
+    # Cache the results (including a missing profile) on the caller's user object
+    User._meta.get_field('profile').set_cached_value(user, role.profile)
+    User._meta.get_field('clinician_profile').set_cached_value(user, role.clinician)
+    if role.profile is not None:
+        UserProfile._meta.get_field('user').set_cached_value(role.profile, user)
+    if role.clinician is not None:
+        Clinician._meta.get_field('user').set_cached_value(role.clinician, user)
+    return role
+
+
+def get_user_role(user) -> UserRole:
+    """Role of a user, loaded on first use and memoised on the user object"""
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ROLE
+
+    role = getattr(user, ROLE_ATTRIBUTE, None)
+    if role is None:
+        role = _load_role(user)
+        setattr(user, ROLE_ATTRIBUTE, role)
+    return role
+
+
+def get_role(request) -> UserRole:
+    """Role of the request's user, as attached by RoleMiddleware"""
+    role = getattr(request, 'role', None)
+    if role is None:
+        role = get_user_role(getattr(request, 'user', None))
+    return role
@@ -0,0 +1,46 @@
+"""
+Database-backed sessions that refresh their expiry only occasionally.
+
+With SESSION_SAVE_EVERY_REQUEST every page view (and every AJAX poll) wrote
+the session row just to push its expiry forward. This engine is Django's db
+engine, but marks a session as needing a save only once
+SESSION_REFRESH_FRACTION of SESSION_COOKIE_AGE has passed since it was last
+saved. Sessions still expire SESSION_COOKIE_AGE
+after they were last refreshed, so an idle session ends between
+(1 - SESSION_REFRESH_FRACTION) * SESSION_COOKIE_AGE and SESSION_COOKIE_AGE
+after the last request.
+
+Sessions are read from the database on every request, never from a cache
+local to one host, so a logout, flush or key rotation on one host takes
+effect on all of them at once.
+
+Use with SESSION_ENGINE = 'accounts.session_store' and
+SESSION_SAVE_EVERY_REQUEST = False.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+# Session key holding when the session was last written (Unix time in seconds)
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+
+class SessionStore(DBStore):
+    """db session store with throttled expiry refreshes"""
+
+    def refresh_interval(self) -> float:
+        """Seconds after a save before a request refreshes the session's expiry"""
+        return settings.SESSION_COOKIE_AGE * getattr(settings, 'SESSION_REFRESH_FRACTION', 0.01)
+
+    def load(self):
+        data = super().load()
+        refreshed_at = data.get(REFRESHED_AT_KEY)
+        if data and (refreshed_at is None or time.time() - refreshed_at >= self.refresh_interval()):
+            # Saved by SessionMiddleware at the end of this request
+            self.modified = True
+        return data
+
+    def save(self, must_create=False):
+        self._get_session(no_load=must_create)[REFRESHED_AT_KEY] = int(time.time())
+        super().save(must_create)
@@ -1,5 +1,7 @@
 from django import template
 
+from accounts.roles import get_user_role
+
 register = template.Library()
 
 
@@ -8,6 +10,5 @@ def is_clinician(user):
     """Check if a user is a clinician"""
     if not user or not user.is_authenticated:
         return False
-    # Use hasattr to safely check OneToOneField existence
-    return hasattr(user, 'clinician_profile')
-
+    # Resolved once per user and shared with request.role
+    return get_user_role(user).is_clinician
@@ -1,3 +1,253 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from clinicians.models import Clinician
+
+from .context_processors import user_context
+from .middleware import RateLimitMiddleware, RoleMiddleware, SecurityHeadersMiddleware
+from .models import RateLimitCounter
+from .ratelimit import DatabaseRateLimitStore, RateLimitRule, SlidingWindowRateLimiter
+from .roles import ANONYMOUS_ROLE, get_user_role
+from .session_store import REFRESHED_AT_KEY, SessionStore
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.rules = [
+            RateLimitRule(path='/accounts/login/', limit=(3, 60)),
+            RateLimitRule(path='/clinicians/send-practitioner-code/', limit=(5, 60), user_limit=(2, 60)),
+        ]
+
+    def make_limiter(self):
+        return SlidingWindowRateLimiter(rules=self.rules, store=DatabaseRateLimitStore(), clock=self.clock)
+
+    def test_limit_is_enforced(self):
+        limiter = self.make_limiter()
+        results = [limiter.hit('login:ip:1.2.3.4', 3, 60) for _ in range(4)]
+
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertGreater(results[-1].retry_after, 0)
+        self.assertEqual(RateLimitCounter.objects.get().count, 4)
+
+    def test_counts_are_shared_between_workers(self):
+        first_worker, second_worker = self.make_limiter(), self.make_limiter()
+
+        first_worker.hit('login:ip:1.2.3.4', 3, 60)
+        second_worker.hit('login:ip:1.2.3.4', 3, 60)
+        first_worker.hit('login:ip:1.2.3.4', 3, 60)
+
+        self.assertFalse(second_worker.hit('login:ip:1.2.3.4', 3, 60).allowed)
+
+    def test_previous_window_decays(self):
+        limiter = self.make_limiter()
+        self.clock.now = 1_000_020.0  # window starts at 1_000_020
+        for _ in range(3):
+            limiter.hit('login:ip:1.2.3.4', 3, 60)
+
+        # Just into the next window nearly all of the previous window still counts
+        self.clock.now = 1_000_085.0
+        self.assertFalse(limiter.hit('login:ip:1.2.3.4', 3, 60).allowed)
+
+        # Most of the way through it only a third of it does
+        self.clock.now = 1_000_120.0
+        self.assertTrue(limiter.hit('login:ip:1.2.3.4', 3, 60).allowed)
+
+    def test_expired_windows_are_removed(self):
+        limiter = self.make_limiter()
+        RateLimitCounter.objects.create(key='old', window_start=0, count=5, expires_at=120)
+
+        limiter.hit('login:ip:1.2.3.4', 3, 60)
+
+        self.assertFalse(RateLimitCounter.objects.filter(key='old').exists())
+
+    def test_most_specific_rule_matches(self):
+        limiter = self.make_limiter()
+        self.assertEqual(limiter.match('/accounts/login/?next=/').path, '/accounts/login/')
+        self.assertIsNone(limiter.match('/accounts/logout/'))
+
+    def test_signed_in_users_are_limited_per_user(self):
+        limiter = self.make_limiter()
+        factory = RequestFactory()
+        user = User.objects.create_user(username='clinician', password='pw')
+
+        for _ in range(2):
+            request = factory.post('/clinicians/send-practitioner-code/')
+            request.user = user
+            self.assertTrue(limiter.check(request, '1.2.3.4').allowed)
+
+        # Same user from another address is still limited
+        request = factory.post('/clinicians/send-practitioner-code/')
+        request.user = user
+        self.assertFalse(limiter.check(request, '5.6.7.8').allowed)
+
+        self.assertTrue(RateLimitCounter.objects.filter(key__endswith=f':user:{user.pk}').exists())
+
+
+@override_settings(RATE_LIMITS={'/accounts/login/': {'limit': (2, 300)}}, RATE_LIMIT_STORE='database')
+class RateLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+
+    def test_returns_429_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.middleware(self.factory.post('/accounts/login/')).status_code, 200)
+
+        response = self.middleware(self.factory.post('/accounts/login/'))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_oversized_forwarded_for_header_fits_the_counter_key(self):
+        forwarded_for = '1' * 5000 + ', 10.0.0.1'
+        for _ in range(2):
+            request = self.factory.post('/accounts/login/', HTTP_X_FORWARDED_FOR=forwarded_for)
+            self.assertEqual(self.middleware(request).status_code, 200)
+
+        request = self.factory.post('/accounts/login/', HTTP_X_FORWARDED_FOR=forwarded_for)
+        self.assertEqual(self.middleware(request).status_code, 429)
+        key_length = RateLimitCounter._meta.get_field('key').max_length
+        self.assertTrue(all(len(key) <= key_length for key in RateLimitCounter.objects.values_list('key', flat=True)))
+
+    def test_unlisted_routes_are_not_counted(self):
+        for _ in range(5):
+            self.assertEqual(self.middleware(self.factory.get('/patients/')).status_code, 200)
+        self.assertFalse(RateLimitCounter.objects.exists())
+
+
+class SecurityHeadersMiddlewareTests(TestCase):
+    def setUp(self):
+        self.middleware = SecurityHeadersMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+
+    def test_default_headers(self):
+        response = self.middleware(self.factory.get('/dashboard/'))
+
+        self.assertEqual(response['Referrer-Policy'], 'strict-origin-when-cross-origin')
+        self.assertEqual(response['Permissions-Policy'], 'geolocation=(), microphone=(), camera=()')
+        self.assertTrue(response['Content-Security-Policy'].startswith("default-src 'self'; "))
+        self.assertIn("'unsafe-eval'", response['Content-Security-Policy'])
+
+    def test_medical_record_pages_get_stricter_policy(self):
+        response = self.middleware(self.factory.get('/assessments/1/findings/'))
+
+        self.assertNotIn("'unsafe-eval'", response['Content-Security-Policy'])
+        self.assertIn("form-action 'self';", response['Content-Security-Policy'])
+        self.assertEqual(response['Referrer-Policy'], 'strict-origin-when-cross-origin')
+
+    def test_static_assets_have_no_csp(self):
+        response = self.middleware(self.factory.get('/static/css/style.css'))
+
+        self.assertFalse(response.has_header('Content-Security-Policy'))
+        self.assertEqual(response['Referrer-Policy'], 'strict-origin-when-cross-origin')
+
+    @override_settings(
+        SECURITY_HEADERS={'Referrer-Policy': 'same-origin'},
+        SECURITY_HEADER_ROUTES={'/a/': {'Referrer-Policy': 'no-referrer'}, '/a/b/': {'Referrer-Policy': None}},
+    )
+    def test_most_specific_route_wins(self):
+        middleware = SecurityHeadersMiddleware(lambda request: HttpResponse('ok'))
+
+        self.assertEqual(middleware(self.factory.get('/a/x/'))['Referrer-Policy'], 'no-referrer')
+        self.assertFalse(middleware(self.factory.get('/a/b/c/')).has_header('Referrer-Policy'))
+        self.assertEqual(middleware(self.factory.get('/b/'))['Referrer-Policy'], 'same-origin')
+
+
+class ThrottledSessionStoreTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='patient', password='pw')
+        self.client.login(username='patient', password='pw')
+        self.session_key = self.client.cookies['sessionid'].value
+
+    def expire_date(self):
+        return Session.objects.get(session_key=self.session_key).expire_date
+
+    def test_requests_within_refresh_interval_do_not_write(self):
+        expire_date = self.expire_date()
+
+        with mock.patch.object(SessionStore, 'save') as save:
+            for _ in range(5):
+                self.assertEqual(self.client.get('/security/').status_code, 200)
+
+        save.assert_not_called()
+        self.assertEqual(self.expire_date(), expire_date)
+
+    def test_expiry_is_refreshed_after_interval(self):
+        expire_date = self.expire_date()
+        refreshed_at = SessionStore(self.session_key).load()[REFRESHED_AT_KEY]
+        later = refreshed_at + SessionStore().refresh_interval() + 1
+
+        with mock.patch('accounts.session_store.time.time', return_value=later):
+            self.client.get('/security/')
+
+        self.assertGreater(self.expire_date(), expire_date)
+        self.assertEqual(SessionStore(self.session_key).load()[REFRESHED_AT_KEY], int(later))
+
+    def test_logout_ends_session_for_every_store(self):
+        # Another host's store reads the database, so it sees the logout at once
+        self.assertTrue(SessionStore(self.session_key).load())
+        self.client.logout()
+        self.assertEqual(SessionStore(self.session_key).load(), {})
+
+
+class RoleResolutionTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='pw')
+        clinician_user = User.objects.create_user(username='clinician', password='pw')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user, first_name='John', last_name='Doe', title='dr',
+            email='clinician@test.com', organisation='Test Hospital'
+        )
+        self.factory = RequestFactory()
+
+    def test_patient_role_is_resolved_with_one_query(self):
+        patient = User.objects.get(pk=self.patient.pk)
+
+        with self.assertNumQueries(1):
+            role = get_user_role(patient)
+            # The missing clinician profile is cached too
+            self.assertFalse(hasattr(patient, 'clinician_profile'))
+            self.assertEqual(patient.profile, role.profile)
+            self.assertIs(get_user_role(patient), role)
+
+        self.assertFalse(role.is_clinician)
+
+    def test_clinician_role(self):
+        user = User.objects.get(pk=self.clinician.user_id)
+
+        role = get_user_role(user)
+
+        self.assertTrue(role.is_clinician)
+        self.assertEqual(role.clinician, self.clinician)
+        self.assertIs(role.clinician.user, user)
+
+    def test_middleware_role_is_shared_by_context_processor(self):
+        request = self.factory.get('/')
+        request.user = User.objects.get(pk=self.patient.pk)
+        RoleMiddleware(lambda request: HttpResponse())(request)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(user_context(request)['is_clinician'])
+            self.assertFalse(request.role.is_clinician)
+
+    def test_anonymous_role(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        RoleMiddleware(lambda request: HttpResponse())(request)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_role(request.user), ANONYMOUS_ROLE)
+            self.assertFalse(user_context(request)['is_clinician'])
@@ -5,6 +5,7 @@ from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from django.urls import reverse_lazy
 from .models import UserProfile
+from .roles import get_user_role
 
 
 class CustomLoginView(LoginView):
@@ -19,7 +20,8 @@ class CustomLoginView(LoginView):
         # Ensure user has a profile
         user = self.request.user
         if user.is_authenticated:
-            if not hasattr(user, 'profile'):
+            role = get_user_role(user)
+            if role.profile is None:
                 try:
                     UserProfile.objects.get_or_create(user=user)
                 except Exception:
@@ -27,7 +29,7 @@ class CustomLoginView(LoginView):
                     pass
             
             # Determine redirect based on user type
-            if hasattr(user, 'clinician_profile'):
+            if role.is_clinician:
                 return redirect('clinicians:dashboard')
             else:
                 return redirect('health_records:dashboard')
@@ -0,0 +1,64 @@
+"""
+Checks of whether a clinician may see a patient's records.
+
+Each check reads the clinician's active grant for the patient with one
+indexed query, memoised on the request so a view and its decorator share
+it. Grants are deliberately not cached across requests: a cache local to
+one host would let a revoked clinician through on the other hosts until it
+expired.
+"""
+from functools import wraps
+from typing import Optional
+
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from accounts.roles import get_role
+
+from .models import PatientClinicianAccess
+
+
+def has_patient_access(request, patient_id: int) -> bool:
+    """Whether the requesting user is a clinician with active access to the patient"""
+    return get_access_grant(request, patient_id) is not None
+
+
+def get_access_grant(request, patient_id: int) -> Optional[PatientClinicianAccess]:
+    """The requesting clinician's active access record for a patient, or None"""
+    role = get_role(request)
+    if not role.is_clinician:
+        return None
+
+    grants = getattr(request, '_access_grants', None)
+    if grants is None:
+        grants = request._access_grants = {}
+    patient_id = int(patient_id)
+    if patient_id not in grants:
+        grants[patient_id] = PatientClinicianAccess.objects.filter(
+            patient_id=patient_id,
+            clinician=role.clinician,
+            is_active=True
+        ).first()
+    return grants[patient_id]
+
+
+def clinician_access_required(patient_kwarg: str = 'patient_id', redirect_to: str = 'clinicians:dashboard'):
+    """
+    Decorator for views of one patient's records that only clinicians with
+    active access to that patient may use.
+
+    The patient id is read from the view's `patient_kwarg` URL argument.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not get_role(request).is_clinician:
+                messages.error(request, 'You must be a registered clinician to access this page.')
+                return redirect('health_records:dashboard')
+            if not has_patient_access(request, kwargs[patient_kwarg]):
+                messages.error(request, 'You do not have access to this patient\'s records.')
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.security, deploy=True)
+def check_practitioner_code_key(app_configs, **kwargs):
+    """The practitioner code key must be set to a secret in production"""
+    key = getattr(settings, 'PRACTITIONER_CODE_KEY', '')
+    if not key or key.startswith('insecure-'):
+        return [Error(
+            'PRACTITIONER_CODE_KEY is not set, so practitioner codes are allocated from a '
+            'permutation anyone with the source code can reproduce.',
+            hint='Set the PRACTITIONER_CODE_KEY environment variable to a long random secret '
+                 'before the first clinician signs up, and never change it afterwards.',
+            id='clinicians.E001',
+        )]
+    return []
@@ -0,0 +1,133 @@
+"""
+Collision-free allocation of practitioner codes.
+
+Codes are not picked at random and checked for uniqueness. Instead each new
+clinician takes the next number from an auto-incrementing allocation table
+(one INSERT, which the database makes unique even under concurrent signups),
+and that number is mapped to a code by a keyed bijective permutation of the
+36^5 possible codes. Distinct numbers always give distinct codes, so there
+are no retries and no collisions, while consecutive clinicians still get
+unrelated-looking codes.
+
+The permutation is a 4-round Feistel network over 26-bit numbers with cycle
+walking to stay below 36^5. Codes issued before the allocator existed are
+recorded as reserved positions (see migration 0010) and skipped.
+
+settings.PRACTITIONER_CODE_KEY selects the permutation and must never change
+once codes have been issued.
+"""
+import hashlib
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List
+
+from django.conf import settings
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CODE_LENGTH = 5
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH  # 60,466,176 codes
+
+# The Feistel network permutes 26-bit numbers (2^26 >= 36^5) as two 13-bit halves
+HALF_BITS = 13
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+class CodeSpaceExhausted(Exception):
+    """Raised when every practitioner code has been allocated"""
+    pass
+
+
+def _round_value(key: bytes, round_number: int, half: int) -> int:
+    digest = hashlib.blake2b(
+        half.to_bytes(2, 'big') + bytes([round_number]), key=key, digest_size=4
+    ).digest()
+    return int.from_bytes(digest, 'big') & HALF_MASK
+
+
+def _feistel(value: int, key: bytes) -> int:
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in range(ROUNDS):
+        left, right = right, left ^ _round_value(key, round_number, right)
+    return (left << HALF_BITS) | right
+
+
+def _feistel_inverse(value: int, key: bytes) -> int:
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in reversed(range(ROUNDS)):
+        left, right = right ^ _round_value(key, round_number, left), left
+    return (left << HALF_BITS) | right
+
+
+def _key() -> bytes:
+    return settings.PRACTITIONER_CODE_KEY.encode()
+
+
+def permute(position: int) -> int:
+    """Map a position in [0, CODE_SPACE) to a code number in the same range, bijectively"""
+    key = _key()
+    value = _feistel(position, key)
+    # Cycle walking: the 26-bit network can land above CODE_SPACE; stepping
+    # again until it doesn't keeps the mapping a bijection on [0, CODE_SPACE)
+    while value >= CODE_SPACE:
+        value = _feistel(value, key)
+    return value
+
+
+def unpermute(number: int) -> int:
+    """Inverse of permute()"""
+    key = _key()
+    value = _feistel_inverse(number, key)
+    while value >= CODE_SPACE:
+        value = _feistel_inverse(value, key)
+    return value
+
+
+def number_to_code(number: int) -> str:
+    characters = []
+    for _ in range(CODE_LENGTH):
+        number, digit = divmod(number, len(ALPHABET))
+        characters.append(ALPHABET[digit])
+    return ''.join(reversed(characters))
+
+
+def code_to_number(code: str) -> int:
+    number = 0
+    for character in code:
+        number = number * len(ALPHABET) + ALPHABET.index(character)
+    return number
+
+
+def is_valid_code(code: str) -> bool:
+    return len(code) == CODE_LENGTH and all(character in ALPHABET for character in code)
+
+
+@lru_cache(maxsize=1)
+def reserved_positions() -> List[int]:
+    """Sorted positions taken by codes issued before the allocator (fixed after migration)"""
+    from .models import ReservedPractitionerCode
+    return list(ReservedPractitionerCode.objects.order_by('position').values_list('position', flat=True))
+
+
+def position_for_allocation(index: int, reserved: List[int]) -> int:
+    """The index-th (0-based) position in the permutation that is not reserved"""
+    # Each reserved position at or before the candidate pushes it one further along
+    position = index
+    skipped = 0
+    while True:
+        reserved_before = bisect_right(reserved, position)
+        if reserved_before == skipped:
+            return position
+        position += reserved_before - skipped
+        skipped = reserved_before
+
+
+def allocate_code() -> str:
+    """Allocate a new practitioner code with a single INSERT"""
+    from .models import PractitionerCodeAllocation
+
+    allocation = PractitionerCodeAllocation.objects.create()
+    position = position_for_allocation(allocation.pk - 1, reserved_positions())
+    if position >= CODE_SPACE:
+        raise CodeSpaceExhausted('All practitioner codes have been allocated.')
+    return number_to_code(permute(position))
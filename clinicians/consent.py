@@ -0,0 +1,104 @@
+"""
+Consent-aware projection of a patient's records for a clinician.
+
+A PatientClinicianAccess grant records which types of record the patient
+agreed to share as ConsentFlag bits in one integer. Views hand the projection unevaluated querysets keyed by
+record type; only the shared ones are evaluated, so a type without consent
+is never read from the database, and each shared type costs one query.
+"""
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from accounts.models import UserProfile
+from .models import ConsentFlag
+
+# Record type -> the consent bit that shares it
+RECORD_CONSENT = {
+    'profile': ConsentFlag.PERSONAL_INFO,
+    'emergency_contact': ConsentFlag.EMERGENCY_CONTACTS,
+    'medications': ConsentFlag.MEDICATIONS,
+    'conditions': ConsentFlag.CONDITIONS,
+    'allergies': ConsentFlag.ALLERGIES,
+    'assessments': ConsentFlag.SYMPTOMS,
+    'work_history': ConsentFlag.WORK_HISTORY,
+    'feedback': ConsentFlag.FEEDBACK,
+}
+
+RECORD_LABELS = {
+    'profile': 'Personal information',
+    'emergency_contact': 'Emergency contacts',
+    'medications': 'Medications',
+    'conditions': 'Conditions',
+    'allergies': 'Allergies',
+    'assessments': 'Symptoms and assessments',
+    'work_history': 'Work history',
+    'feedback': 'Healthcare feedback',
+}
+
+
+def shared_record_types(access) -> FrozenSet[str]:
+    """Record types the grant's patient has consented to share"""
+    consent = access.consent
+    return frozenset(record_type for record_type, flag in RECORD_CONSENT.items() if consent & flag)
+
+
+def withheld_labels(access, record_types) -> List[str]:
+    """Display names of the given record types the patient has not shared"""
+    shared = shared_record_types(access)
+    return [RECORD_LABELS[record_type] for record_type in record_types if record_type not in shared]
+
+
+def project_records(access, querysets: Dict[str, QuerySet],
+                    load: Optional[Callable] = None) -> Dict[str, Optional[list]]:
+    """
+    Load the record types the grant allows.
+
+    Args:
+        access: The clinician's PatientClinicianAccess for the patient
+        querysets: Unevaluated querysets keyed by record type (see RECORD_CONSENT)
+        load: Called as load(record_type, queryset) to read a shared type
+            (e.g. one page of it); all of its rows are read if None
+
+    Returns:
+        Dict with the same keys: the rows of each shared record type, and
+        None for each type the patient has not shared (which is not queried)
+    """
+    unknown = set(querysets) - set(RECORD_CONSENT)
+    if unknown:
+        raise ValueError(f"Unknown record types: {', '.join(sorted(unknown))}")
+
+    if load is None:
+        load = lambda record_type, queryset: list(queryset)
+
+    shared = shared_record_types(access)
+    return {
+        record_type: load(record_type, queryset) if record_type in shared else None
+        for record_type, queryset in querysets.items()
+    }
+
+
+def project_profile(access) -> Tuple[Optional[UserProfile], Optional[Dict[str, str]]]:
+    """
+    The patient's profile and emergency contact, as far as the grant allows.
+
+    Both come from the same row, which is read once if either is shared and
+    not at all otherwise. The emergency contact is returned on its own so it
+    can be shown without the rest of the profile.
+    """
+    consent = access.consent
+    if not consent & (ConsentFlag.PERSONAL_INFO | ConsentFlag.EMERGENCY_CONTACTS):
+        return None, None
+
+    profile = UserProfile.objects.filter(user_id=access.patient_id).first()
+    if profile is None:
+        return None, None
+
+    emergency_contact = None
+    if consent & ConsentFlag.EMERGENCY_CONTACTS:
+        emergency_contact = {
+            'name': profile.emergency_contact_name,
+            'relationship': profile.emergency_contact_relationship,
+            'phone': profile.emergency_contact_phone,
+        }
+    return (profile if consent & ConsentFlag.PERSONAL_INFO else None), emergency_contact
@@ -0,0 +1,137 @@
+"""
+Deactivation of access grants and invitations whose expires_at has passed.
+
+Expiry is applied by a sweep rather than checked on every request: expired
+PatientClinicianAccess and FamilyMemberAccess rows get is_active=False and
+expired ClinicianInvitations are closed, so access checks only ever look at
+is_active. Each model has a partial index on expires_at covering just its
+active rows with an expiry, so a sweep reads only the rows that can expire.
+
+Rows are deactivated in batches of primary keys, each one short UPDATE, so
+a large backlog never holds long locks.
+
+Sweeps run from `manage.py sweep_expired_access` (the Procfile's sweeper
+process, or a scheduler) and, only when ACCESS_EXPIRY_SWEEP_INTERVAL is set,
+on a background thread in each web process. Concurrent sweeps are safe: a
+row is only updated while still active.
+"""
+import logging
+import threading
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ClinicianInvitation, FamilyMemberAccess, PatientClinicianAccess
+
+logger = logging.getLogger(__name__)
+
+# Rows deactivated per UPDATE
+SWEEP_BATCH_SIZE = 500
+
+
+class SweepResult(NamedTuple):
+    """Rows deactivated by one sweep"""
+    accesses: int
+    family_accesses: int
+    invitations: int
+
+    @property
+    def total(self) -> int:
+        return self.accesses + self.family_accesses + self.invitations
+
+
+def _deactivate(expired, batch_size: int) -> int:
+    """Set is_active=False on the expired rows, a batch of primary keys at a time"""
+    model = expired.model
+    deactivated = 0
+    while True:
+        # Soonest expiry first, read from the model's partial expires_at index
+        batch = list(expired.order_by('expires_at').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        deactivated += model.objects.filter(pk__in=batch, is_active=True).update(is_active=False)
+        if len(batch) < batch_size:
+            break
+    return deactivated
+
+
+def sweep_expired(now=None, batch_size: int = SWEEP_BATCH_SIZE) -> SweepResult:
+    """
+    Deactivate every grant and invitation that expired at or before now.
+
+    Returns:
+        SweepResult with the number of rows deactivated per model
+    """
+    now = now or timezone.now()
+    result = SweepResult(
+        accesses=_deactivate(
+            PatientClinicianAccess.objects.filter(is_active=True, expires_at__isnull=False, expires_at__lte=now),
+            batch_size,
+        ),
+        family_accesses=_deactivate(
+            FamilyMemberAccess.objects.filter(is_active=True, expires_at__isnull=False, expires_at__lte=now),
+            batch_size,
+        ),
+        invitations=_deactivate(
+            ClinicianInvitation.objects.filter(
+                is_active=True, is_accepted=False, expires_at__isnull=False, expires_at__lte=now
+            ),
+            batch_size,
+        ),
+    )
+    if result.total:
+        logger.info(
+            f"Deactivated {result.accesses} clinician accesses, {result.family_accesses} family accesses "
+            f"and {result.invitations} invitations past their expiry"
+        )
+    return result
+
+
+class ExpirySweeper:
+    """Runs sweep_expired() every `interval` seconds on a daemon thread"""
+
+    def __init__(self, interval: float, batch_size: int = SWEEP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='access-expiry-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                sweep_expired(batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Expired access sweep failed")
+            finally:
+                # This thread's connection is not managed by the request cycle
+                close_old_connections()
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_expiry_sweeper() -> Optional[ExpirySweeper]:
+    """Start this process's sweeper if ACCESS_EXPIRY_SWEEP_INTERVAL is set (once per process)"""
+    global _sweeper
+    interval = getattr(settings, 'ACCESS_EXPIRY_SWEEP_INTERVAL', 0)
+    if not interval:
+        return None
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = ExpirySweeper(interval, getattr(settings, 'ACCESS_EXPIRY_SWEEP_BATCH_SIZE', SWEEP_BATCH_SIZE))
+            _sweeper.start()
+    return _sweeper
@@ -425,5 +425,87 @@ LUMBAR_MOVEMENTS = [
     ('rotation_left', 'Rotation Left'),
 ]
 
+# Movements recorded for each joint on the objective measures form
+JOINT_MOVEMENTS = {
+    'ankle': ANKLE_MOVEMENTS,
+    'knee': KNEE_MOVEMENTS,
+    'hip': HIP_MOVEMENTS,
+    'shoulder': SHOULDER_MOVEMENTS,
+    'elbow': ELBOW_MOVEMENTS,
+    'wrist': WRIST_MOVEMENTS,
+    'cervical': CERVICAL_MOVEMENTS,
+    'lumbar': LUMBAR_MOVEMENTS,
+}
+
+# Spinal regions have no left/right fields; their side is part of the movement
+SPINE_JOINTS = {'cervical', 'lumbar'}
+
+
+def _measurement_field_routes():
+    routes = {}
+    for joint, movements in JOINT_MOVEMENTS.items():
+        for movement, _ in movements:
+            for metric in ('rom', 'strength'):
+                if joint in SPINE_JOINTS:
+                    routes[f'{joint}_{movement}_{metric}'] = (joint, movement, '', metric)
+                else:
+                    for side in ('left', 'right'):
+                        routes[f'{joint}_{movement}_{metric}_{side}'] = (joint, movement, side, metric)
+    return routes
+
+
+# Objective measures form field name -> (joint, movement, side, metric),
+# e.g. 'knee_flexion_rom_left' -> ('knee', 'flexion', 'left', 'rom')
+MEASUREMENT_FIELD_ROUTES = _measurement_field_routes()
+
+
+
+def _normal_value(choices):
+    """The value of the choice labelled as normal, e.g. 135 for knee flexion"""
+    for value, label in choices:
+        if 'Normal' in label:
+            return float(value)
+    return None
+
+
+# Normal ROM in degrees for each (joint, movement), from the choices above
+NORMAL_ROM = {
+    ('ankle', 'dorsiflexion'): _normal_value(ANKLE_DORSIFLEXION_CHOICES),
+    ('ankle', 'plantarflexion'): _normal_value(ANKLE_PLANTARFLEXION_CHOICES),
+    ('ankle', 'inversion'): _normal_value(ANKLE_INVERSION_CHOICES),
+    ('ankle', 'eversion'): _normal_value(ANKLE_EVERSION_CHOICES),
+    ('knee', 'flexion'): _normal_value(KNEE_FLEXION_CHOICES),
+    ('knee', 'extension'): _normal_value(KNEE_EXTENSION_CHOICES),
+    ('hip', 'flexion'): _normal_value(HIP_FLEXION_CHOICES),
+    ('hip', 'extension'): _normal_value(HIP_EXTENSION_CHOICES),
+    ('hip', 'abduction'): _normal_value(HIP_ABDUCTION_CHOICES),
+    ('hip', 'adduction'): _normal_value(HIP_ADDUCTION_CHOICES),
+    ('hip', 'internal_rotation'): _normal_value(HIP_INTERNAL_ROTATION_CHOICES),
+    ('hip', 'external_rotation'): _normal_value(HIP_EXTERNAL_ROTATION_CHOICES),
+    ('shoulder', 'flexion'): _normal_value(SHOULDER_FLEXION_CHOICES),
+    ('shoulder', 'extension'): _normal_value(SHOULDER_EXTENSION_CHOICES),
+    ('shoulder', 'abduction'): _normal_value(SHOULDER_ABDUCTION_CHOICES),
+    ('shoulder', 'internal_rotation'): _normal_value(SHOULDER_INTERNAL_ROTATION_CHOICES),
+    ('shoulder', 'external_rotation'): _normal_value(SHOULDER_EXTERNAL_ROTATION_CHOICES),
+    ('elbow', 'flexion'): _normal_value(ELBOW_FLEXION_CHOICES),
+    ('elbow', 'extension'): _normal_value(ELBOW_EXTENSION_CHOICES),
+    ('wrist', 'flexion'): _normal_value(WRIST_FLEXION_CHOICES),
+    ('wrist', 'extension'): _normal_value(WRIST_EXTENSION_CHOICES),
+    ('wrist', 'radial_deviation'): _normal_value(WRIST_RADIAL_DEVIATION_CHOICES),
+    ('wrist', 'ulnar_deviation'): _normal_value(WRIST_ULNAR_DEVIATION_CHOICES),
+    ('cervical', 'flexion'): _normal_value(CERVICAL_FLEXION_CHOICES),
+    ('cervical', 'extension'): _normal_value(CERVICAL_EXTENSION_CHOICES),
+    ('lumbar', 'flexion'): _normal_value(LUMBAR_FLEXION_CHOICES),
+    ('lumbar', 'extension'): _normal_value(LUMBAR_EXTENSION_CHOICES),
+}
+for _side in ('left', 'right'):
+    NORMAL_ROM[('cervical', f'lateral_flexion_{_side}')] = _normal_value(CERVICAL_LATERAL_FLEXION_CHOICES)
+    NORMAL_ROM[('cervical', f'rotation_{_side}')] = _normal_value(CERVICAL_ROTATION_CHOICES)
+    NORMAL_ROM[('lumbar', f'lateral_flexion_{_side}')] = _normal_value(LUMBAR_LATERAL_FLEXION_CHOICES)
+    NORMAL_ROM[('lumbar', f'rotation_{_side}')] = _normal_value(LUMBAR_ROTATION_CHOICES)
+
+# Normal MRC strength grade (5/5)
+NORMAL_STRENGTH = 5.0
+
 # Joint-specific measurement fields (kept for backward compatibility)
 JOINT_MEASUREMENTS = {}
@@ -0,0 +1,108 @@
+import random
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from clinicians.joint_choices import MEASUREMENT_FIELD_ROUTES
+from clinicians.models import JointMeasurement
+from clinicians.views import aggregate_movement_fields
+
+
+def reference_movement_fields(request):
+    """The original per-joint regex scan of POST, kept to check the router gives identical results"""
+    measurements = []
+
+    def add(joint, movement, side, metric, value):
+        text_value = value.strip()[:200]
+        measurements.append(JointMeasurement(
+            joint=joint,
+            movement=movement,
+            side=side,
+            metric=metric,
+            text_value=text_value,
+            value=JointMeasurement.parse_value(metric, text_value),
+        ))
+
+    for joint_name in ['ankle', 'knee', 'hip', 'shoulder', 'elbow', 'wrist']:
+        pattern_rom = re.compile(rf'^{joint_name}_(.+)_rom_(left|right)$')
+        pattern_strength = re.compile(rf'^{joint_name}_(.+)_strength_(left|right)$')
+        for key, value in request.POST.items():
+            if not value or value.strip() == '':
+                continue
+            rom_match = pattern_rom.match(key)
+            if rom_match:
+                add(joint_name, rom_match.group(1), rom_match.group(2), 'rom', value)
+                continue
+            strength_match = pattern_strength.match(key)
+            if strength_match:
+                add(joint_name, strength_match.group(1), strength_match.group(2), 'strength', value)
+    for joint_name in ['cervical', 'lumbar']:
+        pattern_rom_spine = re.compile(rf'^{joint_name}_(.+)_rom$')
+        pattern_strength_spine = re.compile(rf'^{joint_name}_(.+)_strength$')
+        for key, value in request.POST.items():
+            if not value or value.strip() == '':
+                continue
+            rom_match = pattern_rom_spine.match(key)
+            if rom_match:
+                add(joint_name, rom_match.group(1), '', 'rom', value)
+                continue
+            strength_match = pattern_strength_spine.match(key)
+            if strength_match:
+                add(joint_name, strength_match.group(1), '', 'strength', value)
+    return measurements
+
+
+class Command(BaseCommand):
+    help = 'Benchmark reading objective measures fields from a posted form'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fields',
+            type=int,
+            default=1000,
+            help='Number of posted fields, padded with non-measurement fields (default: 1000)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=200,
+            help='Number of timed rounds per implementation (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        data = {'assessment_date': '2025-03-14', 'additional_notes': 'Reviewed today.'}
+        for field_name, (joint, movement, side, metric) in MEASUREMENT_FIELD_ROUTES.items():
+            data[field_name] = rng.choice(['5/5', '4/5', '']) if metric == 'strength' else rng.choice(['90', '120', ''])
+        padding = 0
+        while len(data) < options['fields']:
+            data[f'comment_{padding}'] = 'n/a'
+            padding += 1
+        request = RequestFactory().post('/', data)
+        request.POST  # Parse the body once, outside the timings
+
+        routed = self._rows(aggregate_movement_fields(request))
+        if routed != self._rows(reference_movement_fields(request)):
+            raise CommandError('Router results differ from the reference regex scan.')
+
+        reference_time = self._time(reference_movement_fields, request, options['rounds'])
+        routed_time = self._time(aggregate_movement_fields, request, options['rounds'])
+
+        self.stdout.write(f'{len(data)} posted fields, {len(routed)} measurements')
+        self.stdout.write(f'Regex scan per joint: median {reference_time * 1000:.2f}ms')
+        self.stdout.write(f'Field router: median {routed_time * 1000:.2f}ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {reference_time / routed_time:.1f}x'))
+
+    def _rows(self, measurements):
+        return sorted((m.joint, m.movement, m.side, m.metric, m.text_value, m.value) for m in measurements)
+
+    def _time(self, aggregate, request, rounds):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            aggregate(request)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinicians.expiry import SWEEP_BATCH_SIZE, sweep_expired
+
+
+class Command(BaseCommand):
+    help = 'Deactivate clinician and family access grants and invitations past their expiry date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help=f'Rows deactivated per UPDATE (default: {SWEEP_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Keep running, sweeping every this many seconds (default: sweep once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                result = sweep_expired(batch_size=options['batch_size'])
+                self.stdout.write(
+                    f'Deactivated {result.accesses} clinician access(es), {result.family_accesses} '
+                    f'family access(es) and {result.invitations} invitation(s).'
+                )
+                if options['interval'] is None:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping expiry sweeper.')
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0008_clinician_registration_body_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clinicianinvitation',
+            index=models.Index(fields=['patient', '-created_at'], name='invitation_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientclinicianaccess',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['clinician', '-granted_at'], name='access_active_clinician_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientclinicianaccess',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['patient'], name='access_active_patient_idx'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:20
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of the clinicians.code_allocator permutation as it was when
+# this migration was written, so later changes to that module never change
+# what this migration does
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CODE_LENGTH = 5
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+HALF_BITS = 13
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+def _round_value(key, round_number, half):
+    digest = hashlib.blake2b(
+        half.to_bytes(2, 'big') + bytes([round_number]), key=key, digest_size=4
+    ).digest()
+    return int.from_bytes(digest, 'big') & HALF_MASK
+
+
+def _feistel_inverse(value, key):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in reversed(range(ROUNDS)):
+        left, right = right ^ _round_value(key, round_number, left), left
+    return (left << HALF_BITS) | right
+
+
+def unpermute(number):
+    key = settings.PRACTITIONER_CODE_KEY.encode()
+    value = _feistel_inverse(number, key)
+    while value >= CODE_SPACE:
+        value = _feistel_inverse(value, key)
+    return value
+
+
+def code_to_number(code):
+    number = 0
+    for character in code:
+        number = number * len(ALPHABET) + ALPHABET.index(character)
+    return number
+
+
+def is_valid_code(code):
+    return len(code) == CODE_LENGTH and all(character in ALPHABET for character in code)
+
+
+def reserve_existing_codes(apps, schema_editor):
+    """Record the codes already issued so the allocator never hands them out again"""
+    Clinician = apps.get_model('clinicians', 'Clinician')
+    ReservedPractitionerCode = apps.get_model('clinicians', 'ReservedPractitionerCode')
+    
+    codes = Clinician.objects.exclude(practitioner_code__isnull=True).values_list('practitioner_code', flat=True)
+    ReservedPractitionerCode.objects.bulk_create(
+        ReservedPractitionerCode(position=unpermute(code_to_number(code)), code=code)
+        for code in codes
+        if is_valid_code(code)
+    )
+
+
+def release_existing_codes(apps, schema_editor):
+    ReservedPractitionerCode = apps.get_model('clinicians', 'ReservedPractitionerCode')
+    ReservedPractitionerCode.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PractitionerCodeAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allocated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReservedPractitionerCode',
+            fields=[
+                ('position', models.BigIntegerField(help_text='Position of the code in the permutation', primary_key=True, serialize=False)),
+                ('code', models.CharField(max_length=5, unique=True)),
+            ],
+        ),
+        migrations.RunPython(reserve_existing_codes, release_existing_codes),
+    ]
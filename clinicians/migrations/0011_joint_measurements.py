@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0010_practitioner_code_allocator'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JointMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joint', models.CharField(max_length=20)),
+                ('movement', models.CharField(blank=True, max_length=30)),
+                ('side', models.CharField(blank=True, choices=[('left', 'Left'), ('right', 'Right')], help_text='Blank for the spine', max_length=5)),
+                ('metric', models.CharField(choices=[('rom', 'Range of motion (degrees)'), ('strength', 'Strength (MRC grade)')], max_length=10)),
+                ('value', models.DecimalField(blank=True, decimal_places=1, help_text='Degrees for ROM, MRC grade (0-5) for strength; empty if the recorded value is not a number', max_digits=4, null=True)),
+                ('text_value', models.CharField(help_text="Value as recorded, e.g. '135' or '4/5'", max_length=200)),
+                ('objective_measures', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='clinicians.objectivemeasures')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='joint_measurements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['joint', 'movement', 'side', 'metric'],
+                'indexes': [models.Index(fields=['joint', 'movement', 'metric', 'value'], name='measurement_value_idx'), models.Index(fields=['patient', 'joint', 'movement', 'metric'], name='measurement_patient_idx')],
+                'constraints': [models.UniqueConstraint(fields=('objective_measures', 'joint', 'movement', 'side', 'metric'), name='unique_joint_measurement')],
+            },
+        ),
+    ]
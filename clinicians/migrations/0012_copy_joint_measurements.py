@@ -0,0 +1,113 @@
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+# Legacy JSON column -> (joint, side, metric). Lumbar strength was stored in core_power.
+LEGACY_FIELDS = {
+    f'{joint}_{kind}_{side}': (joint, side, metric)
+    for joint, kinds in [
+        ('shoulder', ('rom', 'power')), ('elbow', ('rom', 'power')), ('wrist', ('rom', 'power')),
+        ('hand', ('rom',)), ('grip', ('power',)),
+        ('hip', ('rom', 'power')), ('knee', ('rom', 'power')), ('ankle', ('rom', 'power')),
+        ('foot', ('rom',)),
+    ]
+    for kind, metric in [('rom', 'rom'), ('power', 'strength')]
+    if kind in kinds
+    for side in ('left', 'right')
+}
+LEGACY_FIELDS.update({
+    'cervical_rom': ('cervical', '', 'rom'),
+    'thoracic_rom': ('thoracic', '', 'rom'),
+    'lumbar_rom': ('lumbar', '', 'rom'),
+    'core_power': ('lumbar', '', 'strength'),
+})
+
+MRC_GRADE_PATTERN = re.compile(r'^([0-5])[+-]?\s*/\s*5$')
+
+
+def _numeric_value(metric, text):
+    text = text.strip().rstrip('°')
+    if metric == 'strength':
+        match = MRC_GRADE_PATTERN.match(text)
+        return Decimal(match.group(1)) if match else None
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or abs(value) >= 1000:
+        return None
+    return value.quantize(Decimal('0.1'))
+
+
+def _legacy_values(raw):
+    """{movement: value} from a legacy column; plain (non-JSON) values have no movement"""
+    try:
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    if not isinstance(values, dict):
+        return {'': raw}
+    return {str(movement): str(value) for movement, value in values.items() if str(value).strip()}
+
+
+def copy_measurements(apps, schema_editor):
+    """Turn the JSON strings in the legacy ObjectiveMeasures columns into JointMeasurement rows"""
+    ObjectiveMeasures = apps.get_model('clinicians', 'ObjectiveMeasures')
+    JointMeasurement = apps.get_model('clinicians', 'JointMeasurement')
+
+    batch = []
+    for measures in ObjectiveMeasures.objects.select_related('assessment').iterator(chunk_size=500):
+        for field_name, (joint, side, metric) in LEGACY_FIELDS.items():
+            raw = getattr(measures, field_name)
+            if not raw or not raw.strip():
+                continue
+            for movement, text in _legacy_values(raw).items():
+                text = text.strip()[:200]
+                batch.append(JointMeasurement(
+                    objective_measures_id=measures.pk,
+                    patient_id=measures.assessment.user_id,
+                    joint=joint,
+                    movement=movement[:30],
+                    side=side,
+                    metric=metric,
+                    text_value=text,
+                    value=_numeric_value(metric, text),
+                ))
+        if len(batch) >= 1000:
+            JointMeasurement.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    JointMeasurement.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_json_fields(apps, schema_editor):
+    """Write the measurements back into the legacy columns as JSON strings"""
+    ObjectiveMeasures = apps.get_model('clinicians', 'ObjectiveMeasures')
+    JointMeasurement = apps.get_model('clinicians', 'JointMeasurement')
+    columns = {key: field_name for field_name, key in LEGACY_FIELDS.items()}
+
+    grouped = {}
+    for measurement in JointMeasurement.objects.order_by('objective_measures_id', 'pk').iterator(chunk_size=2000):
+        field_name = columns.get((measurement.joint, measurement.side, measurement.metric))
+        if field_name is None:
+            continue  # e.g. cervical strength, which had no column
+        values = grouped.setdefault(measurement.objective_measures_id, {}).setdefault(field_name, {})
+        values[measurement.movement] = measurement.text_value
+
+    for measures_id, fields in grouped.items():
+        ObjectiveMeasures.objects.filter(pk=measures_id).update(**{
+            field_name: values[''] if list(values) == [''] else json.dumps(values)
+            for field_name, values in fields.items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0011_joint_measurements'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_measurements, restore_json_fields),
+    ]
@@ -0,0 +1,149 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0012_copy_joint_measurements'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='ankle_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='ankle_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='ankle_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='ankle_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='cervical_rom',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='core_power',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='elbow_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='elbow_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='elbow_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='elbow_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='foot_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='foot_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='grip_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='grip_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hand_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hand_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hip_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hip_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hip_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='hip_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='knee_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='knee_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='knee_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='knee_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='lumbar_rom',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='shoulder_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='shoulder_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='shoulder_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='shoulder_rom_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='thoracic_rom',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='wrist_power_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='wrist_power_right',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='wrist_rom_left',
+        ),
+        migrations.RemoveField(
+            model_name='objectivemeasures',
+            name='wrist_rom_right',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0013_remove_objectivemeasures_json_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientclinicianaccess',
+            name='consent',
+            field=models.PositiveSmallIntegerField(default=255, help_text='ConsentFlag bits for the record types the patient shares'),
+        ),
+        migrations.RemoveIndex(
+            model_name='patientclinicianaccess',
+            name='access_active_clinician_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientclinicianaccess',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['clinician', '-granted_at', 'consent'], name='access_active_clinician_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import F
+
+# Legacy consent column -> its ConsentFlag bit
+CONSENT_BITS = {
+    'consent_medications': 1,
+    'consent_conditions': 2,
+    'consent_allergies': 4,
+    'consent_symptoms': 8,
+    'consent_personal_info': 16,
+    'consent_emergency_contacts': 32,
+    'consent_work_history': 64,
+    'consent_feedback': 128,
+}
+ALL_BITS = 255
+
+
+def copy_consent_flags(apps, schema_editor):
+    """Clear the bit of each record type a grant withheld; the new column starts with every bit set"""
+    PatientClinicianAccess = apps.get_model('clinicians', 'PatientClinicianAccess')
+    for field_name, bit in CONSENT_BITS.items():
+        PatientClinicianAccess.objects.filter(**{field_name: False}).update(consent=F('consent').bitand(ALL_BITS ^ bit))
+
+
+def restore_consent_fields(apps, schema_editor):
+    """Set the consent BooleanFields back from the bitmask"""
+    PatientClinicianAccess = apps.get_model('clinicians', 'PatientClinicianAccess')
+    for field_name, bit in CONSENT_BITS.items():
+        accesses = PatientClinicianAccess.objects.alias(consent_shared=F('consent').bitand(bit))
+        accesses.filter(consent_shared=0).update(**{field_name: False})
+        accesses.exclude(consent_shared=0).update(**{field_name: True})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0014_patientclinicianaccess_consent'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_consent_flags, restore_consent_fields),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0015_copy_consent_flags'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_allergies',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_conditions',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_emergency_contacts',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_feedback',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_medications',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_personal_info',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_symptoms',
+        ),
+        migrations.RemoveField(
+            model_name='patientclinicianaccess',
+            name='consent_work_history',
+        ),
+    ]
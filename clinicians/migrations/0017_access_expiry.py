@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0016_remove_patientclinicianaccess_consent_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicianinvitation',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='Cleared once the invitation has expired'),
+        ),
+        migrations.AddIndex(
+            model_name='clinicianinvitation',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('is_accepted', False), ('is_active', True)), fields=['expires_at'], name='invitation_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familymemberaccess',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('is_active', True)), fields=['expires_at'], name='family_access_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientclinicianaccess',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('is_active', True)), fields=['expires_at'], name='access_expiry_idx'),
+        ),
+    ]
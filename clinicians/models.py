@@ -1,10 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+import enum
+import re
 import uuid
-import random
-import string
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 
+from .code_allocator import allocate_code
+
+# MRC strength grades as recorded on the form, e.g. '4/5' or '4+/5'
+MRC_GRADE_PATTERN = re.compile(r'^([0-5])[+-]?\s*/\s*5$')
+
 
 class Clinician(models.Model):
     """Clinician profile and information"""
@@ -83,13 +90,8 @@ class Clinician(models.Model):
     
     @staticmethod
     def generate_unique_code():
-        """Generate a unique 5-character alphanumeric code"""
-        while True:
-            # Generate a random 5-character code (uppercase letters and digits)
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-            # Check if code already exists
-            if not Clinician.objects.filter(practitioner_code=code).exists():
-                return code
+        """Allocate a unique 5-character alphanumeric code (see code_allocator)"""
+        return allocate_code()
     
     def save(self, *args, **kwargs):
         # Generate code only if it doesn't exist (new clinician)
@@ -98,6 +100,53 @@ class Clinician(models.Model):
         super().save(*args, **kwargs)
 
 
+class PractitionerCodeAllocation(models.Model):
+    """One row per allocated practitioner code; the id is the allocation sequence number"""
+    allocated_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Practitioner code allocation {self.pk}"
+
+
+class ReservedPractitionerCode(models.Model):
+    """A code issued before codes were allocated from the permutation, which the allocator skips"""
+    position = models.BigIntegerField(primary_key=True, help_text="Position of the code in the permutation")
+    code = models.CharField(max_length=5, unique=True)
+
+    def __str__(self):
+        return self.code
+
+
+class ConsentFlag(enum.IntFlag):
+    """Record types a patient can share with a clinician; bits of PatientClinicianAccess.consent"""
+    MEDICATIONS = 1
+    CONDITIONS = 2
+    ALLERGIES = 4
+    SYMPTOMS = 8
+    PERSONAL_INFO = 16
+    EMERGENCY_CONTACTS = 32
+    WORK_HISTORY = 64
+    FEEDBACK = 128
+    ALL = 255
+
+
+class PatientClinicianAccessQuerySet(models.QuerySet):
+    """Filters on the consent bitmask, evaluated with bitwise AND in SQL"""
+
+    def with_consent(self, flags):
+        """Grants whose patient shares every record type in flags"""
+        flags = int(flags)
+        return self.alias(consent_shared=F('consent').bitand(flags)).filter(consent_shared=flags)
+
+    def with_any_consent(self, flags):
+        """Grants whose patient shares at least one record type in flags"""
+        return self.alias(consent_shared=F('consent').bitand(int(flags))).exclude(consent_shared=0)
+
+    def without_consent(self, flags):
+        """Grants whose patient withholds every record type in flags"""
+        return self.alias(consent_shared=F('consent').bitand(int(flags))).filter(consent_shared=0)
+
+
 class PatientClinicianAccess(models.Model):
     """Manages which clinicians have access to which patients' records"""
     patient = models.ForeignKey(
@@ -133,25 +182,54 @@ class PatientClinicianAccess(models.Model):
     expires_at = models.DateTimeField(null=True, blank=True, help_text="Optional expiration date for temporary access")
     notes = models.TextField(blank=True)
     
-    # Consent fields for specific record types (all default to True - patient can uncheck)
-    consent_medications = models.BooleanField(default=True, help_text="Consent to share medications")
-    consent_conditions = models.BooleanField(default=True, help_text="Consent to share conditions")
-    consent_allergies = models.BooleanField(default=True, help_text="Consent to share allergies")
-    consent_symptoms = models.BooleanField(default=True, help_text="Consent to share symptoms/assessments")
-    consent_personal_info = models.BooleanField(default=True, help_text="Consent to share personal information")
-    consent_emergency_contacts = models.BooleanField(default=True, help_text="Consent to share emergency contacts")
-    consent_work_history = models.BooleanField(default=True, help_text="Consent to share work history")
-    consent_feedback = models.BooleanField(default=True, help_text="Consent to share healthcare feedback")
+    # Record types the patient consents to share, as ConsentFlag bits (all shared by default - patient can untick)
+    consent = models.PositiveSmallIntegerField(
+        default=int(ConsentFlag.ALL),
+        help_text="ConsentFlag bits for the record types the patient shares"
+    )
     consent_given_at = models.DateTimeField(null=True, blank=True, help_text="When consent was given")
 
+    objects = PatientClinicianAccessQuerySet.as_manager()
+
     class Meta:
         ordering = ['-granted_at']
-        unique_together = ['patient', 'clinician']
+        unique_together = ['patient', 'clinician']  # Also serves (patient, clinician, is_active) lookups
         verbose_name_plural = 'Patient Clinician Accesses'
+        indexes = [
+            # A clinician's active patients, newest first (dashboard, client list, access checks);
+            # consent is carried so bitmask filters are checked in the index before any row is read
+            models.Index(
+                fields=['clinician', '-granted_at', 'consent'],
+                condition=models.Q(is_active=True),
+                name='access_active_clinician_idx',
+            ),
+            # A patient's active clinicians
+            models.Index(
+                fields=['patient'],
+                condition=models.Q(is_active=True),
+                name='access_active_patient_idx',
+            ),
+            # Active grants with an expiry, soonest first (clinicians.expiry sweeps)
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True, expires_at__isnull=False),
+                name='access_expiry_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.username} -> {self.clinician.full_name} ({self.access_level})"
 
+    @property
+    def consent_flags(self) -> ConsentFlag:
+        """The shared record types as a ConsentFlag"""
+        return ConsentFlag(self.consent)
+
+    def has_consent(self, flags) -> bool:
+        """Whether the patient shares every record type in flags"""
+        flags = int(flags)
+        return self.consent & flags == flags
+
 
 class FamilyMemberAccess(models.Model):
     """Manages family member/caregiver access to patient records"""
@@ -196,6 +274,14 @@ class FamilyMemberAccess(models.Model):
         ordering = ['-granted_at']
         unique_together = ['patient', 'family_member']
         verbose_name_plural = 'Family Member Accesses'
+        indexes = [
+            # Active grants with an expiry, soonest first (clinicians.expiry sweeps)
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True, expires_at__isnull=False),
+                name='family_access_expiry_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.username} -> {self.family_member.username} ({self.relationship})"
@@ -286,6 +372,7 @@ class ClinicianInvitation(models.Model):
     last_name = models.CharField(max_length=100, blank=True)
     token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     is_accepted = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True, help_text="Cleared once the invitation has expired")
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True, help_text="Optional message from patient")
@@ -293,11 +380,23 @@ class ClinicianInvitation(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['patient', 'email']
+        indexes = [
+            # A patient's invitations newest first
+            models.Index(fields=['patient', '-created_at'], name='invitation_patient_date_idx'),
+            # Open invitations with an expiry, soonest first (clinicians.expiry sweeps)
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True, is_accepted=False, expires_at__isnull=False),
+                name='invitation_expiry_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Invitation for {self.email} from {self.patient.username}"
     
     def is_expired(self):
+        if not self.is_active:
+            return True
         if self.expires_at:
             return timezone.now() > self.expires_at
         return False
@@ -322,54 +421,6 @@ class ObjectiveMeasures(models.Model):
     )
     assessment_date = models.DateField(help_text="Date of the objective assessment")
     
-    # Joint ROM (Range of Motion) - All major joints
-    # Upper Extremity
-    shoulder_rom_left = models.CharField(max_length=200, blank=True, help_text="Left shoulder ROM")
-    shoulder_rom_right = models.CharField(max_length=200, blank=True, help_text="Right shoulder ROM")
-    elbow_rom_left = models.CharField(max_length=200, blank=True, help_text="Left elbow ROM")
-    elbow_rom_right = models.CharField(max_length=200, blank=True, help_text="Right elbow ROM")
-    wrist_rom_left = models.CharField(max_length=200, blank=True, help_text="Left wrist ROM")
-    wrist_rom_right = models.CharField(max_length=200, blank=True, help_text="Right wrist ROM")
-    hand_rom_left = models.CharField(max_length=200, blank=True, help_text="Left hand ROM")
-    hand_rom_right = models.CharField(max_length=200, blank=True, help_text="Right hand ROM")
-    
-    # Lower Extremity
-    hip_rom_left = models.CharField(max_length=200, blank=True, help_text="Left hip ROM")
-    hip_rom_right = models.CharField(max_length=200, blank=True, help_text="Right hip ROM")
-    knee_rom_left = models.CharField(max_length=200, blank=True, help_text="Left knee ROM")
-    knee_rom_right = models.CharField(max_length=200, blank=True, help_text="Right knee ROM")
-    ankle_rom_left = models.CharField(max_length=200, blank=True, help_text="Left ankle ROM")
-    ankle_rom_right = models.CharField(max_length=200, blank=True, help_text="Right ankle ROM")
-    foot_rom_left = models.CharField(max_length=200, blank=True, help_text="Left foot ROM")
-    foot_rom_right = models.CharField(max_length=200, blank=True, help_text="Right foot ROM")
-    
-    # Spine
-    cervical_rom = models.CharField(max_length=200, blank=True, help_text="Cervical spine ROM")
-    thoracic_rom = models.CharField(max_length=200, blank=True, help_text="Thoracic spine ROM")
-    lumbar_rom = models.CharField(max_length=200, blank=True, help_text="Lumbar spine ROM")
-    
-    # Power/Strength - All major muscle groups
-    # Upper Extremity Power
-    shoulder_power_left = models.CharField(max_length=200, blank=True, help_text="Left shoulder power")
-    shoulder_power_right = models.CharField(max_length=200, blank=True, help_text="Right shoulder power")
-    elbow_power_left = models.CharField(max_length=200, blank=True, help_text="Left elbow power")
-    elbow_power_right = models.CharField(max_length=200, blank=True, help_text="Right elbow power")
-    wrist_power_left = models.CharField(max_length=200, blank=True, help_text="Left wrist power")
-    wrist_power_right = models.CharField(max_length=200, blank=True, help_text="Right wrist power")
-    grip_power_left = models.CharField(max_length=200, blank=True, help_text="Left grip power")
-    grip_power_right = models.CharField(max_length=200, blank=True, help_text="Right grip power")
-    
-    # Lower Extremity Power
-    hip_power_left = models.CharField(max_length=200, blank=True, help_text="Left hip power")
-    hip_power_right = models.CharField(max_length=200, blank=True, help_text="Right hip power")
-    knee_power_left = models.CharField(max_length=200, blank=True, help_text="Left knee power")
-    knee_power_right = models.CharField(max_length=200, blank=True, help_text="Right knee power")
-    ankle_power_left = models.CharField(max_length=200, blank=True, help_text="Left ankle power")
-    ankle_power_right = models.CharField(max_length=200, blank=True, help_text="Right ankle power")
-    
-    # Core/Trunk
-    core_power = models.CharField(max_length=200, blank=True, help_text="Core/trunk power")
-    
     # Additional notes
     additional_notes = models.TextField(blank=True, help_text="Additional objective findings")
     
@@ -382,3 +433,97 @@ class ObjectiveMeasures(models.Model):
     
     def __str__(self):
         return f"Objective Measures for {self.assessment.user.username} - {self.assessment_date}"
+
+    def replace_measurements(self, measurements):
+        """Replace the recorded joint measurements with a new set in one bulk write"""
+        for measurement in measurements:
+            measurement.objective_measures = self
+            measurement.patient_id = self.assessment.user_id
+        with transaction.atomic():
+            self.measurements.all().delete()
+            JointMeasurement.objects.bulk_create(measurements)
+
+    def measurement_fields(self):
+        """Recorded values keyed by objective measures form field name, for re-filling the form"""
+        return {
+            measurement.form_field: measurement.text_value
+            for measurement in self.measurements.all()
+            if measurement.movement  # values migrated without a movement have no form field
+        }
+
+
+class JointMeasurement(models.Model):
+    """A single ROM or strength value recorded in an objective assessment"""
+    METRIC_CHOICES = [
+        ('rom', 'Range of motion (degrees)'),
+        ('strength', 'Strength (MRC grade)'),
+    ]
+    SIDE_CHOICES = [
+        ('left', 'Left'),
+        ('right', 'Right'),
+    ]
+
+    objective_measures = models.ForeignKey(
+        ObjectiveMeasures,
+        on_delete=models.CASCADE,
+        related_name='measurements',
+    )
+    # Copied from the assessment so per-patient queries need no joins
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='joint_measurements')
+    joint = models.CharField(max_length=20)
+    movement = models.CharField(max_length=30, blank=True)
+    side = models.CharField(max_length=5, choices=SIDE_CHOICES, blank=True, help_text="Blank for the spine")
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    value = models.DecimalField(
+        max_digits=4,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="Degrees for ROM, MRC grade (0-5) for strength; empty if the recorded value is not a number",
+    )
+    text_value = models.CharField(max_length=200, help_text="Value as recorded, e.g. '135' or '4/5'")
+
+    class Meta:
+        ordering = ['joint', 'movement', 'side', 'metric']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['objective_measures', 'joint', 'movement', 'side', 'metric'],
+                name='unique_joint_measurement',
+            ),
+        ]
+        indexes = [
+            # Threshold searches across patients ("knee flexion below 90°")
+            models.Index(fields=['joint', 'movement', 'metric', 'value'], name='measurement_value_idx'),
+            # One patient's history of a movement
+            models.Index(fields=['patient', 'joint', 'movement', 'metric'], name='measurement_patient_idx'),
+        ]
+
+    def __str__(self):
+        label = ' '.join(part for part in (self.side, self.joint, self.movement, self.metric) if part)
+        return f"{label}: {self.text_value}"
+
+    @property
+    def form_field(self):
+        """Name of the objective measures form field this value was entered in"""
+        kind = 'rom' if self.metric == 'rom' else 'strength'
+        if self.side:
+            return f'{self.joint}_{self.movement}_{kind}_{self.side}'
+        return f'{self.joint}_{self.movement}_{kind}'
+
+    @staticmethod
+    def parse_value(metric, text):
+        """Numeric value of a recorded measurement ('135' -> 135, '4/5' -> 4), or None"""
+        text = text.strip().rstrip('°')
+        if metric == 'strength':
+            match = MRC_GRADE_PATTERN.match(text)
+            return Decimal(match.group(1)) if match else None
+        try:
+            value = Decimal(text)
+            # Rounded first, so the range check sees the value that is stored
+            value = value.quantize(Decimal('0.1')) if value.is_finite() else None
+        except InvalidOperation:
+            return None
+        # Outside what the column holds, so not a plausible angle
+        if value is None or abs(value) >= 1000:
+            return None
+        return value
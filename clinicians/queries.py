@@ -0,0 +1,147 @@
+"""
+Set-based query builders for clinician-facing pages.
+
+Each loader fetches everything a page needs in a fixed number of queries,
+regardless of how many patients the clinician has access to.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Exists, IntegerField, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from health_records.models import Assessment, Medication, Condition, Allergy
+from .models import JointMeasurement, PatientClinicianAccess
+
+
+def get_dashboard_data(clinician):
+    """
+    Load the practitioner dashboard in a constant number of queries.
+
+    Returns a list of dicts (one per active patient access) with the
+    patient, the access record, the patient's assessments (newest first,
+    with objective measures joined in) and the assessment count.
+    """
+    assessments = (
+        Assessment.objects
+        .select_related('objective_measures')
+        .order_by('-symptom_date', '-created_at')
+    )
+
+    patient_accesses = (
+        PatientClinicianAccess.objects
+        .filter(clinician=clinician, is_active=True)
+        .select_related('patient')
+        .annotate(assessment_count=Count('patient__assessments'))
+        .prefetch_related(
+            Prefetch('patient__assessments', queryset=assessments, to_attr='dashboard_assessments')
+        )
+    )
+
+    patients_with_assessments = []
+    for access in patient_accesses:
+        patients_with_assessments.append({
+            'patient': access.patient,
+            'access': access,
+            'assessments': access.patient.dashboard_assessments,
+            'assessment_count': access.assessment_count,
+        })
+
+    return patients_with_assessments
+
+
+def _patient_count(model, **filters):
+    """Correlated subquery counting a patient's rows in ``model``."""
+    rows = (
+        model.objects
+        .filter(user=OuterRef('patient'), **filters)
+        .order_by()
+        .values('user')
+        .annotate(row_count=Count('pk'))
+        .values('row_count')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def get_clients_queryset(clinician, search_query=''):
+    """
+    Build the annotated client list for a clinician.
+
+    Per-patient statistics are computed in SQL as correlated subqueries,
+    so the queryset can be sorted, counted and sliced by the database
+    (e.g. by a Paginator) without loading every client into memory.
+    Subqueries are used instead of joins so the counts are not multiplied
+    by each other.
+    """
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    patient_assessments = Assessment.objects.filter(user=OuterRef('patient')).order_by()
+
+    patient_accesses = (
+        PatientClinicianAccess.objects
+        .filter(clinician=clinician, is_active=True)
+        .select_related('patient')
+    )
+
+    if search_query:
+        patient_accesses = patient_accesses.filter(
+            Q(patient__username__icontains=search_query) |
+            Q(patient__first_name__icontains=search_query) |
+            Q(patient__last_name__icontains=search_query) |
+            Q(patient__email__icontains=search_query)
+        )
+
+    return patient_accesses.annotate(
+        total_assessments=_patient_count(Assessment),
+        last_visit=Subquery(
+            patient_assessments.values('user').annotate(latest=Max('assessment_date')).values('latest')
+        ),
+        medications_count=_patient_count(Medication, is_active=True),
+        conditions_count=_patient_count(Condition, status='active'),
+        allergies_count=_patient_count(Allergy),
+        has_recent_activity=Exists(
+            patient_assessments.filter(
+                Q(assessment_date__gte=thirty_days_ago.date()) |
+                Q(created_at__gte=thirty_days_ago)
+            )
+        ),
+    ).order_by('-granted_at', '-pk')
+
+
+def get_clients_totals(clients_queryset):
+    """Aggregate caseload totals for an annotated client queryset in one query."""
+    # Aggregate aliases must not shadow the annotations they aggregate over
+    totals = clients_queryset.aggregate(
+        client_sum=Count('pk'),
+        assessment_sum=Coalesce(Sum('total_assessments'), Value(0)),
+        active_sum=Count('pk', filter=Q(has_recent_activity=True)),
+    )
+    return {
+        'total_clients': totals['client_sum'],
+        'total_assessments': totals['assessment_sum'],
+        'active_clients_count': totals['active_sum'],
+    }
+
+
+def get_clients_with_measurement_below(clinician, joint, movement, threshold, metric='rom'):
+    """
+    A clinician's clients whose latest recorded value for a movement is below a threshold.
+
+    E.g. ``get_clients_with_measurement_below(clinician, 'knee', 'flexion', 90)``
+    for clients with knee flexion below 90°. The latest value is the lower side
+    from the most recent assessment that recorded the movement; each client's
+    lookup is served by the (patient, joint, movement, metric) index.
+    """
+    latest = (
+        JointMeasurement.objects
+        .filter(patient=OuterRef('patient'), joint=joint, movement=movement, metric=metric, value__isnull=False)
+        .order_by('-objective_measures__assessment_date', '-objective_measures_id', 'value')
+        .values('value')[:1]
+    )
+    return (
+        PatientClinicianAccess.objects
+        .filter(clinician=clinician, is_active=True)
+        .select_related('patient')
+        .annotate(latest_value=Subquery(latest))
+        .filter(latest_value__lt=threshold)
+        .order_by('latest_value', 'patient__last_name', 'patient__first_name')
+    )
@@ -1,11 +1,31 @@
-from django.test import TestCase, Client
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.core.mail import outbox
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.urls import reverse
-from .models import Clinician, PatientClinicianAccess
-from health_records.models import Assessment
+from django.utils import timezone
+from accounts.roles import get_user_role
+from .access import get_access_grant, has_patient_access
+from .code_allocator import CODE_SPACE, permute, position_for_allocation, unpermute
+from .consent import project_records
+from .expiry import sweep_expired
+from .joint_choices import MEASUREMENT_FIELD_ROUTES
+from .models import (
+    Clinician, ClinicianInvitation, ConsentFlag, FamilyMemberAccess, JointMeasurement, ObjectiveMeasures,
+    PatientClinicianAccess,
+)
+from .queries import get_clients_queryset, get_clients_with_measurement_below, get_dashboard_data
+from .trends import get_measurement_trends
+from .views import aggregate_movement_fields
+from health_records.models import Assessment, Condition, ExtractedFindings, Medication
 
 
 class ClinicianModelTests(TestCase):
@@ -48,6 +68,67 @@ class ClinicianModelTests(TestCase):
         self.assertNotEqual(self.clinician.practitioner_code, clinician2.practitioner_code)
 
 
+class PractitionerCodeAllocatorTests(TestCase):
+    """Test the practitioner code permutation"""
+
+    def test_permutation_is_bijective(self):
+        positions = list(range(2000)) + [CODE_SPACE - 1]
+        numbers = [permute(position) for position in positions]
+
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertTrue(all(0 <= number < CODE_SPACE for number in numbers))
+        self.assertEqual([unpermute(number) for number in numbers], positions)
+
+    def test_reserved_positions_are_skipped(self):
+        positions = [position_for_allocation(index, [0, 2, 3, 10]) for index in range(8)]
+
+        self.assertEqual(positions, [1, 4, 5, 6, 7, 8, 9, 11])
+
+    def test_deploy_check_requires_a_secret_key(self):
+        from django.core.checks import run_checks
+
+        def check_ids():
+            return [error.id for error in run_checks(include_deployment_checks=True)]
+
+        self.assertIn('clinicians.E001', check_ids())
+        with override_settings(PRACTITIONER_CODE_KEY='a-real-secret'):
+            self.assertNotIn('clinicians.E001', check_ids())
+
+
+class PractitionerCodeConcurrencyTests(TransactionTestCase):
+    """Test that concurrent signups never receive the same code"""
+
+    WORKERS = 8
+    CLINICIANS_PER_WORKER = 25
+
+    def test_concurrent_signups_get_distinct_codes(self):
+        start = threading.Barrier(self.WORKERS)
+        errors = []
+
+        def sign_up(worker):
+            try:
+                start.wait()
+                for i in range(self.CLINICIANS_PER_WORKER):
+                    Clinician.objects.create(
+                        first_name='Worker', last_name=f'{worker}-{i}', title='dr', email='worker@test.com'
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sign_up, args=(worker,)) for worker in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        codes = list(Clinician.objects.values_list('practitioner_code', flat=True))
+        self.assertEqual(len(codes), self.WORKERS * self.CLINICIANS_PER_WORKER)
+        self.assertEqual(len(set(codes)), len(codes))
+
+
 class SendPractitionerCodeEmailTests(TestCase):
     """Test sending practitioner code by email"""
     
@@ -246,3 +327,770 @@ class ClientAccessTests(TestCase):
         response = self.client.get(reverse('clinicians:clients_list'))
         self.assertEqual(response.status_code, 200)
         self.assertNotContains(response, other_patient.username)
+
+
+class AccessGrantTests(TestCase):
+    """Test the clinician access checks"""
+
+    def setUp(self):
+        self.clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=self.clinician_user, first_name='John', last_name='Doe', title='dr', email='clinician@test.com'
+        )
+        self.patient_user = User.objects.create_user(username='testpatient', password='testpass123')
+        self.other_patient = User.objects.create_user(username='otherpatient', password='testpass123')
+        self.access = PatientClinicianAccess.objects.create(
+            patient=self.patient_user, clinician=self.clinician, is_active=True
+        )
+        self.factory = RequestFactory()
+
+    def make_request(self):
+        request = self.factory.get('/')
+        request.user = self.clinician_user
+        get_user_role(request.user)
+        return request
+
+    def test_one_query_per_patient_per_request(self):
+        request = self.make_request()
+        with self.assertNumQueries(2):
+            self.assertTrue(has_patient_access(request, self.patient_user.pk))
+            self.assertTrue(has_patient_access(request, self.patient_user.pk))
+            self.assertFalse(has_patient_access(request, self.other_patient.pk))
+
+        # Nothing is kept between requests
+        with self.assertNumQueries(1):
+            self.assertTrue(has_patient_access(self.make_request(), self.patient_user.pk))
+
+    def test_revoked_access_is_denied_on_next_request(self):
+        self.assertTrue(has_patient_access(self.make_request(), self.patient_user.pk))
+
+        # Revoked without signals, as by another host or a bulk update
+        PatientClinicianAccess.objects.filter(pk=self.access.pk).update(is_active=False)
+        self.assertFalse(has_patient_access(self.make_request(), self.patient_user.pk))
+
+        self.access.delete()
+        PatientClinicianAccess.objects.create(patient=self.other_patient, clinician=self.clinician)
+        self.assertTrue(has_patient_access(self.make_request(), self.other_patient.pk))
+
+    def test_access_grant_is_memoised_per_request(self):
+        request = self.make_request()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_access_grant(request, self.patient_user.pk), self.access)
+            self.assertEqual(get_access_grant(request, self.patient_user.pk), self.access)
+
+    def test_decorated_view_requires_access(self):
+        self.client.login(username='testclinician', password='testpass123')
+
+        response = self.client.get(reverse('clinicians:create_assessment', args=[self.other_patient.pk]))
+        self.assertRedirects(response, reverse('clinicians:dashboard'), fetch_redirect_response=False)
+
+        response = self.client.get(reverse('clinicians:create_assessment', args=[self.patient_user.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+class PractitionerDashboardQueryBudgetTests(TestCase):
+    """Test that the dashboard query count does not grow with caseload size"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testclinician',
+            email='clinician@test.com',
+            password='testpass123'
+        )
+        self.clinician = Clinician.objects.create(
+            user=self.user,
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def add_patients(self, count, start=0):
+        """Create patients with assessments (some with objective measures) linked to the clinician"""
+        from datetime import date
+        from .models import ObjectiveMeasures
+        for i in range(start, start + count):
+            patient = User.objects.create_user(username=f'patient{i}', password='testpass123')
+            PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, is_active=True)
+            for j in range(3):
+                assessment = Assessment.objects.create(
+                    user=patient,
+                    clinician=self.clinician,
+                    assessment_date=date(2025, 1, j + 1),
+                    current_symptoms='Knee pain',
+                )
+                if j == 0:
+                    ObjectiveMeasures.objects.create(
+                        assessment=assessment,
+                        clinician=self.clinician,
+                        assessment_date=assessment.assessment_date,
+                    )
+    
+    def count_dashboard_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('clinicians:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+    
+    def test_query_count_is_constant(self):
+        """Test that adding patients does not add queries"""
+        self.add_patients(2)
+        small_caseload_queries, _ = self.count_dashboard_queries()
+        self.add_patients(10, start=2)
+        large_caseload_queries, response = self.count_dashboard_queries()
+        self.assertEqual(small_caseload_queries, large_caseload_queries)
+        self.assertContains(response, '3 assessments')
+        self.assertContains(response, 'Edit Objective Measures')
+
+
+class ClientsListAggregationTests(TestCase):
+    """Test that client list statistics are computed in the database"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testclinician',
+            email='clinician@test.com',
+            password='testpass123'
+        )
+        self.clinician = Clinician.objects.create(
+            user=self.user,
+            first_name='John',
+            last_name='Doe',
+            title='dr',
+            email='clinician@test.com'
+        )
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def add_patient(self, username):
+        """Create a patient with a mix of records linked to the clinician"""
+        from datetime import date
+        from health_records.models import Medication, Condition, Allergy
+        patient = User.objects.create_user(username=username, password='testpass123')
+        PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, is_active=True)
+        Assessment.objects.create(user=patient, assessment_date=date(2020, 1, 1))
+        Assessment.objects.filter(
+            pk=Assessment.objects.create(user=patient, assessment_date=date(2020, 6, 1)).pk
+        ).update(created_at=date(2020, 6, 1))
+        Medication.objects.create(user=patient, name='Aspirin', is_active=True)
+        Medication.objects.create(user=patient, name='Ibuprofen', is_active=False)
+        Condition.objects.create(user=patient, name='Asthma', status='active')
+        Condition.objects.create(user=patient, name='Flu', status='resolved')
+        Allergy.objects.create(user=patient, allergen='Peanuts', reaction='Hives')
+        return patient
+    
+    def test_client_stats_are_annotated(self):
+        """Test per-client counts, last visit and recent activity flag"""
+        from datetime import date
+        from .queries import get_clients_queryset, get_clients_totals
+        patient = self.add_patient('patient1')
+        access = get_clients_queryset(self.clinician).get(patient=patient)
+        self.assertEqual(access.total_assessments, 2)
+        self.assertEqual(access.last_visit, date(2020, 6, 1))
+        self.assertEqual(access.medications_count, 1)
+        self.assertEqual(access.conditions_count, 1)
+        self.assertEqual(access.allergies_count, 1)
+        # The first assessment was created just now
+        self.assertTrue(access.has_recent_activity)
+        
+        totals = get_clients_totals(get_clients_queryset(self.clinician))
+        self.assertEqual(totals, {'total_clients': 1, 'total_assessments': 2, 'active_clients_count': 1})
+    
+    def test_query_count_is_bounded(self):
+        """Test that the clients list query count does not grow with caseload size"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .views import CLIENTS_PER_PAGE
+        
+        self.add_patient('patient0')
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('clinicians:clients_list'))
+        for i in range(1, CLIENTS_PER_PAGE + 5):
+            self.add_patient(f'patient{i}')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('clinicians:clients_list'))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(len(response.context['clients_data']), CLIENTS_PER_PAGE)
+        self.assertEqual(response.context['total_clients'], CLIENTS_PER_PAGE + 5)
+        
+        response = self.client.get(reverse('clinicians:clients_list'), {'page': 2})
+        self.assertEqual(len(response.context['clients_data']), 5)
+    
+    def test_clients_json_pages_by_name(self):
+        """Test that the Quick Photo clients endpoint returns pages in name order"""
+        from .views import CLIENTS_PER_PAGE
+        for i in reversed(range(CLIENTS_PER_PAGE + 5)):
+            patient = User.objects.create_user(username=f'patient{i}', first_name='Pat', last_name=f'{i:02d}')
+            PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, is_active=True)
+        
+        response = self.client.get(reverse('clinicians:clients_list_json'))
+        data = response.json()
+        self.assertEqual(len(data['clients']), CLIENTS_PER_PAGE)
+        self.assertEqual(data['clients'][0]['name'], 'Pat 00')
+        
+        response = self.client.get(reverse('clinicians:clients_list_json'), {'cursor': data['next_cursor']})
+        data = response.json()
+        self.assertEqual([client['name'] for client in data['clients']], [f'Pat {i}' for i in range(25, 30)])
+        self.assertIsNone(data['next_cursor'])
+        
+        response = self.client.get(reverse('clinicians:clients_list_json'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ObjectiveMeasuresDraftTests(TestCase):
+    """Test pre-filling objective measures from analysed notes"""
+    
+    def setUp(self):
+        """Set up a clinician, a patient and an assessment with analysed notes"""
+        from health_records.models import DocumentExtraction
+        self.client = Client()
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user,
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        patient = User.objects.create_user(username='testpatient', password='testpass123')
+        PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, is_active=True)
+        self.assessment = Assessment.objects.create(user=patient, clinician=self.clinician)
+        DocumentExtraction.objects.create(assessment=self.assessment, data={
+            'raw_text': 'Right knee flexion 115 degrees, left knee flexion 135 degrees\nQuadriceps strength 4/5 right',
+            'tables': [],
+            'findings': [],
+        })
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def test_form_is_prefilled_from_notes(self):
+        """Test that measurements read from the notes are offered as form values"""
+        response = self.client.get(reverse('clinicians:add_objective_measures', args=[self.assessment.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['draft_fields'], {
+            'knee_flexion_rom_right': '115',
+            'knee_flexion_rom_left': '135',
+            'knee_extension_strength_right': '4/5',
+        })
+        self.assertContains(response, 'notes-draft-fields')
+    
+    def test_draft_fields_save_through_the_form(self):
+        """Test that submitting the pre-filled values stores them on the objective measures"""
+        from health_records.measurement_extractor import draft_fields_for_assessment
+        data = {'assessment_date': '2025-03-14', **draft_fields_for_assessment(self.assessment)}
+        self.client.post(reverse('clinicians:add_objective_measures', args=[self.assessment.pk]), data)
+        self.assessment.refresh_from_db()
+        measures = self.assessment.objective_measures
+        self.assertEqual(measures.measurement_fields(), draft_fields_for_assessment(self.assessment))
+        knee = measures.measurements.get(joint='knee', movement='flexion', side='right', metric='rom')
+        self.assertEqual(knee.value, Decimal('115'))
+
+
+class JointMeasurementTests(TestCase):
+    """Test relational storage and querying of ROM and strength measurements"""
+    
+    def setUp(self):
+        """Set up a clinician with two clients and another clinician's patient"""
+        self.client = Client()
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user,
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        other_user = User.objects.create_user(username='otherclinician', password='testpass123')
+        self.other_clinician = Clinician.objects.create(
+            user=other_user,
+            first_name='Jane',
+            last_name='Roe',
+            title='physiotherapist',
+            email='other@test.com'
+        )
+        self.stiff = User.objects.create_user(username='stiff', password='testpass123')
+        self.recovered = User.objects.create_user(username='recovered', password='testpass123')
+        self.elsewhere = User.objects.create_user(username='elsewhere', password='testpass123')
+        for patient in (self.stiff, self.recovered):
+            PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, is_active=True)
+        PatientClinicianAccess.objects.create(patient=self.elsewhere, clinician=self.other_clinician, is_active=True)
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def record(self, patient, assessment_date, clinician=None, **fields):
+        """Save objective measures for a new assessment of patient from posted form fields"""
+        clinician = clinician or self.clinician
+        assessment = Assessment.objects.create(user=patient, clinician=clinician)
+        measures = ObjectiveMeasures.objects.create(
+            assessment=assessment, clinician=clinician, assessment_date=assessment_date
+        )
+        request = RequestFactory().post('/', fields)
+        measures.replace_measurements(aggregate_movement_fields(request))
+        return measures
+    
+    def test_posted_fields_are_stored_as_rows(self):
+        """Test that each filled-in movement becomes one measurement with a numeric value"""
+        assessment = Assessment.objects.create(user=self.stiff, clinician=self.clinician)
+        self.client.post(reverse('clinicians:add_objective_measures', args=[assessment.pk]), {
+            'assessment_date': '2025-03-01',
+            'knee_flexion_rom_left': '85',
+            'knee_flexion_strength_left': '4/5',
+            'lumbar_lateral_flexion_left_rom': '20',
+            'knee_extension_rom_right': '',
+        })
+        measures = ObjectiveMeasures.objects.get(assessment=assessment)
+        rows = {
+            (m.joint, m.movement, m.side, m.metric): (m.text_value, m.value)
+            for m in measures.measurements.all()
+        }
+        self.assertEqual(rows, {
+            ('knee', 'flexion', 'left', 'rom'): ('85', Decimal('85')),
+            ('knee', 'flexion', 'left', 'strength'): ('4/5', Decimal('4')),
+            ('lumbar', 'lateral_flexion_left', '', 'rom'): ('20', Decimal('20')),
+        })
+        self.assertTrue(all(m.patient_id == self.stiff.pk for m in measures.measurements.all()))
+    
+    def test_field_router_covers_the_form(self):
+        """Test that every select on the form is routed and other fields are ignored"""
+        import re
+        from django.template.loader import get_template
+        source = get_template('clinicians/objective_measures_form.html').template.source
+        self.assertEqual(set(re.findall(r'<select name="(\w+)"', source)), set(MEASUREMENT_FIELD_ROUTES))
+        self.assertEqual(MEASUREMENT_FIELD_ROUTES['lumbar_lateral_flexion_left_rom'], ('lumbar', 'lateral_flexion_left', '', 'rom'))
+        
+        request = RequestFactory().post('/', {'knee_flexion_rom_left': '85', 'knee_bogus_rom_left': '10', 'notes': 'x'})
+        self.assertEqual([m.form_field for m in aggregate_movement_fields(request)], ['knee_flexion_rom_left'])
+    
+    def test_edit_replaces_measurements_and_prefills_them(self):
+        """Test that editing shows the saved values and replaces them with the new submission"""
+        measures = self.record(self.stiff, '2025-03-01', knee_flexion_rom_left='85', knee_flexion_rom_right='90')
+        url = reverse('clinicians:edit_objective_measures', args=[measures.pk])
+        
+        response = self.client.get(url)
+        self.assertEqual(response.context['saved_fields'], {
+            'knee_flexion_rom_left': '85',
+            'knee_flexion_rom_right': '90',
+        })
+        self.assertContains(response, 'saved-measurement-fields')
+        
+        self.client.post(url, {'assessment_date': '2025-03-01', 'knee_flexion_rom_left': '110'})
+        self.assertEqual(measures.measurement_fields(), {'knee_flexion_rom_left': '110'})
+    
+    def test_parse_value(self):
+        """Test numeric values for degrees, MRC grades and free text"""
+        self.assertEqual(JointMeasurement.parse_value('rom', '-5'), Decimal('-5'))
+        self.assertEqual(JointMeasurement.parse_value('rom', '112.5°'), Decimal('112.5'))
+        self.assertEqual(JointMeasurement.parse_value('strength', '4+/5'), Decimal('4'))
+        self.assertIsNone(JointMeasurement.parse_value('rom', 'free_text'))
+        self.assertIsNone(JointMeasurement.parse_value('rom', 'NaN'))
+        # Range is checked after rounding to the column's one decimal place
+        self.assertEqual(JointMeasurement.parse_value('rom', '999.94'), Decimal('999.9'))
+        self.assertIsNone(JointMeasurement.parse_value('rom', '999.96'))
+        self.assertIsNone(JointMeasurement.parse_value('rom', '1e40'))
+        self.assertIsNone(JointMeasurement.parse_value('strength', '6/5'))
+    
+    def test_clients_below_threshold_use_latest_measurement(self):
+        """Test finding clients whose latest knee flexion is below 90 degrees"""
+        self.record(self.stiff, '2025-01-10', knee_flexion_rom_left='120')
+        self.record(self.stiff, '2025-03-01', knee_flexion_rom_left='95', knee_flexion_rom_right='75')
+        self.record(self.recovered, '2025-01-10', knee_flexion_rom_left='60')
+        self.record(self.recovered, '2025-03-01', knee_flexion_rom_left='130')
+        self.record(self.elsewhere, '2025-03-01', clinician=self.other_clinician, knee_flexion_rom_left='45')
+        
+        accesses = list(get_clients_with_measurement_below(self.clinician, 'knee', 'flexion', 90))
+        self.assertEqual([access.patient for access in accesses], [self.stiff])
+        self.assertEqual(accesses[0].latest_value, Decimal('75'))
+    
+    def test_threshold_query_uses_patient_index(self):
+        """Test that the per-client lookup is served by the measurement index"""
+        self.record(self.stiff, '2025-03-01', knee_flexion_rom_left='75')
+        plan = get_clients_with_measurement_below(self.clinician, 'knee', 'flexion', 90).explain()
+        self.assertIn('measurement_patient_idx', plan)
+
+
+class MeasurementTrendTests(TestCase):
+    """Test the longitudinal ROM and strength trend API"""
+    
+    def setUp(self):
+        """Set up a clinician with one client and a patient who is not a client"""
+        self.client = Client()
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user,
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        self.patient = User.objects.create_user(username='testpatient', password='testpass123')
+        self.stranger = User.objects.create_user(username='stranger', password='testpass123')
+        PatientClinicianAccess.objects.create(patient=self.patient, clinician=self.clinician, is_active=True)
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def record(self, assessment_date, **fields):
+        """Save objective measures for a new assessment from posted form fields"""
+        assessment = Assessment.objects.create(user=self.patient, clinician=self.clinician)
+        measures = ObjectiveMeasures.objects.create(
+            assessment=assessment, clinician=self.clinician, assessment_date=assessment_date
+        )
+        measures.replace_measurements(aggregate_movement_fields(RequestFactory().post('/', fields)))
+    
+    def test_series_deltas_normals_and_asymmetry(self):
+        """Test per-side series with changes, percentage of normal and asymmetry"""
+        self.record(date(2025, 1, 10), knee_flexion_rom_left='90', knee_flexion_rom_right='120')
+        self.record(date(2025, 2, 10), knee_flexion_rom_left='108', knee_flexion_rom_right='120',
+                    knee_flexion_strength_left='4/5')
+        self.record(date(2025, 3, 10), knee_flexion_rom_left='120')
+        
+        response = self.client.get(
+            reverse('clinicians:measurement_trends', args=[self.patient.pk]), {'joint': 'knee'}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        series = {(s['movement'], s['side'], s['metric']): s for s in data['series']}
+        
+        left = series[('flexion', 'left', 'rom')]
+        self.assertEqual(left['normal'], 135.0)
+        self.assertEqual(left['change'], 30.0)
+        self.assertEqual(
+            [(p['date'], p['value'], p['delta'], p['percent_of_normal']) for p in left['points']],
+            [('2025-01-10', 90.0, None, 66.7), ('2025-02-10', 108.0, 18.0, 80.0), ('2025-03-10', 120.0, 12.0, 88.9)],
+        )
+        self.assertEqual(series[('flexion', 'left', 'strength')]['points'][0]['percent_of_normal'], 80.0)
+        
+        asymmetry, = data['asymmetry']
+        self.assertEqual((asymmetry['movement'], asymmetry['metric']), ('flexion', 'rom'))
+        self.assertEqual([p['index'] for p in asymmetry['points']], [25.0, 10.0])
+    
+    def test_long_history_is_downsampled(self):
+        """Test that long series are cut to the requested size, keeping the ends and extremes"""
+        values = [100 + (i % 5) for i in range(200)]
+        values[77] = 40
+        for i, value in enumerate(values):
+            self.record(date(2020, 1, 1) + timedelta(days=7 * i), knee_flexion_rom_left=str(value))
+        
+        with self.assertNumQueries(1):
+            data = get_measurement_trends(self.patient.pk, max_points=20)
+        series, = data['series']
+        self.assertEqual(series['count'], 200)
+        self.assertEqual(len(series['points']), 20)
+        self.assertEqual(series['points'][0]['date'], '2020-01-01')
+        self.assertEqual(series['points'][-1]['value'], float(values[-1]))
+        self.assertIn(40.0, [p['value'] for p in series['points']])
+    
+    def test_access_and_parameters_are_checked(self):
+        """Test that only the patient's clinicians can read trends and bad parameters are rejected"""
+        response = self.client.get(reverse('clinicians:measurement_trends', args=[self.stranger.pk]))
+        self.assertEqual(response.status_code, 403)
+        
+        url = reverse('clinicians:measurement_trends', args=[self.patient.pk])
+        self.assertEqual(self.client.get(url, {'points': 'many'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'metric': 'speed'}).status_code, 400)
+        
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+    
+    def test_withheld_assessments_are_not_returned(self):
+        """Test that no measurements are returned when the patient withholds their assessments"""
+        self.record(date(2025, 1, 10), knee_flexion_rom_left='90')
+        access = PatientClinicianAccess.objects.get(patient=self.patient, clinician=self.clinician)
+        access.consent &= ~ConsentFlag.SYMPTOMS
+        access.save()
+        
+        response = self.client.get(reverse('clinicians:measurement_trends', args=[self.patient.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('series', response.json())
+
+
+class ConsentProjectionTests(TestCase):
+    """Test that clinician views load only the record types the patient consented to share"""
+    
+    def setUp(self):
+        """Set up a clinician and a client with one record of each type"""
+        self.client = Client()
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user,
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        self.patient = User.objects.create_user(username='testpatient', password='testpass123', email='p@test.com')
+        self.patient.profile.emergency_contact_name = 'Sam Smith'
+        self.patient.profile.phone_number = '07700900123'
+        self.patient.profile.save()
+        Medication.objects.create(user=self.patient, name='Ibuprofen', is_active=True)
+        Condition.objects.create(user=self.patient, name='Asthma', status='active')
+        Assessment.objects.create(user=self.patient, clinician=self.clinician)
+        self.access = PatientClinicianAccess.objects.create(
+            patient=self.patient, clinician=self.clinician, is_active=True
+        )
+        self.client.login(username='testclinician', password='testpass123')
+    
+    def withhold(self, flags):
+        self.access.consent &= ~flags
+        self.access.save()
+    
+    def test_client_detail_skips_withheld_record_types(self):
+        """Test that withheld record types are neither queried nor shown"""
+        self.withhold(ConsentFlag.MEDICATIONS | ConsentFlag.SYMPTOMS | ConsentFlag.PERSONAL_INFO | ConsentFlag.EMERGENCY_CONTACTS)
+        url = reverse('clinicians:client_detail', args=[self.patient.pk])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('health_records_medication', sql)
+        self.assertNotIn('health_records_assessment', sql)
+        self.assertNotIn('FROM "accounts_userprofile"', sql)
+        
+        self.assertIsNone(response.context['medications'])
+        self.assertEqual([c.name for c in response.context['conditions']], ['Asthma'])
+        self.assertIsNone(response.context['profile'])
+        self.assertContains(response, 'Not shared by the patient:')
+        self.assertContains(response, 'The patient has not shared their symptoms and assessments.')
+        self.assertNotContains(response, 'p@test.com')
+    
+    def test_client_detail_with_full_consent(self):
+        """Test that shared records load in one query per type"""
+        url = reverse('clinicians:client_detail', args=[self.patient.pk])
+        response = self.client.get(url)
+        self.assertEqual([m.name for m in response.context['medications']], ['Ibuprofen'])
+        self.assertEqual(response.context['total_assessments'], 1)
+        self.assertFalse(response.context['assessments'][0].has_extracted_findings)
+        self.assertEqual(response.context['withheld_records'], [])
+        self.assertContains(response, 'p@test.com')
+        
+        # Adding assessments does not add queries
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for _ in range(3):
+            Assessment.objects.create(user=self.patient, clinician=self.clinician)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before.captured_queries), len(after.captured_queries))
+    
+    def test_passport_shows_emergency_contact_without_personal_info(self):
+        """Test the clinician passport view with only emergency contacts shared from the profile"""
+        self.withhold(ConsentFlag.PERSONAL_INFO | ConsentFlag.CONDITIONS)
+        response = self.client.get(reverse('health_records:passport_patient', args=[self.patient.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['profile'])
+        self.assertEqual(response.context['emergency_contact']['name'], 'Sam Smith')
+        self.assertIsNone(response.context['conditions'])
+        self.assertContains(response, 'Sam Smith')
+        self.assertNotContains(response, '07700900123')
+        self.assertContains(response, 'The patient has not shared their medical conditions.')
+    
+    def test_unknown_record_type_is_rejected(self):
+        """Test that a record type without a consent flag cannot be projected"""
+        with self.assertRaises(ValueError):
+            project_records(self.access, {'billing': Medication.objects.none()})
+
+    def test_consent_filters_combine_flags(self):
+        """Test filtering grants on several record types at once with the bitmask"""
+        other_patient = User.objects.create_user(username='otherpatient', password='testpass123')
+        other_access = PatientClinicianAccess.objects.create(
+            patient=other_patient, clinician=self.clinician,
+            consent=ConsentFlag.SYMPTOMS | ConsentFlag.CONDITIONS,
+        )
+        accesses = PatientClinicianAccess.objects.filter(clinician=self.clinician)
+        wanted = ConsentFlag.SYMPTOMS | ConsentFlag.MEDICATIONS
+
+        self.assertEqual(list(accesses.with_consent(wanted)), [self.access])
+        self.assertEqual(set(accesses.with_any_consent(wanted)), {self.access, other_access})
+        self.assertEqual(list(accesses.without_consent(ConsentFlag.MEDICATIONS)), [other_access])
+        self.assertTrue(self.access.has_consent(wanted))
+        self.assertFalse(other_access.has_consent(wanted))
+        self.assertEqual(other_access.consent_flags, ConsentFlag.SYMPTOMS | ConsentFlag.CONDITIONS)
+
+
+    def test_client_detail_pages_assessments(self):
+        """Test that client detail shows one page of assessments but counts them all"""
+        from .views import CLIENT_RECORDS_PER_PAGE
+        Assessment.objects.bulk_create(
+            Assessment(user=self.patient, current_symptoms='Review') for _ in range(CLIENT_RECORDS_PER_PAGE)
+        )
+        url = reverse('clinicians:client_detail', args=[self.patient.pk])
+        response = self.client.get(url)
+        assessments = response.context['assessments']
+        self.assertEqual(len(assessments), CLIENT_RECORDS_PER_PAGE)
+        self.assertEqual(response.context['total_assessments'], CLIENT_RECORDS_PER_PAGE + 1)
+        self.assertEqual(response.context['recent_assessments_count'], CLIENT_RECORDS_PER_PAGE + 1)
+        
+        response = self.client.get(url, {'assessments': assessments.next_cursor})
+        self.assertEqual(len(response.context['assessments']), 1)
+        self.assertEqual([m.name for m in response.context['medications']], ['Ibuprofen'])
+
+
+class QueryIndexUsageTests(TestCase):
+    """Test that the dashboard, client list and findings queries use indexes on a seeded dataset"""
+
+    PATIENTS = 400
+    CLINICIANS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@test.com') for i in range(cls.PATIENTS + cls.CLINICIANS)
+        )
+        patients, clinician_users = users[:cls.PATIENTS], users[cls.PATIENTS:]
+        clinicians = Clinician.objects.bulk_create(
+            Clinician(
+                user=user, first_name='Clinician', last_name=str(i), title='physiotherapist',
+                email=f'clinician{i}@test.com', practitioner_code=f'C{i:04d}'
+            )
+            for i, user in enumerate(clinician_users)
+        )
+        cls.clinician = clinicians[0]
+
+        PatientClinicianAccess.objects.bulk_create(
+            PatientClinicianAccess(patient=patient, clinician=clinicians[(i + j) % cls.CLINICIANS], is_active=j != 2)
+            for i, patient in enumerate(patients)
+            for j in range(3)
+        )
+        today = date(2025, 1, 1)
+        assessments = Assessment.objects.bulk_create(
+            Assessment(user=patient, assessment_date=today - timedelta(days=i * 7 + j), symptom_date=today)
+            for i, patient in enumerate(patients)
+            for j in range(5)
+        )
+        Medication.objects.bulk_create(
+            Medication(user=patient, name=f'Medication {j}', is_active=j == 0)
+            for patient in patients
+            for j in range(4)
+        )
+        Condition.objects.bulk_create(
+            Condition(user=patient, name=f'Condition {j}', status='active' if j == 0 else 'resolved')
+            for patient in patients
+            for j in range(3)
+        )
+        cls.assessment = assessments[0]
+        ExtractedFindings.objects.bulk_create(
+            ExtractedFindings(
+                assessment=assessment, category=category, text='Knee flexion 110 degrees',
+                finding_type='measurement'
+            )
+            for assessment in assessments[:500]
+            for category in ('assessment', 'measurements', 'treatment', 'symptoms')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertUsesIndexes(self, plan, *index_names):
+        for index_name in index_names:
+            self.assertIn(index_name, plan)
+
+    def test_dashboard_query_uses_active_access_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(get_dashboard_data(self.clinician))
+
+        self.assertUsesIndexes(self.explain(queries[0]['sql']), 'access_active_clinician_idx')
+
+    def test_client_list_query_uses_indexes(self):
+        plan = get_clients_queryset(self.clinician).explain()
+
+        self.assertUsesIndexes(
+            plan,
+            'access_active_clinician_idx',
+            'assessment_user_date_idx',
+            'medication_active_user_idx',
+            'condition_user_status_idx',
+        )
+
+    def test_findings_query_uses_index(self):
+        findings = (
+            ExtractedFindings.objects
+            .filter(assessment=self.assessment)
+            .select_related('verified_by')
+            .order_by('category', 'extracted_at')
+        )
+
+        self.assertUsesIndexes(findings.explain(), 'finding_assessment_cat_idx')
+
+    def test_expiry_sweep_uses_partial_index(self):
+        expired = (
+            PatientClinicianAccess.objects
+            .filter(is_active=True, expires_at__isnull=False, expires_at__lte=timezone.now())
+            .order_by('expires_at')
+            .values_list('pk', flat=True)[:500]
+        )
+
+        self.assertUsesIndexes(expired.explain(), 'access_expiry_idx')
+
+
+class ExpirySweepTests(TestCase):
+    """Test deactivating grants and invitations past their expiry"""
+
+    def setUp(self):
+        """Set up a clinician and patients with expired, current and open-ended grants"""
+        self.now = timezone.now()
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            user=clinician_user, first_name='John', last_name='Doe', title='physiotherapist', email='c@test.com'
+        )
+        self.patients = [User.objects.create_user(username=f'patient{i}') for i in range(3)]
+        self.expired, self.current, self.open_ended = (
+            PatientClinicianAccess.objects.create(patient=patient, clinician=self.clinician, expires_at=expires_at)
+            for patient, expires_at in zip(self.patients, [self.now - timedelta(hours=1), self.now + timedelta(days=1), None])
+        )
+
+    def test_expired_grants_are_deactivated(self):
+        """Test that only grants past their expiry lose access"""
+        active = PatientClinicianAccess.objects.filter(clinician=self.clinician, is_active=True)
+        self.assertIn(self.expired, active)
+        family = FamilyMemberAccess.objects.create(
+            patient=self.patients[0], family_member=self.patients[1], relationship='parent',
+            expires_at=self.now - timedelta(minutes=1)
+        )
+
+        result = sweep_expired(now=self.now)
+
+        self.assertEqual((result.accesses, result.family_accesses, result.invitations), (1, 1, 0))
+        self.assertEqual(set(active.all()), {self.current, self.open_ended})
+        family.refresh_from_db()
+        self.assertFalse(family.is_active)
+        self.assertEqual(sweep_expired(now=self.now).total, 0)
+
+    def test_expired_invitations_are_closed(self):
+        """Test that expired invitations are closed and accepted ones are left alone"""
+        expired = ClinicianInvitation.objects.create(
+            patient=self.patients[0], email='a@test.com', expires_at=self.now - timedelta(days=1)
+        )
+        accepted = ClinicianInvitation.objects.create(
+            patient=self.patients[0], email='b@test.com', expires_at=self.now - timedelta(days=1), is_accepted=True
+        )
+
+        self.assertEqual(sweep_expired(now=self.now).invitations, 1)
+        expired.refresh_from_db()
+        accepted.refresh_from_db()
+        self.assertFalse(expired.is_active)
+        self.assertFalse(expired.is_valid())
+        self.assertTrue(accepted.is_active)
+
+    def test_sweep_deactivates_in_batches(self):
+        """Test that a backlog larger than the batch size is fully swept"""
+        for i in range(5):
+            patient = User.objects.create_user(username=f'lapsed{i}')
+            PatientClinicianAccess.objects.create(
+                patient=patient, clinician=self.clinician, expires_at=self.now - timedelta(days=i + 1)
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            result = sweep_expired(now=self.now, batch_size=2)
+
+        self.assertEqual(result.accesses, 6)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "clinicians_patientclinicianaccess"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(PatientClinicianAccess.objects.filter(is_active=True).count(), 2)
@@ -0,0 +1,180 @@
+"""
+Longitudinal ROM and strength series for a patient's trend charts.
+
+All of a patient's numeric joint measurements are read in one query and
+grouped into one series per joint, movement, side and metric. Each point
+carries the change since the previous point and the value as a percentage
+of normal (from joint_choices); bilateral movements also get a series of
+left/right asymmetry indices.
+
+Long histories are downsampled with largest-triangle-three-buckets, which
+keeps the first and last points and the peaks and troughs between them, so
+the chart payload stays small however many assessments a patient has.
+"""
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from .joint_choices import NORMAL_ROM, NORMAL_STRENGTH
+from .models import JointMeasurement
+
+# Points per series returned to charts by default, and the most a caller may ask for
+DEFAULT_MAX_POINTS = 60
+MAX_POINTS_LIMIT = 500
+
+
+def normal_value(joint: str, movement: str, metric: str) -> Optional[float]:
+    """Normal ROM in degrees or normal MRC grade for a movement, if known"""
+    if metric == 'strength':
+        return NORMAL_STRENGTH
+    return NORMAL_ROM.get((joint, movement))
+
+
+def asymmetry_index(left: float, right: float) -> float:
+    """Difference between the sides as a percentage of the larger one (0 is symmetrical)"""
+    larger = max(abs(left), abs(right))
+    if not larger:
+        return 0.0
+    return round(abs(left - right) / larger * 100, 1)
+
+
+def downsample(points: List[Dict], max_points: int, key: str = 'value') -> List[Dict]:
+    """
+    Reduce points to at most max_points with largest-triangle-three-buckets.
+
+    The points between the first and last are split into equal buckets and
+    the point from each bucket forming the largest triangle with the point
+    kept before it and the average of the next bucket is kept.
+    """
+    count = len(points)
+    if count <= max_points:
+        return points
+    if max_points < 3:
+        return [points[0], points[-1]][:max_points]
+
+    xs = [point['date'].toordinal() for point in points]
+    ys = [point[key] for point in points]
+    bucket_size = (count - 2) / (max_points - 2)
+
+    kept = [0]
+    for bucket in range(max_points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_size = next_end - end
+        average_x = sum(xs[end:next_end]) / next_size
+        average_y = sum(ys[end:next_end]) / next_size
+
+        previous = kept[-1]
+        x, y = xs[previous], ys[previous]
+        kept.append(max(
+            range(start, end),
+            key=lambda i: abs((x - average_x) * (ys[i] - y) - (x - xs[i]) * (average_y - y)),
+        ))
+    kept.append(count - 1)
+    return [points[i] for i in kept]
+
+
+def _series(joint, movement, side, metric, rows, max_points):
+    values = [float(value) for _, _, value in rows]
+    points = [{'date': assessment_date, 'value': value} for (_, assessment_date, _), value in zip(rows, values)]
+    points = downsample(points, max_points)
+
+    # Deltas and percentages over the whole (downsampled) series at once
+    kept_values = [point['value'] for point in points]
+    deltas = [None] + [round(current - previous, 1) for previous, current in zip(kept_values, kept_values[1:])]
+    normal = normal_value(joint, movement, metric)
+    percents = [round(value / normal * 100, 1) if normal else None for value in kept_values]
+
+    return {
+        'joint': joint,
+        'movement': movement,
+        'side': side or None,
+        'metric': metric,
+        'normal': normal,
+        'count': len(values),
+        'first': values[0],
+        'latest': values[-1],
+        'change': round(values[-1] - values[0], 1),
+        'points': [
+            {
+                'date': point['date'].isoformat(),
+                'value': point['value'],
+                'delta': delta,
+                'percent_of_normal': percent,
+            }
+            for point, delta, percent in zip(points, deltas, percents)
+        ],
+    }
+
+
+def _asymmetry(joint, movement, metric, sides, max_points):
+    right = {measures_id: (assessment_date, value) for measures_id, assessment_date, value in sides['right']}
+    points = [
+        {
+            'date': assessment_date,
+            'left': float(value),
+            'right': float(right[measures_id][1]),
+            'index': asymmetry_index(float(value), float(right[measures_id][1])),
+        }
+        for measures_id, assessment_date, value in sides['left']
+        if measures_id in right
+    ]
+    if not points:
+        return None
+
+    return {
+        'joint': joint,
+        'movement': movement,
+        'metric': metric,
+        'count': len(points),
+        'points': [
+            {**point, 'date': point['date'].isoformat()}
+            for point in downsample(points, max_points, key='index')
+        ],
+    }
+
+
+def get_measurement_trends(patient_id: int, joint: Optional[str] = None, movement: Optional[str] = None,
+                           metric: Optional[str] = None, max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+    """
+    Time series of a patient's ROM and strength measurements.
+
+    Args:
+        patient_id: The patient's user id
+        joint, movement, metric: Optional filters (e.g. 'knee', 'flexion', 'rom')
+        max_points: Most points returned per series
+
+    Returns:
+        Dict with 'series' (one per joint, movement, side and metric, oldest
+        point first) and 'asymmetry' (one per bilateral joint, movement and
+        metric recorded on both sides in the same assessment)
+    """
+    measurements = JointMeasurement.objects.filter(patient_id=patient_id, value__isnull=False)
+    if joint:
+        measurements = measurements.filter(joint=joint)
+    if movement:
+        measurements = measurements.filter(movement=movement)
+    if metric:
+        measurements = measurements.filter(metric=metric)
+
+    rows = measurements.order_by(
+        'joint', 'movement', 'metric', 'side', 'objective_measures__assessment_date', 'objective_measures_id',
+    ).values_list(
+        'joint', 'movement', 'metric', 'side', 'objective_measures_id', 'objective_measures__assessment_date', 'value',
+    )
+
+    series = []
+    asymmetry = []
+    for (joint, movement, metric), movement_rows in groupby(rows, key=lambda row: row[:3]):
+        sides = {
+            side: [row[4:] for row in side_rows]
+            for side, side_rows in groupby(movement_rows, key=lambda row: row[3])
+        }
+        for side, side_rows in sides.items():
+            series.append(_series(joint, movement, side, metric, side_rows, max_points))
+        if 'left' in sides and 'right' in sides:
+            movement_asymmetry = _asymmetry(joint, movement, metric, sides, max_points)
+            if movement_asymmetry:
+                asymmetry.append(movement_asymmetry)
+
+    return {'patient_id': patient_id, 'series': series, 'asymmetry': asymmetry}
@@ -4,126 +4,68 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from django.core.mail import send_mail
 from django.conf import settings
 from django.http import JsonResponse
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-import json
-from .models import Clinician, ClinicianInvitation, PatientClinicianAccess, ObjectiveMeasures
+from django.core.paginator import Paginator
+from django.urls import reverse
+from .models import Clinician, ClinicianInvitation, PatientClinicianAccess, ObjectiveMeasures, JointMeasurement
 from .forms import ClinicianForm, ClinicianInvitationForm, ObjectiveMeasuresForm
+from .queries import get_dashboard_data, get_clients_queryset, get_clients_totals
+from .access import clinician_access_required, get_access_grant, has_patient_access
+from .consent import project_profile, project_records, shared_record_types, withheld_labels
+from .joint_choices import MEASUREMENT_FIELD_ROUTES
+from .trends import DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT, get_measurement_trends
+from sharemycare.pagination import InvalidCursor, paginate, paginate_request
 from health_records.models import Assessment
 from health_records.forms import PractitionerAssessmentForm
+from accounts.roles import get_user_role
 
+# Number of clients shown per page on the clients list
+CLIENTS_PER_PAGE = 25
 
-def aggregate_movement_fields(request, objective_measures):
+# Record types shown on the client detail page
+CLIENT_DETAIL_RECORDS = ['profile', 'medications', 'conditions', 'allergies', 'assessments']
+
+# Rows per page of each record list on the client detail page
+CLIENT_RECORDS_PER_PAGE = 25
+
+
+def aggregate_movement_fields(request):
     """
-    Aggregate specific movement fields from POST data into generic model fields.
-    The template uses specific field names (e.g., ankle_dorsiflexion_rom_left) 
-    but the model has generic fields (e.g., ankle_rom_left).
-    Stores data as JSON strings in the model fields.
+    Collect the per-movement ROM and strength fields posted by the objective measures form.
+
+    The template uses one field per movement and side (e.g. ankle_dorsiflexion_rom_left,
+    lumbar_flexion_strength); each filled-in field becomes an unsaved JointMeasurement.
+    Field names are looked up in MEASUREMENT_FIELD_ROUTES, so POST is read once and
+    fields that are not measurements are skipped.
     """
-    import re
-    
-    # Define joints with left/right sides
-    bilateral_joints = {
-        'ankle': 'ankle',
-        'knee': 'knee',
-        'hip': 'hip',
-        'shoulder': 'shoulder',
-        'elbow': 'elbow',
-        'wrist': 'wrist',
-    }
-    
-    # Process bilateral joints (with left/right)
-    for joint_name, field_prefix in bilateral_joints.items():
-        rom_left_data = {}
-        rom_right_data = {}
-        power_left_data = {}
-        power_right_data = {}
-        
-        # Pattern to match: {joint}_{movement}_rom_{side} or {joint}_{movement}_strength_{side}
-        pattern_rom = re.compile(rf'^{joint_name}_(.+)_rom_(left|right)$')
-        pattern_strength = re.compile(rf'^{joint_name}_(.+)_strength_(left|right)$')
-        
-        # Process all POST fields for this joint
-        for key, value in request.POST.items():
-            if not value or value.strip() == '':
-                continue
-                
-            # Match ROM fields
-            rom_match = pattern_rom.match(key)
-            if rom_match:
-                movement = rom_match.group(1)
-                side = rom_match.group(2)
-                if side == 'left':
-                    rom_left_data[movement] = value
-                else:
-                    rom_right_data[movement] = value
-                continue
-            
-            # Match strength/power fields
-            strength_match = pattern_strength.match(key)
-            if strength_match:
-                movement = strength_match.group(1)
-                side = strength_match.group(2)
-                if side == 'left':
-                    power_left_data[movement] = value
-                else:
-                    power_right_data[movement] = value
-                continue
-        
-        # Store aggregated data as JSON strings
-        if rom_left_data:
-            setattr(objective_measures, f'{field_prefix}_rom_left', json.dumps(rom_left_data))
-        if rom_right_data:
-            setattr(objective_measures, f'{field_prefix}_rom_right', json.dumps(rom_right_data))
-        if power_left_data:
-            setattr(objective_measures, f'{field_prefix}_power_left', json.dumps(power_left_data))
-        if power_right_data:
-            setattr(objective_measures, f'{field_prefix}_power_right', json.dumps(power_right_data))
-    
-    # Process spine joints (cervical and lumbar) - no left/right
-    for joint_name, field_prefix in [('cervical', 'cervical'), ('lumbar', 'lumbar')]:
-        pattern_rom_spine = re.compile(rf'^{joint_name}_(.+)_rom$')
-        pattern_strength_spine = re.compile(rf'^{joint_name}_(.+)_strength$')
-        
-        rom_data = {}
-        power_data = {}
-        
-        for key, value in request.POST.items():
-            if not value or value.strip() == '':
-                continue
-                
-            rom_match = pattern_rom_spine.match(key)
-            if rom_match:
-                movement = rom_match.group(1)
-                rom_data[movement] = value
-                continue
-            
-            strength_match = pattern_strength_spine.match(key)
-            if strength_match:
-                movement = strength_match.group(1)
-                power_data[movement] = value
-                continue
-        
-        # Store ROM data
-        if rom_data:
-            setattr(objective_measures, f'{field_prefix}_rom', json.dumps(rom_data))
-        
-        # Store power data - lumbar uses core_power, cervical has no power field in model
-        if power_data:
-            if joint_name == 'lumbar':
-                setattr(objective_measures, 'core_power', json.dumps(power_data))
-            # Note: cervical power is not stored as there's no cervical_power field in the model
+    measurements = []
+    for key, value in request.POST.items():
+        route = MEASUREMENT_FIELD_ROUTES.get(key)
+        if route is None or not value or value.strip() == '':
+            continue
+        joint, movement, side, metric = route
+        text_value = value.strip()[:200]
+        measurements.append(JointMeasurement(
+            joint=joint,
+            movement=movement,
+            side=side,
+            metric=metric,
+            text_value=text_value,
+            value=JointMeasurement.parse_value(metric, text_value),
+        ))
+    return measurements
 
 
 def practitioner_login(request):
     """Practitioner login view"""
     if request.user.is_authenticated:
         # Check if user is a clinician
-        if hasattr(request.user, 'clinician_profile'):
+        if request.role.is_clinician:
             return redirect('clinicians:dashboard')
         else:
             # Regular user, redirect to patient dashboard
@@ -139,9 +81,10 @@ def practitioner_login(request):
             user = authenticate(request, username=username, password=password)
             if user is not None:
                 # Check if user is a clinician
-                if hasattr(user, 'clinician_profile'):
+                role = get_user_role(user)
+                if role.is_clinician:
                     try:
-                        clinician = user.clinician_profile
+                        clinician = role.clinician
                         # Ensure practitioner code exists
                         if not clinician.practitioner_code:
                             clinician.save()  # This will generate the code via the save() method
@@ -166,36 +109,20 @@ def practitioner_login(request):
 @login_required
 def practitioner_dashboard(request):
     """Practitioner dashboard view"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
-    
-    # Get all patients this clinician has access to
-    from clinicians.models import PatientClinicianAccess
-    from health_records.models import Assessment
+    clinician = request.role.clinician
     
-    patient_accesses = PatientClinicianAccess.objects.filter(
-        clinician=clinician,
-        is_active=True
-    ).select_related('patient')
-    
-    # Get assessments for each patient that need objective measures
-    patients_with_assessments = []
-    for access in patient_accesses:
-        patient = access.patient
-        assessments = Assessment.objects.filter(user=patient).order_by('-symptom_date', '-created_at')
-        patients_with_assessments.append({
-            'patient': patient,
-            'access': access,
-            'assessments': assessments,
-        })
+    # Load patients, assessments and objective measures in a fixed number of queries
+    patients_with_assessments = get_dashboard_data(clinician)
+    patient_accesses = [patient_data['access'] for patient_data in patients_with_assessments]
     
     # Debug: Log the data being passed to template
     import logging
     logger = logging.getLogger(__name__)
-    logger.info(f"Practitioner dashboard - clinician: {clinician.id}, patient_accesses: {patient_accesses.count()}, patients_with_assessments: {len(patients_with_assessments)}")
+    logger.info(f"Practitioner dashboard - clinician: {clinician.id}, patient_accesses: {len(patient_accesses)}, patients_with_assessments: {len(patients_with_assessments)}")
     
     context = {
         'clinician': clinician,
@@ -208,13 +135,13 @@ def practitioner_dashboard(request):
 @login_required
 def send_practitioner_code_email(request):
     """Send practitioner code to a client via email"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'error', 'message': 'You must be a registered clinician.'}, status=403)
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
     if request.method == 'POST':
         client_email = request.POST.get('client_email', '').strip()
@@ -299,81 +226,41 @@ ShareMyCare Team
 @login_required
 def clients_list(request):
     """View all clients (patients) that the clinician has access to"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
+    search_query = request.GET.get('search', '').strip()
     
-    # Get all active patient accesses
-    patient_accesses = PatientClinicianAccess.objects.filter(
-        clinician=clinician,
-        is_active=True
-    ).select_related('patient').prefetch_related('patient__assessments', 'patient__medications', 'patient__conditions', 'patient__allergies')
+    # Per-client stats are annotated in SQL; only the current page is loaded
+    clients_queryset = get_clients_queryset(clinician, search_query)
+    totals = get_clients_totals(clients_queryset)
     
-    # Search functionality
-    search_query = request.GET.get('search', '').strip()
-    if search_query:
-        patient_accesses = patient_accesses.filter(
-            models.Q(patient__username__icontains=search_query) |
-            models.Q(patient__first_name__icontains=search_query) |
-            models.Q(patient__last_name__icontains=search_query) |
-            models.Q(patient__email__icontains=search_query)
-        )
+    paginator = Paginator(clients_queryset, CLIENTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
-    # Prepare client data with stats
     clients_data = []
-    from health_records.models import Assessment
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    for access in patient_accesses:
-        patient = access.patient
-        assessments = Assessment.objects.filter(user=patient)
-        
-        # Calculate stats
-        total_assessments = assessments.count()
-        recent_assessment = assessments.order_by('-assessment_date', '-created_at').first()
-        last_visit = recent_assessment.assessment_date if recent_assessment and recent_assessment.assessment_date else None
-        
-        # Count other records
-        medications_count = patient.medications.filter(is_active=True).count()
-        conditions_count = patient.conditions.filter(status='active').count()
-        allergies_count = patient.allergies.count()
-        
-        # Check if patient has recent activity (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        has_recent_activity = assessments.filter(
-            models.Q(assessment_date__gte=thirty_days_ago.date()) |
-            models.Q(created_at__gte=thirty_days_ago)
-        ).exists()
-        
+    for access in page_obj:
         clients_data.append({
-            'patient': patient,
+            'patient': access.patient,
             'access': access,
-            'total_assessments': total_assessments,
-            'last_visit': last_visit,
-            'medications_count': medications_count,
-            'conditions_count': conditions_count,
-            'allergies_count': allergies_count,
-            'has_recent_activity': has_recent_activity,
-            'recent_assessment': recent_assessment,
+            'total_assessments': access.total_assessments,
+            'last_visit': access.last_visit,
+            'medications_count': access.medications_count,
+            'conditions_count': access.conditions_count,
+            'allergies_count': access.allergies_count,
+            'has_recent_activity': access.has_recent_activity,
         })
     
-    # Sort by access granted date (newest first)
-    clients_data.sort(key=lambda x: x['access'].granted_at, reverse=True)
-    
-    # Calculate total assessments across all clients
-    total_assessments = sum(client['total_assessments'] for client in clients_data)
-    active_clients_count = sum(1 for client in clients_data if client['has_recent_activity'])
-    
     context = {
         'clinician': clinician,
         'clients_data': clients_data,
+        'page_obj': page_obj,
         'search_query': search_query,
-        'total_clients': len(clients_data),
-        'total_assessments': total_assessments,
-        'active_clients_count': active_clients_count,
+        'total_clients': totals['total_clients'],
+        'total_assessments': totals['total_assessments'],
+        'active_clients_count': totals['active_clients_count'],
     }
     return render(request, 'clinicians/clients_list.html', context)
 
@@ -381,63 +268,69 @@ def clients_list(request):
 @login_required
 def client_detail(request, patient_id):
     """View detailed information about a specific client"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     patient = get_object_or_404(User, pk=patient_id)
     
     # Check if clinician has access to this patient
-    access = PatientClinicianAccess.objects.filter(
-        patient=patient,
-        clinician=clinician,
-        is_active=True
-    ).first()
+    access = get_access_grant(request, patient.pk)
     
     if not access:
         messages.error(request, 'You do not have access to this patient\'s records.')
         return redirect('clinicians:clients_list')
     
-    # Get all patient data
-    from health_records.models import Assessment, Medication, Condition, Allergy, WorkHistory
-    
-    assessments = Assessment.objects.filter(user=patient).order_by('-assessment_date', '-created_at')
-    medications = Medication.objects.filter(user=patient).order_by('-is_active', '-start_date')
-    conditions = Condition.objects.filter(user=patient).order_by('-diagnosis_date')
-    allergies = Allergy.objects.filter(user=patient).order_by('-severity', '-date_identified')
-    work_history = WorkHistory.objects.filter(user=patient).order_by('-is_current', '-start_date')
-    
-    # Get patient profile
-    try:
-        profile = patient.profile
-    except:
-        profile = None
-    
-    # Get recent assessments count
-    from django.utils import timezone
-    from datetime import timedelta
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_assessments = assessments.filter(
-        models.Q(assessment_date__gte=thirty_days_ago.date()) | 
-        models.Q(created_at__gte=thirty_days_ago)
-    )
+    # Load only the record types the patient has consented to share
+    from health_records.models import Assessment, Medication, Condition, Allergy, ExtractedFindings
+    
+    records = project_records(access, {
+        'assessments': Assessment.objects.filter(user=patient)
+            .select_related('objective_measures')
+            .annotate(has_extracted_findings=models.Exists(
+                ExtractedFindings.objects.filter(assessment=models.OuterRef('pk'))
+            ))
+            .order_by('-assessment_date', '-created_at'),
+        'medications': Medication.objects.filter(user=patient).order_by('-is_active', '-start_date'),
+        'conditions': Condition.objects.filter(user=patient).order_by('-diagnosis_date'),
+        'allergies': Allergy.objects.filter(user=patient).order_by('-severity', '-date_identified'),
+    }, load=lambda record_type, queryset: paginate_request(
+        request, queryset, param=record_type, per_page=CLIENT_RECORDS_PER_PAGE
+    ))
+    profile, _ = project_profile(access)
+    assessments = records['assessments'] or []
+    shared_records = shared_record_types(access)
+    
+    # First page of the timeline; older pages are fetched from the timeline endpoint
+    from health_records.timeline import get_timeline
+    timeline = get_timeline(patient.pk, shared_records)
+    
+    # Assessment totals are counted in the database, not from the page shown
+    total_assessments = recent_assessments_count = 0
+    if records['assessments'] is not None:
+        from datetime import timedelta
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        total_assessments = records['assessments'].count
+        recent_assessments_count = Assessment.objects.filter(user=patient).filter(
+            models.Q(assessment_date__gte=thirty_days_ago.date()) | models.Q(created_at__gte=thirty_days_ago)
+        ).count()
     
     # Get clinician info for verification display
     from .verification import get_registration_body_name, get_registration_body_url
     
     clinician_registration_info = None
-    if access.clinician.registration_number and access.clinician.registration_body:
+    if clinician.registration_number and clinician.registration_body:
         clinician_registration_info = {
-            'body': access.clinician.registration_body,
-            'body_name': get_registration_body_name(access.clinician.registration_body),
-            'number': access.clinician.registration_number,
-            'verified': access.clinician.registration_verified,
+            'body': clinician.registration_body,
+            'body_name': get_registration_body_name(clinician.registration_body),
+            'number': clinician.registration_number,
+            'verified': clinician.registration_verified,
             'register_url': get_registration_body_url(
-                access.clinician.registration_body,
-                access.clinician.registration_number,
-                access.clinician.first_name,
-                access.clinician.last_name
+                clinician.registration_body,
+                clinician.registration_number,
+                clinician.first_name,
+                clinician.last_name
             )
         }
     
@@ -447,12 +340,15 @@ def client_detail(request, patient_id):
         'access': access,
         'profile': profile,
         'assessments': assessments,
-        'medications': medications,
-        'conditions': conditions,
-        'allergies': allergies,
-        'work_history': work_history,
-        'recent_assessments_count': recent_assessments.count(),
-        'total_assessments': assessments.count(),
+        'medications': records['medications'],
+        'conditions': records['conditions'],
+        'allergies': records['allergies'],
+        'recent_assessments_count': recent_assessments_count,
+        'total_assessments': total_assessments,
+        'shared_records': shared_records,
+        'withheld_records': withheld_labels(access, CLIENT_DETAIL_RECORDS),
+        'timeline': timeline,
+        'timeline_url': reverse('health_records:timeline_patient', args=[patient.pk]),
         'clinician_registration_info': clinician_registration_info,
     }
     return render(request, 'clinicians/client_detail.html', context)
@@ -461,11 +357,11 @@ def client_detail(request, patient_id):
 @login_required
 def edit_clinician_profile(request):
     """Edit clinician profile"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
     if request.method == 'POST':
         form = ClinicianForm(request.POST, instance=clinician)
@@ -482,11 +378,11 @@ def edit_clinician_profile(request):
 @login_required
 def delete_clinician_profile(request):
     """Delete clinician profile (and associated user account)"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
     if request.method == 'POST':
         user = request.user
@@ -603,22 +499,16 @@ def clinician_signup(request, token):
 @login_required
 def add_objective_measures(request, assessment_pk):
     """Add objective measures to an assessment"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
     from health_records.models import Assessment
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     assessment = get_object_or_404(Assessment, pk=assessment_pk)
     
     # Check if clinician has access to this patient
-    has_access = PatientClinicianAccess.objects.filter(
-        patient=assessment.user,
-        clinician=clinician,
-        is_active=True
-    ).exists()
-    
-    if not has_access:
+    if not has_patient_access(request, assessment.user_id):
         messages.error(request, 'You do not have access to this patient\'s records.')
         return redirect('clinicians:dashboard')
     
@@ -633,30 +523,33 @@ def add_objective_measures(request, assessment_pk):
             objective_measures.assessment = assessment
             objective_measures.clinician = clinician
             
-            # Aggregate specific movement fields from template into generic model fields
-            aggregate_movement_fields(request, objective_measures)
-            
-            objective_measures.save()
+            with transaction.atomic():
+                objective_measures.save()
+                objective_measures.replace_measurements(aggregate_movement_fields(request))
             messages.success(request, 'Objective measures added successfully!')
             return redirect('clinicians:dashboard')
     else:
         form = ObjectiveMeasuresForm(assessment=assessment)
     
+    # Pre-fill ROM and strength values read from the assessment's notes image
+    from health_records.measurement_extractor import draft_fields_for_assessment
+    
     return render(request, 'clinicians/objective_measures_form.html', {
         'form': form,
         'assessment': assessment,
-        'patient': assessment.user
+        'patient': assessment.user,
+        'draft_fields': draft_fields_for_assessment(assessment) if request.method != 'POST' else {},
     })
 
 
 @login_required
 def edit_objective_measures(request, pk):
     """Edit objective measures"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     objective_measures = get_object_or_404(ObjectiveMeasures, pk=pk, clinician=clinician)
     
     if request.method == 'POST':
@@ -664,10 +557,9 @@ def edit_objective_measures(request, pk):
         if form.is_valid():
             objective_measures = form.save(commit=False)
             
-            # Aggregate specific movement fields from template into generic model fields
-            aggregate_movement_fields(request, objective_measures)
-            
-            objective_measures.save()
+            with transaction.atomic():
+                objective_measures.save()
+                objective_measures.replace_measurements(aggregate_movement_fields(request))
             messages.success(request, 'Objective measures updated successfully!')
             return redirect('clinicians:dashboard')
     else:
@@ -677,37 +569,24 @@ def edit_objective_measures(request, pk):
         'form': form,
         'assessment': objective_measures.assessment,
         'patient': objective_measures.assessment.user,
-        'objective_measures': objective_measures
+        'objective_measures': objective_measures,
+        'saved_fields': objective_measures.measurement_fields() if request.method != 'POST' else {},
     })
 
 
 @login_required
+@clinician_access_required()
 def create_assessment(request, patient_id):
     """Create a new assessment for a patient - different forms based on practitioner type"""
-    if not hasattr(request.user, 'clinician_profile'):
-        messages.error(request, 'You must be a registered clinician to access this page.')
-        return redirect('health_records:dashboard')
-    
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     patient = get_object_or_404(User, pk=patient_id)
     
-    # Check if clinician has access to this patient
-    has_access = PatientClinicianAccess.objects.filter(
-        patient=patient,
-        clinician=clinician,
-        is_active=True
-    ).exists()
-    
-    if not has_access:
-        messages.error(request, 'You do not have access to this patient\'s records.')
-        return redirect('clinicians:dashboard')
-    
     # Determine assessment type based on practitioner title
     is_physiotherapist = clinician.title == 'physiotherapist'
     
     if request.method == 'POST':
         from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService
-        from health_records.models import ExtractedFindings
+        from health_records.ocr_jobs import enqueue_analysis
         import logging
         
         logger = logging.getLogger(__name__)
@@ -739,58 +618,20 @@ def create_assessment(request, patient_id):
                     messages.success(request, 'Assessment saved with image! Processing notes...')
                 else:
                     messages.success(request, 'Assessment created successfully! Image uploaded. Processing with document intelligence...')
-                messages.success(request, 'Assessment created successfully! Image uploaded. Processing with document intelligence...')
                 
                 # Initialize Azure Document Intelligence service
                 doc_service = AzureDocumentIntelligenceService()
                 
                 if doc_service.is_configured():
-                    try:
-                        # Get the full path to the image
-                        image_path = assessment.practitioner_notes_image.path
-                        
-                        # Process the document
-                        extracted_data = doc_service.analyze_document(image_path)
-                        
-                        if extracted_data:
-                            # Delete existing extracted findings for this assessment (if any)
-                            ExtractedFindings.objects.filter(assessment=assessment).delete()
-                            
-                            # Create ExtractedFindings records
-                            findings_created = 0
-                            for finding_data in extracted_data.get('findings', []):
-                                finding = ExtractedFindings.objects.create(
-                                    assessment=assessment,
-                                    category=finding_data.get('category', 'general'),
-                                    finding_type=finding_data.get('type', 'observation'),
-                                    text=finding_data.get('text', ''),
-                                    raw_extraction_data=extracted_data,
-                                )
-                                findings_created += 1
-                            
-                            if findings_created > 0:
-                                messages.success(
-                                    request,
-                                    f'Successfully extracted {findings_created} findings from the notes image!'
-                                )
-                                # Redirect to view findings
-                                # Check if user wants to add objective measures first
-                                if is_physiotherapist and request.POST.get('add_objective_measures'):
-                                    messages.info(request, 'You can view extracted findings after adding objective measures.')
-                                    return redirect('clinicians:add_objective_measures', assessment_pk=assessment.pk)
-                                return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
-                            else:
-                                messages.info(request, 'Image processed but no findings were extracted. You can view the raw text in the assessment details.')
-                        else:
-                            messages.warning(request, 'Image uploaded but document intelligence processing failed. You can try processing it manually later.')
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"Error processing notes image automatically: {error_msg}")
-                        logger.exception("Full traceback:")
-                        messages.error(
-                            request,
-                            f'Error processing image: {error_msg}. Please check the image format (JPEG, PNG, PDF supported) and try again.'
-                        )
+                    # Queue the image for the OCR worker rather than blocking this request
+                    job = enqueue_analysis(assessment, requested_by=request.user)
+                    logger.info(f"Queued analysis job {job.pk} for new assessment {assessment.pk}")
+                    
+                    # Check if user wants to add objective measures first
+                    if is_physiotherapist and request.POST.get('add_objective_measures'):
+                        messages.info(request, 'Findings are being extracted in the background. You can view them after adding objective measures.')
+                        return redirect('clinicians:add_objective_measures', assessment_pk=assessment.pk)
+                    return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
                 else:
                     messages.info(request, 'Image uploaded successfully. Document intelligence is not configured, so the image was not processed automatically.')
             
@@ -826,38 +667,77 @@ def create_assessment(request, patient_id):
 @login_required
 def clients_list_json(request):
     """JSON endpoint for clients list (for Quick Photo modal)"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
-    # Get all active patient accesses
+    # One page of active patient accesses, by name; the client follows next_cursor for the rest
     patient_accesses = PatientClinicianAccess.objects.filter(
         clinician=clinician,
         is_active=True
     ).select_related('patient')
+    try:
+        page = paginate(
+            patient_accesses,
+            cursor=request.GET.get('cursor') or None,
+            per_page=CLIENTS_PER_PAGE,
+            ordering=['patient__first_name', 'patient__last_name', 'patient__username'],
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
     
     clients = []
-    for access in patient_accesses:
+    for access in page:
         clients.append({
             'id': access.patient.id,
             'name': access.patient.get_full_name() or access.patient.username,
         })
     
-    # Sort by access granted date (newest first)
-    clients.sort(key=lambda x: x['name'])
+    return JsonResponse({'clients': clients, 'next_cursor': page.next_cursor})
+
+
+@login_required
+def measurement_trends(request, patient_id):
+    """JSON time series of a patient's ROM and strength measurements (for trend charts)"""
+    if not request.role.is_clinician:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    access = get_access_grant(request, patient_id)
+    if not access:
+        return JsonResponse({'error': 'You do not have access to this patient\'s records.'}, status=403)
+    
+    # Measurements are part of the patient's assessments
+    if 'assessments' not in shared_record_types(access):
+        return JsonResponse({'error': 'The patient has not shared their assessments with you.'}, status=403)
+    
+    try:
+        max_points = int(request.GET.get('points', DEFAULT_MAX_POINTS))
+    except ValueError:
+        return JsonResponse({'error': 'points must be a whole number.'}, status=400)
+    max_points = min(max(max_points, 2), MAX_POINTS_LIMIT)
     
-    return JsonResponse({'clients': clients})
+    metric = request.GET.get('metric') or None
+    if metric not in (None, 'rom', 'strength'):
+        return JsonResponse({'error': "metric must be 'rom' or 'strength'."}, status=400)
+    
+    return JsonResponse(get_measurement_trends(
+        patient_id,
+        joint=request.GET.get('joint') or None,
+        movement=request.GET.get('movement') or None,
+        metric=metric,
+        max_points=max_points,
+    ))
 
 
 @login_required
 def select_client_for_quick_upload(request):
     """Page to select a client for quick upload"""
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to access this page.')
         return redirect('health_records:dashboard')
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
     # Get all active patient accesses
     patient_accesses = PatientClinicianAccess.objects.filter(
@@ -896,32 +776,18 @@ def select_client_for_quick_upload(request):
 
 
 @login_required
+@clinician_access_required()
 def quick_upload_assessment(request, patient_id):
     """Quick upload assessment page - minimal form with just image upload"""
-    if not hasattr(request.user, 'clinician_profile'):
-        messages.error(request, 'You must be a registered clinician to access this page.')
-        return redirect('health_records:dashboard')
-    
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     patient = get_object_or_404(User, pk=patient_id)
     
-    # Check if clinician has access to this patient
-    has_access = PatientClinicianAccess.objects.filter(
-        patient=patient,
-        clinician=clinician,
-        is_active=True
-    ).exists()
-    
-    if not has_access:
-        messages.error(request, 'You do not have access to this patient\'s records.')
-        return redirect('clinicians:dashboard')
-    
     # Determine assessment type based on practitioner title
     is_physiotherapist = clinician.title == 'physiotherapist'
     
     if request.method == 'POST':
         from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService
-        from health_records.models import ExtractedFindings
+        from health_records.ocr_jobs import enqueue_analysis
         import logging
         
         logger = logging.getLogger(__name__)
@@ -951,47 +817,10 @@ def quick_upload_assessment(request, patient_id):
                 doc_service = AzureDocumentIntelligenceService()
                 
                 if doc_service.is_configured():
-                    try:
-                        # Get the full path to the image
-                        image_path = assessment.practitioner_notes_image.path
-                        
-                        # Process the document
-                        extracted_data = doc_service.analyze_document(image_path)
-                        
-                        if extracted_data:
-                            # Delete existing extracted findings for this assessment (if any)
-                            ExtractedFindings.objects.filter(assessment=assessment).delete()
-                            
-                            # Create ExtractedFindings records
-                            findings_created = 0
-                            for finding_data in extracted_data.get('findings', []):
-                                finding = ExtractedFindings.objects.create(
-                                    assessment=assessment,
-                                    category=finding_data.get('category', 'general'),
-                                    finding_type=finding_data.get('type', 'observation'),
-                                    text=finding_data.get('text', ''),
-                                    raw_extraction_data=extracted_data,
-                                )
-                                findings_created += 1
-                            
-                            if findings_created > 0:
-                                messages.success(
-                                    request,
-                                    f'Successfully extracted {findings_created} findings from the notes image!'
-                                )
-                                return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
-                            else:
-                                messages.info(request, 'Image processed but no findings were extracted. You can view the raw text in the assessment details.')
-                        else:
-                            messages.warning(request, 'Image uploaded but document intelligence processing failed. You can try processing it manually later.')
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"Error processing notes image automatically: {error_msg}")
-                        logger.exception("Full traceback:")
-                        messages.error(
-                            request,
-                            f'Error processing image: {error_msg}. Please check the image format (JPEG, PNG, PDF supported) and try again.'
-                        )
+                    # Queue the image for the OCR worker rather than blocking this request
+                    job = enqueue_analysis(assessment, requested_by=request.user)
+                    logger.info(f"Queued analysis job {job.pk} for quick upload assessment {assessment.pk}")
+                    return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
                 else:
                     messages.info(request, 'Image uploaded successfully. Document intelligence is not configured, so the image was not processed automatically.')
             
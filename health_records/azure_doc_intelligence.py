@@ -1,23 +1,72 @@
 """
 Azure Document Intelligence service for extracting structured data from therapist notes.
+
+The OCR engine is pluggable: AzureLayoutBackend calls the real service, while
+LocalLayoutBackend returns recorded prebuilt-layout results from fixtures so the
+findings pipeline can be exercised and benchmarked without network access.
+Select one with the DOCUMENT_INTELLIGENCE_BACKEND setting ('azure' or 'local').
+
+Layout results are cached in ExtractionResult, keyed by the SHA-256 of the file
+bytes and the backend's model id, so re-processing the same document is a local
+lookup rather than another billable OCR call.
 """
 import os
+import json
+import time
+import hashlib
 import logging
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Union
 from azure.core.credentials import AzureKeyCredential
 from azure.ai.documentintelligence import DocumentIntelligenceClient
+from azure.ai.documentintelligence.models import AnalyzeResult
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .finding_matcher import match_line, match_lines
+from .measurement_extractor import extract_measurements
+from .models import ExtractionResult
 
 logger = logging.getLogger(__name__)
 
+# Directory of recorded prebuilt-layout results used by LocalLayoutBackend
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parent / 'ocr_fixtures'
 
-class AzureDocumentIntelligenceService:
-    """Service for processing documents using Azure Document Intelligence"""
+# Azure Document Intelligence rejects documents larger than this
+MAX_DOCUMENT_SIZE = 500 * 1024 * 1024
+
+
+class DocumentAnalysisBackend:
+    """Interface for OCR engines that produce prebuilt-layout results"""
+    
+    model_id = 'prebuilt-layout'
     
-    def __init__(self):
+    def is_configured(self) -> bool:
+        """Check if the backend is ready to analyze documents"""
+        raise NotImplementedError
+    
+    def analyze(self, document: BinaryIO) -> AnalyzeResult:
+        """
+        Run a layout analysis over a document.
+        
+        Args:
+            document: Binary file object positioned at the start of the
+                document. Backends stream it rather than reading it into memory.
+            
+        Returns:
+            An AnalyzeResult with content, pages, tables and key-value pairs
+        """
+        raise NotImplementedError
+
+
+class AzureLayoutBackend(DocumentAnalysisBackend):
+    """Backend that calls Azure Document Intelligence"""
+    
+    def __init__(self, endpoint: Optional[str] = None, api_key: Optional[str] = None):
         """Initialize the Azure Document Intelligence client"""
-        self.endpoint = getattr(settings, 'AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT', None)
-        self.api_key = getattr(settings, 'AZURE_DOCUMENT_INTELLIGENCE_KEY', None)
+        self.endpoint = endpoint or getattr(settings, 'AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT', None)
+        self.api_key = api_key or getattr(settings, 'AZURE_DOCUMENT_INTELLIGENCE_KEY', None)
         
         if not self.endpoint or not self.api_key:
             logger.warning("Azure Document Intelligence credentials not configured")
@@ -34,15 +83,95 @@ class AzureDocumentIntelligenceService:
                 self.client = None
     
     def is_configured(self) -> bool:
-        """Check if Azure Document Intelligence is properly configured"""
         return self.client is not None
     
-    def analyze_document(self, file_path: str) -> Optional[Dict]:
+    def analyze(self, document: BinaryIO) -> AnalyzeResult:
+        # Stream the file as raw bytes. The SDK only infers octet-stream for bytes, BytesIO and
+        # BufferedReader bodies, so Django's file objects would otherwise be sent as JSON.
+        poller = self.client.begin_analyze_document(
+            model_id=self.model_id,
+            body=document,
+            content_type='application/octet-stream'
+        )
+        return poller.result()
+
+
+class LocalLayoutBackend(DocumentAnalysisBackend):
+    """
+    Deterministic offline stand-in for Azure Document Intelligence.
+    
+    Returns recorded prebuilt-layout results from JSON fixtures. The same
+    document always maps to the same fixture (chosen by content hash), and
+    an optional latency simulates the service's processing time.
+    """
+    
+    # Kept distinct from Azure's model id so cached results never mix
+    model_id = 'local:prebuilt-layout'
+    
+    def __init__(self, fixture_dir=None, latency: Optional[float] = None):
+        self.fixture_dir = Path(fixture_dir or getattr(settings, 'DOCUMENT_INTELLIGENCE_LOCAL_FIXTURE_DIR', None) or DEFAULT_FIXTURE_DIR)
+        if latency is None:
+            latency = getattr(settings, 'DOCUMENT_INTELLIGENCE_LOCAL_LATENCY', 0)
+        self.latency = latency
+        self.fixtures = self._load_fixtures()
+    
+    def _load_fixtures(self) -> List[Dict]:
+        fixtures = []
+        if self.fixture_dir.is_dir():
+            for fixture_path in sorted(self.fixture_dir.glob('*.json')):
+                with open(fixture_path, encoding='utf-8') as f:
+                    fixtures.append(json.load(f))
+        return fixtures
+    
+    def is_configured(self) -> bool:
+        return bool(self.fixtures)
+    
+    def analyze(self, document: BinaryIO) -> AnalyzeResult:
+        digest = hashlib.file_digest(document, 'sha256').digest()
+        fixture = self.fixtures[int.from_bytes(digest[:4], 'big') % len(self.fixtures)]
+        if self.latency:
+            time.sleep(self.latency)
+        return AnalyzeResult(fixture)
+
+
+BACKENDS = {
+    'azure': AzureLayoutBackend,
+    'local': LocalLayoutBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> DocumentAnalysisBackend:
+    """Create the OCR backend named by DOCUMENT_INTELLIGENCE_BACKEND (default 'azure')"""
+    name = name or getattr(settings, 'DOCUMENT_INTELLIGENCE_BACKEND', 'azure')
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown document intelligence backend: {name}")
+    return backend_class()
+
+
+class AzureDocumentIntelligenceService:
+    """Service for processing documents using Azure Document Intelligence"""
+    
+    def __init__(self, backend: Optional[DocumentAnalysisBackend] = None, use_cache: bool = True):
+        """Initialize the service with the configured OCR backend"""
+        self.backend = backend or get_backend()
+        self.use_cache = use_cache and getattr(settings, 'DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES', 0) > 0
+    
+    def is_configured(self) -> bool:
+        """Check if Azure Document Intelligence is properly configured"""
+        return self.backend.is_configured()
+    
+    def analyze_document(self, document: Union[str, os.PathLike, BinaryIO]) -> Optional[Dict]:
         """
         Analyze a document and extract structured data.
         
+        A previously cached result for identical file content is reused
+        instead of calling the OCR backend again.
+        
         Args:
-            file_path: Path to the document image file
+            document: Path to the document image file, or a binary file
+                object opened on it (e.g. a FieldFile opened from storage)
             
         Returns:
             Dictionary containing extracted data, or None if analysis fails
@@ -52,82 +181,26 @@ class AzureDocumentIntelligenceService:
             return None
         
         try:
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            
-            # Check file size (Azure has limits)
-            file_size_mb = len(file_content) / (1024 * 1024)
-            if file_size_mb > 500:  # Azure limit is 500MB
-                logger.error(f"File too large: {file_size_mb:.2f}MB (max 500MB)")
-                raise ValueError(f"File too large: {file_size_mb:.2f}MB. Maximum size is 500MB.")
-            
-            logger.info(f"Analyzing document: {file_path} ({file_size_mb:.2f}MB)")
-            
-            # Use the general document model to extract text and structure
-            # The API expects 'body' parameter with the file content
-            poller = self.client.begin_analyze_document(
-                model_id="prebuilt-layout",
-                body=file_content
-            )
-            
-            result = poller.result()
-            
-            # Extract structured information
-            extracted_data = {
-                'raw_text': result.content if hasattr(result, 'content') else '',
-                'pages': [],
-                'tables': [],
-                'key_value_pairs': [],
-                'findings': []
-            }
-            
-            # Extract pages
-            if hasattr(result, 'pages') and result.pages:
-                for page in result.pages:
-                    extracted_data['pages'].append({
-                        'page_number': page.page_number if hasattr(page, 'page_number') else None,
-                        'width': page.width if hasattr(page, 'width') else None,
-                        'height': page.height if hasattr(page, 'height') else None,
-                    })
-            
-            # Extract tables
-            if hasattr(result, 'tables') and result.tables:
-                for table in result.tables:
-                    table_data = {
-                        'row_count': table.row_count if hasattr(table, 'row_count') else 0,
-                        'column_count': table.column_count if hasattr(table, 'column_count') else 0,
-                        'cells': []
-                    }
-                    
-                    if hasattr(table, 'cells') and table.cells:
-                        for cell in table.cells:
-                            cell_data = {
-                                'row_index': cell.row_index if hasattr(cell, 'row_index') else None,
-                                'column_index': cell.column_index if hasattr(cell, 'column_index') else None,
-                                'content': cell.content if hasattr(cell, 'content') else '',
-                                'kind': cell.kind if hasattr(cell, 'kind') else None,
-                            }
-                            table_data['cells'].append(cell_data)
-                    
-                    extracted_data['tables'].append(table_data)
-            
-            # Extract key-value pairs (for structured forms)
-            if hasattr(result, 'key_value_pairs') and result.key_value_pairs:
-                for kv_pair in result.key_value_pairs:
-                    key = kv_pair.key.content if hasattr(kv_pair, 'key') and hasattr(kv_pair.key, 'content') else ''
-                    value = kv_pair.value.content if hasattr(kv_pair, 'value') and hasattr(kv_pair.value, 'content') else ''
-                    if key and value:
-                        extracted_data['key_value_pairs'].append({
-                            'key': key,
-                            'value': value
-                        })
+            if isinstance(document, (str, os.PathLike)):
+                # Check file size from metadata before reading anything (Azure has limits)
+                file_size = self._check_size(os.path.getsize(document))
+                with open(document, 'rb') as f:
+                    extracted_data = self._analyze_layout(f, os.fspath(document), file_size)
+            else:
+                document.seek(0, os.SEEK_END)
+                file_size = self._check_size(document.tell())
+                extracted_data = self._analyze_layout(document, getattr(document, 'name', None) or 'document', file_size)
             
             logger.info(f"Extracted {len(extracted_data['raw_text'])} characters of text")
             
-            # Parse findings from the text (look for common medical note patterns)
+            # Findings and measurements are parsed on every call (not cached) so parser changes apply to cached documents
             extracted_data['findings'] = self._parse_findings(extracted_data['raw_text'])
             logger.info(f"Parsed {len(extracted_data['findings'])} findings from document")
             
+            # Structured ROM and strength values used to pre-fill objective measures
+            extracted_data['measurements'] = extract_measurements(extracted_data['raw_text'], extracted_data['tables'])
+            logger.info(f"Extracted {len(extracted_data['measurements'])} measurements from document")
+            
             return extracted_data
             
         except Exception as e:
@@ -138,6 +211,127 @@ class AzureDocumentIntelligenceService:
             # Return error details for better debugging
             raise Exception(f"Azure Document Intelligence error ({error_type}): {error_msg}")
     
+    def _check_size(self, file_size: int) -> int:
+        """Raise ValueError if a document is over Azure's size limit"""
+        if file_size > MAX_DOCUMENT_SIZE:
+            file_size_mb = file_size / (1024 * 1024)
+            logger.error(f"File too large: {file_size_mb:.2f}MB (max 500MB)")
+            raise ValueError(f"File too large: {file_size_mb:.2f}MB. Maximum size is 500MB.")
+        return file_size
+    
+    def _analyze_layout(self, f: BinaryIO, name: str, file_size: int) -> Dict:
+        """Layout data for an open document, from the cache or the OCR backend"""
+        # The document is streamed in chunks for hashing and upload, never held in memory whole
+        f.seek(0)
+        content_hash = hashlib.file_digest(f, 'sha256').hexdigest()
+        extracted_data = self._get_cached_result(content_hash)
+        
+        if extracted_data is not None:
+            logger.info(f"Using cached analysis for {name} ({content_hash[:12]})")
+        else:
+            logger.info(f"Analyzing document: {name} ({file_size / (1024 * 1024):.2f}MB)")
+            
+            # Use the layout model to extract text and structure
+            f.seek(0)
+            result = self.backend.analyze(f)
+            extracted_data = self._extract_layout(result)
+            self._store_result(content_hash, extracted_data, file_size)
+        return extracted_data
+    
+    def _extract_layout(self, result: AnalyzeResult) -> Dict:
+        """Convert an AnalyzeResult into plain, JSON-serialisable layout data"""
+        extracted_data = {
+            'raw_text': result.content if hasattr(result, 'content') else '',
+            'pages': [],
+            'tables': [],
+            'key_value_pairs': [],
+            'findings': []
+        }
+        
+        # Extract pages
+        if hasattr(result, 'pages') and result.pages:
+            for page in result.pages:
+                extracted_data['pages'].append({
+                    'page_number': page.page_number if hasattr(page, 'page_number') else None,
+                    'width': page.width if hasattr(page, 'width') else None,
+                    'height': page.height if hasattr(page, 'height') else None,
+                })
+        
+        # Extract tables
+        if hasattr(result, 'tables') and result.tables:
+            for table in result.tables:
+                table_data = {
+                    'row_count': table.row_count if hasattr(table, 'row_count') else 0,
+                    'column_count': table.column_count if hasattr(table, 'column_count') else 0,
+                    'cells': []
+                }
+                
+                if hasattr(table, 'cells') and table.cells:
+                    for cell in table.cells:
+                        cell_data = {
+                            'row_index': cell.row_index if hasattr(cell, 'row_index') else None,
+                            'column_index': cell.column_index if hasattr(cell, 'column_index') else None,
+                            'content': cell.content if hasattr(cell, 'content') else '',
+                            'kind': cell.kind if hasattr(cell, 'kind') else None,
+                        }
+                        table_data['cells'].append(cell_data)
+                
+                extracted_data['tables'].append(table_data)
+        
+        # Extract key-value pairs (for structured forms)
+        if hasattr(result, 'key_value_pairs') and result.key_value_pairs:
+            for kv_pair in result.key_value_pairs:
+                key = kv_pair.key.content if hasattr(kv_pair, 'key') and hasattr(kv_pair.key, 'content') else ''
+                value = kv_pair.value.content if hasattr(kv_pair, 'value') and hasattr(kv_pair.value, 'content') else ''
+                if key and value:
+                    extracted_data['key_value_pairs'].append({
+                        'key': key,
+                        'value': value
+                    })
+        
+        return extracted_data
+    
+    def _get_cached_result(self, content_hash: str) -> Optional[Dict]:
+        """Return the cached layout data for a document, marking it as recently used"""
+        if not self.use_cache:
+            return None
+        
+        cached = ExtractionResult.objects.filter(
+            content_hash=content_hash,
+            model_id=self.backend.model_id
+        ).values('pk', 'result').first()
+        if cached is None:
+            return None
+        
+        ExtractionResult.objects.filter(pk=cached['pk']).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now()
+        )
+        return dict(cached['result'], findings=[])
+    
+    def _store_result(self, content_hash: str, extracted_data: Dict, file_size: int):
+        """Cache layout data for a document and evict the least recently used entries"""
+        if not self.use_cache:
+            return
+        
+        layout = {key: value for key, value in extracted_data.items() if key not in ('findings', 'measurements')}
+        ExtractionResult.objects.update_or_create(
+            content_hash=content_hash,
+            model_id=self.backend.model_id,
+            defaults={'result': layout, 'file_size': file_size, 'last_used_at': timezone.now()}
+        )
+        
+        max_entries = settings.DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES
+        excess = ExtractionResult.objects.count() - max_entries
+        if excess > 0:
+            stale_ids = list(
+                ExtractionResult.objects
+                .order_by('last_used_at', 'pk')
+                .values_list('pk', flat=True)[:excess]
+            )
+            ExtractionResult.objects.filter(pk__in=stale_ids).delete()
+            logger.info(f"Evicted {len(stale_ids)} cached analysis results")
+    
     def _parse_findings(self, text: str) -> List[Dict]:
         """
         Parse findings from extracted text.
@@ -154,70 +348,27 @@ class AzureDocumentIntelligenceService:
         if not text:
             return findings
         
-        # Common patterns to look for in therapy notes
-        lines = text.split('\n')
         current_category = None
         
-        # Keywords that might indicate categories
-        category_keywords = {
-            'assessment': ['assessment', 'findings', 'evaluation', 'examination'],
-            'diagnosis': ['diagnosis', 'diagnoses', 'condition', 'pathology'],
-            'treatment': ['treatment', 'plan', 'intervention', 'therapy', 'exercise'],
-            'prognosis': ['prognosis', 'outcome', 'expectation', 'progress'],
-            'recommendations': ['recommendation', 'advice', 'suggest', 'should'],
-            'measurements': ['rom', 'range of motion', 'strength', 'power', 'degrees'],
-            'symptoms': ['symptom', 'pain', 'discomfort', 'complaint'],
-        }
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if line contains a category keyword
-            line_lower = line.lower()
-            for category, keywords in category_keywords.items():
-                if any(keyword in line_lower for keyword in keywords):
-                    current_category = category
-                    break
+        # Category, finding flag and type for every line come from one keyword scan of the text
+        for line, match in match_lines(text):
+            if match.category:
+                current_category = match.category
             
             # If line looks like a finding (contains common medical terms or measurements)
-            if self._is_finding_line(line):
-                finding = {
+            if match.is_finding:
+                findings.append({
                     'category': current_category or 'general',
                     'text': line,
-                    'type': self._classify_finding_type(line)
-                }
-                findings.append(finding)
+                    'type': match.finding_type
+                })
         
         return findings
     
     def _is_finding_line(self, line: str) -> bool:
         """Check if a line looks like a medical finding"""
-        # Common medical/therapy terms
-        medical_terms = [
-            'pain', 'stiffness', 'weakness', 'swelling', 'tenderness',
-            'rom', 'range', 'motion', 'flexion', 'extension', 'abduction', 'adduction',
-            'strength', 'power', 'grade', 'degrees', 'cm', 'mm',
-            'improved', 'worsened', 'stable', 'normal', 'abnormal',
-            'limited', 'restricted', 'full', 'partial'
-        ]
-        
-        line_lower = line.lower()
-        return any(term in line_lower for term in medical_terms) and len(line) > 10
+        return match_line(line).is_finding
     
     def _classify_finding_type(self, text: str) -> str:
         """Classify the type of finding"""
-        text_lower = text.lower()
-        
-        if any(term in text_lower for term in ['rom', 'range of motion', 'flexion', 'extension', 'degrees']):
-            return 'measurement'
-        elif any(term in text_lower for term in ['strength', 'power', 'grade']):
-            return 'strength'
-        elif any(term in text_lower for term in ['pain', 'discomfort', 'tenderness']):
-            return 'symptom'
-        elif any(term in text_lower for term in ['exercise', 'treatment', 'therapy']):
-            return 'treatment'
-        else:
-            return 'observation'
-
+        return match_line(text).finding_type
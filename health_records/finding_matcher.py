@@ -0,0 +1,172 @@
+"""
+Precompiled keyword matcher for parsing findings out of OCR'd therapy notes.
+
+All category, finding and finding-type keywords are compiled once, at import,
+into a single regular expression. The expression is a trie, so a position is
+rejected after one character test unless a keyword could start there. A whole
+document is scanned in one pass that yields each line's category, whether it
+looks like a finding, and its finding type.
+
+Keywords are matched as substrings of the lowercased line, exactly like the
+original `any(keyword in line for keyword in ...)` checks. The expression is a
+lookahead, so overlapping keywords are all seen (e.g. 'rom' and 'motion' in
+'promotion'). At each position it matches the longest keyword that starts
+there. Every shorter keyword starting at the same position is a prefix of that
+one, so each keyword's flags include the flags of its prefixes.
+"""
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Keywords that might indicate categories, in priority order
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'assessment': ('assessment', 'findings', 'evaluation', 'examination'),
+    'diagnosis': ('diagnosis', 'diagnoses', 'condition', 'pathology'),
+    'treatment': ('treatment', 'plan', 'intervention', 'therapy', 'exercise'),
+    'prognosis': ('prognosis', 'outcome', 'expectation', 'progress'),
+    'recommendations': ('recommendation', 'advice', 'suggest', 'should'),
+    'measurements': ('rom', 'range of motion', 'strength', 'power', 'degrees'),
+    'symptoms': ('symptom', 'pain', 'discomfort', 'complaint'),
+}
+
+# Common medical/therapy terms that mark a line as a finding
+MEDICAL_TERMS: Tuple[str, ...] = (
+    'pain', 'stiffness', 'weakness', 'swelling', 'tenderness',
+    'rom', 'range', 'motion', 'flexion', 'extension', 'abduction', 'adduction',
+    'strength', 'power', 'grade', 'degrees', 'cm', 'mm',
+    'improved', 'worsened', 'stable', 'normal', 'abnormal',
+    'limited', 'restricted', 'full', 'partial',
+)
+
+# Terms that decide a finding's type, in priority order
+FINDING_TYPE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'measurement': ('rom', 'range of motion', 'flexion', 'extension', 'degrees'),
+    'strength': ('strength', 'power', 'grade'),
+    'symptom': ('pain', 'discomfort', 'tenderness'),
+    'treatment': ('exercise', 'treatment', 'therapy'),
+}
+
+# Lines this short are never treated as findings
+MIN_FINDING_LENGTH = 11
+
+
+class LineMatch(NamedTuple):
+    """Result of matching one line of notes"""
+    category: Optional[str]
+    is_finding: bool
+    finding_type: str
+
+
+def _build_flags() -> Tuple[Dict[str, int], List[str], List[str], int]:
+    """Assign each keyword a bitmask of the categories, types and finding flag it signals"""
+    categories = list(CATEGORY_KEYWORDS)
+    finding_types = list(FINDING_TYPE_KEYWORDS)
+    finding_bit = 1 << (len(categories) + len(finding_types))
+
+    flags: Dict[str, int] = {}
+    for index, category in enumerate(categories):
+        for keyword in CATEGORY_KEYWORDS[category]:
+            flags[keyword] = flags.get(keyword, 0) | (1 << index)
+    for index, finding_type in enumerate(finding_types, start=len(categories)):
+        for keyword in FINDING_TYPE_KEYWORDS[finding_type]:
+            flags[keyword] = flags.get(keyword, 0) | (1 << index)
+    for keyword in MEDICAL_TERMS:
+        flags[keyword] = flags.get(keyword, 0) | finding_bit
+
+    # The longest keyword at a position stands in for its prefixes
+    flags = {
+        keyword: mask | _prefix_flags(keyword, flags)
+        for keyword, mask in flags.items()
+    }
+    return flags, categories, finding_types, finding_bit
+
+
+def _prefix_flags(keyword: str, flags: Dict[str, int]) -> int:
+    mask = 0
+    for other, other_mask in flags.items():
+        if other != keyword and keyword.startswith(other):
+            mask |= other_mask
+    return mask
+
+
+def _trie_pattern(keywords) -> str:
+    """Build a regex alternation shaped like a trie that prefers the longest keyword"""
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ending here is only taken if no longer keyword continues (greedy '?')
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return build(trie)
+
+
+KEYWORD_FLAGS, _CATEGORIES, _FINDING_TYPES, _FINDING_BIT = _build_flags()
+
+KEYWORD_PATTERN = re.compile('(?=(' + _trie_pattern(KEYWORD_FLAGS) + '))')
+
+# Also matches newlines, which findall reports as '' so a document's lines can be told apart
+DOCUMENT_PATTERN = re.compile('\\n|' + KEYWORD_PATTERN.pattern)
+
+
+def _first_flagged(mask: int, names: List[str], offset: int, default):
+    for index, name in enumerate(names, start=offset):
+        if mask & (1 << index):
+            return name
+    return default
+
+
+def _line_match(mask: int, long_enough: bool) -> LineMatch:
+    return LineMatch(
+        category=_first_flagged(mask, _CATEGORIES, 0, None),
+        is_finding=bool(mask & _FINDING_BIT) and long_enough,
+        finding_type=_first_flagged(mask, _FINDING_TYPES, len(_CATEGORIES), 'observation'),
+    )
+
+
+# The result for every combination of flags, so resolving a line is a lookup
+_MASK_COUNT = _FINDING_BIT << 1
+MATCH_BY_MASK = tuple(_line_match(mask, True) for mask in range(_MASK_COUNT))
+SHORT_MATCH_BY_MASK = tuple(_line_match(mask, False) for mask in range(_MASK_COUNT))
+
+
+def match_line(line: str) -> LineMatch:
+    """
+    Match a stripped line of notes against all keywords in one pass.
+
+    Returns:
+        LineMatch with the category the line starts (or None), whether the
+        line looks like a finding, and the finding type
+    """
+    mask = 0
+    for keyword in KEYWORD_PATTERN.findall(line.lower()):
+        mask |= KEYWORD_FLAGS[keyword]
+
+    return (MATCH_BY_MASK if len(line) >= MIN_FINDING_LENGTH else SHORT_MATCH_BY_MASK)[mask]
+
+
+def match_lines(text: str) -> Iterator[Tuple[str, LineMatch]]:
+    """
+    Match every line of a document with a single scan of the text.
+
+    Yields:
+        (stripped line, LineMatch) for each non-blank line, in order
+    """
+    line_masks = [0]
+    for keyword in DOCUMENT_PATTERN.findall(text.lower()):
+        if keyword:
+            line_masks[-1] |= KEYWORD_FLAGS[keyword]
+        else:
+            line_masks.append(0)
+
+    for line, mask in zip(text.split('\n'), line_masks):
+        line = line.strip()
+        if line:
+            yield line, (MATCH_BY_MASK if len(line) >= MIN_FINDING_LENGTH else SHORT_MATCH_BY_MASK)[mask]
@@ -0,0 +1,109 @@
+"""
+Normalisation of uploaded photos (prescriptions and practitioner notes).
+
+Phone photos are stored at a size suited to OCR rather than as uploaded:
+they are rotated upright from their EXIF orientation, downscaled so the
+longest edge is at most UPLOAD_IMAGE_MAX_DIMENSION, re-encoded as JPEG
+(which Azure Document Intelligence accepts) without EXIF metadata such as
+GPS location, and a small thumbnail is generated for page previews.
+"""
+import logging
+import os
+from io import BytesIO
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> ContentFile:
+    buffer = BytesIO()
+    # No exif argument is passed, so no metadata is written
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to a JPEG-compatible mode, putting transparency on white"""
+    if image.mode in ('RGB', 'L'):
+        return image
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(file) -> Optional[Tuple[ContentFile, ContentFile]]:
+    """
+    Downscale, strip metadata from and re-encode an uploaded image.
+
+    Args:
+        file: Readable file object containing the upload
+
+    Returns:
+        (normalised image, thumbnail) as JPEG ContentFiles, or None if the
+        file is not an image Pillow can read, or has too many pixels to
+        decode safely (it is then stored unchanged)
+    """
+    max_dimension = settings.UPLOAD_IMAGE_MAX_DIMENSION
+    thumbnail_size = settings.UPLOAD_THUMBNAIL_SIZE
+
+    try:
+        file.seek(0)
+        with Image.open(file) as original:
+            # JPEGs can be decoded straight at a reduced scale, which is much cheaper
+            original.draft('RGB', (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(original)
+            image = _flatten(image)
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        # DecompressionBombError (more pixels than Pillow will decode) is not an OSError
+        logger.warning(f"Could not normalise uploaded image: {e}")
+        return None
+
+    normalized = _encode_jpeg(image, settings.UPLOAD_IMAGE_QUALITY)
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+    thumbnail = _encode_jpeg(image, settings.UPLOAD_THUMBNAIL_QUALITY)
+    return normalized, thumbnail
+
+
+def normalize_image_field(instance, field_name: str, thumbnail_field_name: str):
+    """
+    Normalise a model's newly uploaded image before it is written to storage.
+
+    Called from the model's save(). Images already in storage are left
+    alone; clearing the image, or replacing it with a file that is not an
+    image, also clears its thumbnail.
+    """
+    field_file = getattr(instance, field_name)
+    thumbnail_file = getattr(instance, thumbnail_field_name)
+
+    if not field_file:
+        if thumbnail_file:
+            setattr(instance, thumbnail_field_name, None)
+        return
+
+    if field_file._committed:
+        return
+
+    result = normalize_image(field_file.file)
+    if result is None:
+        # Stored as uploaded; a thumbnail of the photo it replaces would no longer match
+        if thumbnail_file:
+            setattr(instance, thumbnail_field_name, None)
+        return
+
+    normalized, thumbnail = result
+    base_name = os.path.splitext(os.path.basename(field_file.name))[0]
+    original_size = field_file.size
+    field_file.save(f'{base_name}.jpg', normalized, save=False)
+    thumbnail_file.save(f'{base_name}_thumb.jpg', thumbnail, save=False)
+    logger.info(
+        f"Normalised {field_name} upload from {original_size / 1024:.0f}KB "
+        f"to {normalized.size / 1024:.0f}KB"
+    )
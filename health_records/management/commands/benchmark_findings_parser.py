@@ -0,0 +1,121 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService, LocalLayoutBackend
+
+# Filler lines mixed into the corpus so most lines match no keyword, like real notes
+FILLER_LINES = [
+    'Patient attended the clinic today accompanied by a family member.',
+    'Discussed work duties and the commute to the office.',
+    'Reviewed previous letter from the GP.',
+    'Next appointment booked for two weeks.',
+    'Consent obtained verbally.',
+    'Questions answered.',
+]
+
+
+def reference_parse_findings(text):
+    """The original keyword-list parser, kept to check the compiled matcher gives identical results"""
+    findings = []
+    if not text:
+        return findings
+
+    category_keywords = {
+        'assessment': ['assessment', 'findings', 'evaluation', 'examination'],
+        'diagnosis': ['diagnosis', 'diagnoses', 'condition', 'pathology'],
+        'treatment': ['treatment', 'plan', 'intervention', 'therapy', 'exercise'],
+        'prognosis': ['prognosis', 'outcome', 'expectation', 'progress'],
+        'recommendations': ['recommendation', 'advice', 'suggest', 'should'],
+        'measurements': ['rom', 'range of motion', 'strength', 'power', 'degrees'],
+        'symptoms': ['symptom', 'pain', 'discomfort', 'complaint'],
+    }
+    medical_terms = [
+        'pain', 'stiffness', 'weakness', 'swelling', 'tenderness',
+        'rom', 'range', 'motion', 'flexion', 'extension', 'abduction', 'adduction',
+        'strength', 'power', 'grade', 'degrees', 'cm', 'mm',
+        'improved', 'worsened', 'stable', 'normal', 'abnormal',
+        'limited', 'restricted', 'full', 'partial'
+    ]
+
+    current_category = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        line_lower = line.lower()
+        for category, keywords in category_keywords.items():
+            if any(keyword in line_lower for keyword in keywords):
+                current_category = category
+                break
+        if any(term in line_lower for term in medical_terms) and len(line) > 10:
+            if any(term in line_lower for term in ['rom', 'range of motion', 'flexion', 'extension', 'degrees']):
+                finding_type = 'measurement'
+            elif any(term in line_lower for term in ['strength', 'power', 'grade']):
+                finding_type = 'strength'
+            elif any(term in line_lower for term in ['pain', 'discomfort', 'tenderness']):
+                finding_type = 'symptom'
+            elif any(term in line_lower for term in ['exercise', 'treatment', 'therapy']):
+                finding_type = 'treatment'
+            else:
+                finding_type = 'observation'
+            findings.append({'category': current_category or 'general', 'text': line, 'type': finding_type})
+    return findings
+
+
+class Command(BaseCommand):
+    help = 'Benchmark findings parsing over a synthetic corpus of therapy notes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=20000,
+            help='Number of lines in the synthetic corpus (default: 20000)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of timed rounds per parser (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        backend = LocalLayoutBackend(latency=0)
+        note_lines = [
+            line
+            for fixture in backend.fixtures
+            for line in fixture.get('content', '').split('\n')
+            if line.strip()
+        ]
+        if not note_lines:
+            raise CommandError('No OCR fixtures found for the local backend.')
+
+        rng = random.Random(0)
+        corpus = '\n'.join(
+            rng.choice(note_lines if rng.random() < 0.6 else FILLER_LINES)
+            for _ in range(options['lines'])
+        )
+
+        service = AzureDocumentIntelligenceService(backend=backend)
+        compiled_findings = service._parse_findings(corpus)
+        if compiled_findings != reference_parse_findings(corpus):
+            raise CommandError('Compiled matcher results differ from the reference parser.')
+
+        reference_time = self._time(reference_parse_findings, corpus, options['rounds'])
+        compiled_time = self._time(service._parse_findings, corpus, options['rounds'])
+
+        self.stdout.write(f'Corpus: {options["lines"]} lines, {len(compiled_findings)} findings')
+        self.stdout.write(f'Keyword lists: median {reference_time * 1000:.1f}ms')
+        self.stdout.write(f'Compiled matcher: median {compiled_time * 1000:.1f}ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {reference_time / compiled_time:.1f}x'))
+
+    def _time(self, parse, corpus, rounds):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            parse(corpus)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,74 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService, LocalLayoutBackend
+from health_records.models import Assessment
+from health_records.ocr_jobs import save_extracted_findings
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the OCR findings pipeline offline using the local document intelligence backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=50,
+            help='Number of synthetic documents to process (default: 50)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Simulated OCR latency in seconds per document (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        doc_service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend(latency=options['latency']))
+        if not doc_service.is_configured():
+            self.stdout.write(self.style.ERROR('No OCR fixtures found for the local backend.'))
+            return
+
+        analyze_times = []
+        save_times = []
+        findings_total = 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir, transaction.atomic():
+            # Everything written here is rolled back at the end of the run
+            user = User.objects.create_user(username='ocr-benchmark-user')
+            assessment = Assessment.objects.create(user=user)
+
+            for i in range(options['documents']):
+                file_path = os.path.join(tmp_dir, f'notes-{i}.png')
+                with open(file_path, 'wb') as f:
+                    f.write(os.urandom(64 * 1024))
+
+                start = time.perf_counter()
+                extracted_data = doc_service.analyze_document(file_path)
+                analyze_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                findings_total += save_extracted_findings(assessment, extracted_data)
+                save_times.append(time.perf_counter() - start)
+
+            transaction.set_rollback(True)
+
+        total = sum(analyze_times) + sum(save_times)
+        self.stdout.write(f'Documents processed: {options["documents"]} ({findings_total} findings)')
+        self._report('Analyze + parse', analyze_times)
+        self._report('Save findings', save_times)
+        self.stdout.write(self.style.SUCCESS(f'Throughput: {options["documents"] / total:.1f} documents/second'))
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f'{label}: mean {statistics.mean(timings) * 1000:.2f}ms, '
+            f'p95 {p95 * 1000:.2f}ms, total {sum(timings):.3f}s'
+        )
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService
+from health_records.ocr_jobs import release_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued Azure Document Intelligence jobs for uploaded notes images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently in the queue and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Stop after processing this many jobs',
+        )
+
+    def handle(self, *args, **options):
+        doc_service = AzureDocumentIntelligenceService()
+        if not doc_service.is_configured():
+            self.stdout.write(self.style.WARNING(
+                'Azure Document Intelligence is not configured; queued jobs will be marked as failed.'
+            ))
+
+        self.stdout.write(self.style.SUCCESS('OCR worker started.'))
+        total_processed = 0
+
+        try:
+            while True:
+                release_stale_jobs()
+                remaining = None
+                if options['max_jobs'] is not None:
+                    remaining = options['max_jobs'] - total_processed
+
+                processed = run_pending_jobs(max_jobs=remaining, doc_service=doc_service)
+                total_processed += processed
+                if processed:
+                    self.stdout.write(f'Processed {processed} job(s).')
+
+                if options['once'] or (remaining is not None and processed >= remaining):
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping OCR worker.')
+
+        self.stdout.write(self.style.SUCCESS(f'OCR worker finished. {total_processed} job(s) processed.'))
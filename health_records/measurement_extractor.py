@@ -0,0 +1,312 @@
+"""
+Structured ROM and strength extraction from OCR'd therapy notes.
+
+Recognises joint, movement, side, range of motion in degrees and MRC strength
+grades (n/5) in the note text and in extracted tables, and maps them onto the
+objective measures form fields consumed by `aggregate_movement_fields`
+(e.g. 'knee_flexion_rom_left', 'lumbar_extension_rom').
+
+A whole document is tokenised with one precompiled regex; only the tokens
+(not every character or line) are then walked in Python, so long multi-page
+notes stay fast.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from clinicians import joint_choices
+from clinicians.joint_choices import SPINE_JOINTS
+
+# Movements recorded for each joint on the objective measures form
+JOINT_MOVEMENTS = {
+    joint: {movement for movement, _ in movements}
+    for joint, movements in joint_choices.JOINT_MOVEMENTS.items()
+}
+
+JOINT_TERMS = {
+    'shoulder': 'shoulder', 'glenohumeral': 'shoulder',
+    'elbow': 'elbow',
+    'wrist': 'wrist',
+    'hip': 'hip',
+    'knee': 'knee',
+    'ankle': 'ankle',
+    'cervical': 'cervical', 'neck': 'cervical', 'c-spine': 'cervical',
+    'lumbar': 'lumbar', 'low back': 'lumbar', 'lower back': 'lumbar', 'l-spine': 'lumbar',
+}
+
+# Muscle groups imply a joint and, where unambiguous, the movement they produce
+MUSCLE_TERMS = {
+    'quadriceps': ('knee', 'extension'), 'quads': ('knee', 'extension'),
+    'hamstring': ('knee', 'flexion'), 'hamstrings': ('knee', 'flexion'),
+    'hip flexors': ('hip', 'flexion'), 'iliopsoas': ('hip', 'flexion'),
+    'gluteus maximus': ('hip', 'extension'), 'gluteus medius': ('hip', 'abduction'),
+    'hip adductors': ('hip', 'adduction'),
+    'tibialis anterior': ('ankle', 'dorsiflexion'),
+    'calf': ('ankle', 'plantarflexion'), 'gastrocnemius': ('ankle', 'plantarflexion'),
+    'biceps': ('elbow', 'flexion'), 'triceps': ('elbow', 'extension'),
+    'deltoid': ('shoulder', 'abduction'),
+    'rotator cuff': ('shoulder', None),
+    'wrist flexors': ('wrist', 'flexion'), 'wrist extensors': ('wrist', 'extension'),
+}
+
+MOVEMENT_TERMS = {
+    'flexion': 'flexion', 'flex': 'flexion',
+    'extension': 'extension', 'ext': 'extension',
+    'abduction': 'abduction',
+    'adduction': 'adduction',
+    'internal rotation': 'internal_rotation', 'medial rotation': 'internal_rotation',
+    'external rotation': 'external_rotation', 'lateral rotation': 'external_rotation',
+    'dorsiflexion': 'dorsiflexion', 'dorsi flexion': 'dorsiflexion',
+    'plantarflexion': 'plantarflexion', 'plantar flexion': 'plantarflexion',
+    'inversion': 'inversion',
+    'eversion': 'eversion',
+    'radial deviation': 'radial_deviation',
+    'ulnar deviation': 'ulnar_deviation',
+    'lateral flexion': 'lateral_flexion', 'side flexion': 'lateral_flexion',
+    'rotation': 'rotation',
+}
+
+SIDE_TERMS = {
+    'left': ('left',), 'lt': ('left',), 'l': ('left',),
+    'right': ('right',), 'rt': ('right',), 'r': ('right',),
+    'bilaterally': ('left', 'right'), 'bilateral': ('left', 'right'), 'both': ('left', 'right'),
+}
+
+
+def _alternation(terms: Iterable[str]) -> str:
+    # Longest first, so 'external rotation' wins over 'rotation'
+    return '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+
+TOKEN_PATTERN = re.compile(
+    r'(?P<grade>(?<![\d/.])[0-5][+-]?\s*/\s*5(?![\d/]))'
+    r'|(?P<degrees>(?<![\w/.])-?\d{1,3}(?:\.\d)?(?=\s*(?:°|º|deg\b|degrees\b|degs\b)))'
+    r'|(?P<number>(?<![\w/.])-?\d{1,3}(?![\w/.]))'
+    rf'|\b(?P<muscle>{_alternation(MUSCLE_TERMS)})\b'
+    rf'|\b(?P<joint>{_alternation(JOINT_TERMS)})\b'
+    rf'|\b(?P<movement>{_alternation(MOVEMENT_TERMS)})\b'
+    rf'|\b(?P<side>{_alternation(SIDE_TERMS)})\b'
+    r'|(?P<line>\n)'
+    r'|(?P<clause>[,;]|\.(?!\d))',
+    re.IGNORECASE
+)
+
+
+def form_field(joint: str, movement: str, measure: str, side: Optional[str]) -> str:
+    """Name of the objective measures form field for a measurement"""
+    kind = 'rom' if measure == 'rom' else 'strength'
+    if joint in SPINE_JOINTS:
+        return f'{joint}_{movement}_{kind}'
+    return f'{joint}_{movement}_{kind}_{side}'
+
+
+def _resolve(joint, movement, sides, measure, value, source) -> List[Dict]:
+    """Turn a value and its context into form measurements, or nothing if it is ambiguous"""
+    if not joint or not movement:
+        return []
+
+    if joint in SPINE_JOINTS:
+        # 'lateral flexion left' / 'rotation right' are single spinal movements
+        if movement in ('lateral_flexion', 'rotation'):
+            if len(sides) != 1:
+                return []
+            movement = f'{movement}_{sides[0]}'
+        sides = (None,)
+    elif not sides:
+        return []
+
+    if movement not in JOINT_MOVEMENTS[joint]:
+        return []
+
+    return [
+        {
+            'joint': joint,
+            'movement': movement,
+            'side': side,
+            'measure': measure,
+            'value': value,
+            'field': form_field(joint, movement, measure, side),
+            'source': source,
+        }
+        for side in sides
+    ]
+
+
+def _normalise_value(kind: str, text: str) -> str:
+    text = text.replace(' ', '')
+    if kind == 'grade' or '.' in text:
+        return text
+    return str(int(text))
+
+
+def _extract_from_text(text: str) -> List[Dict]:
+    """
+    Walk the text's tokens, tracking joint, movement and side per clause.
+
+    Joint, movement and side carry over from earlier clauses on the same
+    line ('Left shoulder flexion 150 degrees, abduction 120 degrees'). A
+    side written after a value applies to it when the clause ends there
+    ('Quadriceps strength 4/5 right'), but belongs to the next mention
+    when a joint or movement follows ('110 degrees left knee flexion').
+    """
+    measurements = []
+    joint = movement = None
+    sides = ()
+    trailing_sides = ()
+    pending = []  # (measure, value) waiting for the clause's context
+
+    def flush(use_trailing):
+        nonlocal sides, trailing_sides
+        value_sides = trailing_sides if (use_trailing and trailing_sides) else sides
+        for measure, value in pending:
+            measurements.extend(_resolve(joint, movement, value_sides, measure, value, 'text'))
+        pending.clear()
+        sides = trailing_sides or sides
+        trailing_sides = ()
+
+    for token in TOKEN_PATTERN.finditer(text):
+        kind = token.lastgroup
+        word = token.group(kind).lower()
+
+        if kind == 'line':
+            flush(True)
+            joint = movement = None
+            sides = ()
+        elif kind == 'clause':
+            flush(True)
+        elif kind in ('grade', 'degrees'):
+            pending.append(('strength' if kind == 'grade' else 'rom', _normalise_value(kind, word)))
+        elif kind == 'side':
+            if pending:
+                trailing_sides = SIDE_TERMS[word]
+            else:
+                sides = SIDE_TERMS[word]
+        elif kind == 'movement':
+            if pending and movement:
+                # A new movement after a value starts the next measurement
+                flush(False)
+            movement = MOVEMENT_TERMS[word]
+        elif kind == 'joint':
+            if pending:
+                flush(False)
+            joint = JOINT_TERMS[word]
+            movement = None
+        elif kind == 'muscle':
+            if pending:
+                flush(False)
+            joint, movement = MUSCLE_TERMS[word]
+
+    flush(True)
+    return measurements
+
+
+def _table_rows(table: Dict) -> List[List[str]]:
+    grid = [[''] * table.get('column_count', 0) for _ in range(table.get('row_count', 0))]
+    for cell in table.get('cells', []):
+        row, column = cell.get('row_index'), cell.get('column_index')
+        if row is not None and column is not None and row < len(grid) and column < len(grid[row]):
+            grid[row][column] = cell.get('content') or ''
+    return grid
+
+
+def _label_context(label: str):
+    joint = movement = None
+    sides = ()
+    for token in TOKEN_PATTERN.finditer(label):
+        kind = token.lastgroup
+        word = token.group(kind).lower()
+        if kind == 'joint':
+            joint = JOINT_TERMS[word]
+        elif kind == 'muscle':
+            joint, muscle_movement = MUSCLE_TERMS[word]
+            movement = muscle_movement or movement
+        elif kind == 'movement':
+            movement = MOVEMENT_TERMS[word]
+        elif kind == 'side':
+            sides = SIDE_TERMS[word]
+    return joint, movement, sides
+
+
+def _cell_value(content: str):
+    for token in TOKEN_PATTERN.finditer(content):
+        kind = token.lastgroup
+        if kind == 'grade':
+            return 'strength', _normalise_value(kind, token.group(kind))
+        if kind in ('degrees', 'number'):
+            return 'rom', _normalise_value(kind, token.group(kind))
+    return None
+
+
+def _extract_from_tables(tables: List[Dict]) -> List[Dict]:
+    """
+    Read measurement tables laid out as a movement label column and value columns.
+
+    The header row decides each value column's side ('Left', 'Right'); a row
+    label without a joint inherits the joint of the row above it.
+    """
+    measurements = []
+    for table in tables:
+        rows = _table_rows(table)
+        if len(rows) < 2 or len(rows[0]) < 2:
+            continue
+
+        column_sides = [SIDE_TERMS.get(header.strip().lower(), ()) for header in rows[0]]
+        joint = None
+        for row in rows[1:]:
+            row_joint, movement, label_sides = _label_context(row[0])
+            joint = row_joint or joint
+            for column, content in enumerate(row[1:], start=1):
+                value = _cell_value(content)
+                if value is None:
+                    continue
+                measure, number = value
+                sides = column_sides[column] or label_sides
+                measurements.extend(_resolve(joint, movement, sides, measure, number, 'table'))
+    return measurements
+
+
+def extract_measurements(text: str, tables: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Extract ROM and strength measurements from note text and tables.
+
+    Args:
+        text: Raw text of the document
+        tables: Tables in the shape produced by AzureDocumentIntelligenceService
+
+    Returns:
+        List of measurement dicts with joint, movement, side, measure
+        ('rom' or 'strength'), value, form field name and source
+    """
+    measurements = _extract_from_text(text or '')
+    measurements.extend(_extract_from_tables(tables or []))
+    return measurements
+
+
+def measurement_fields(measurements: List[Dict]) -> Dict[str, str]:
+    """
+    Map measurements onto objective measures form fields.
+
+    Table values take precedence over values found in the text, and later
+    values over earlier ones.
+    """
+    fields = {}
+    for source in ('text', 'table'):
+        for measurement in measurements:
+            if measurement['source'] == source:
+                fields[measurement['field']] = measurement['value']
+    return fields
+
+
+def draft_fields_for_assessment(assessment) -> Dict[str, str]:
+    """
+    Objective measures form values read from an assessment's latest analysed notes.
+
+    Extractions saved before measurements were extracted are parsed on demand.
+    """
+    extraction = assessment.document_extractions.order_by('-created_at').first()
+    if extraction is None:
+        return {}
+
+    measurements = extraction.data.get('measurements')
+    if measurements is None:
+        measurements = extract_measurements(extraction.data.get('raw_text', ''), extraction.data.get('tables'))
+    return measurement_fields(measurements)
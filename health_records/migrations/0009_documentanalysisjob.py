@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0008_alter_assessment_practitioner_notes_image_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentAnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', help_text='Current state of the job', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times a worker has claimed this job')),
+                ('findings_count', models.PositiveIntegerField(default=0, help_text='Number of findings extracted when the job completed')),
+                ('error', models.TextField(blank=True, help_text='Error message if the job failed')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('assessment', models.ForeignKey(help_text='Assessment whose notes image is being analysed', on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='health_records.assessment')),
+                ('requested_by', models.ForeignKey(blank=True, help_text='User who requested the analysis', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='analysis_job_queue_idx')],
+            },
+        ),
+    ]
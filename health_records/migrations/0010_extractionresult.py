@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0009_documentanalysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text="SHA-256 hex digest of the analysed file's bytes", max_length=64)),
+                ('model_id', models.CharField(help_text='Document analysis model that produced the result', max_length=100)),
+                ('result', models.JSONField(help_text='Layout data extracted from the document (text, pages, tables, key-value pairs)')),
+                ('file_size', models.PositiveBigIntegerField(default=0, help_text='Size of the analysed file in bytes')),
+                ('hit_count', models.PositiveIntegerField(default=0, help_text='Number of times this result was reused instead of calling the OCR service')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+                'unique_together': {('content_hash', 'model_id')},
+            },
+        ),
+    ]
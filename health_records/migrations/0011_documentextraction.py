@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0010_extractionresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(help_text='Raw data from Azure Document Intelligence')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assessment', models.ForeignKey(help_text='Assessment whose notes image was analysed', on_delete=django.db.models.deletion.CASCADE, related_name='document_extractions', to='health_records.assessment')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='extractedfindings',
+            name='extraction',
+            field=models.ForeignKey(blank=True, help_text='Document analysis this finding was extracted from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='findings', to='health_records.documentextraction'),
+        ),
+    ]
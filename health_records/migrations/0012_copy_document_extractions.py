@@ -0,0 +1,55 @@
+import json
+
+from django.db import migrations
+
+
+def move_raw_extraction_data(apps, schema_editor):
+    """Store each distinct OCR payload once and point its findings at it"""
+    ExtractedFindings = apps.get_model('health_records', 'ExtractedFindings')
+    DocumentExtraction = apps.get_model('health_records', 'DocumentExtraction')
+    
+    assessment_ids = (
+        ExtractedFindings.objects
+        .filter(raw_extraction_data__isnull=False)
+        .order_by('assessment_id')
+        .values_list('assessment_id', flat=True)
+        .distinct()
+    )
+    for assessment_id in assessment_ids:
+        # Findings saved from the same analysis carry identical copies of the payload
+        groups = {}
+        findings = (
+            ExtractedFindings.objects
+            .filter(assessment_id=assessment_id, raw_extraction_data__isnull=False)
+            .order_by('extracted_at', 'pk')
+            .values_list('pk', 'extracted_at', 'raw_extraction_data')
+        )
+        for pk, extracted_at, data in findings:
+            key = json.dumps(data, sort_keys=True)
+            if key not in groups:
+                groups[key] = {'data': data, 'extracted_at': extracted_at, 'finding_ids': []}
+            groups[key]['finding_ids'].append(pk)
+        
+        for group in groups.values():
+            extraction = DocumentExtraction.objects.create(assessment_id=assessment_id, data=group['data'])
+            DocumentExtraction.objects.filter(pk=extraction.pk).update(created_at=group['extracted_at'])
+            ExtractedFindings.objects.filter(pk__in=group['finding_ids']).update(extraction=extraction)
+
+
+def restore_raw_extraction_data(apps, schema_editor):
+    """Copy each extraction's payload back onto its findings"""
+    DocumentExtraction = apps.get_model('health_records', 'DocumentExtraction')
+    
+    for extraction in DocumentExtraction.objects.iterator():
+        extraction.findings.update(raw_extraction_data=extraction.data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0011_documentextraction'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_raw_extraction_data, restore_raw_extraction_data),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0012_copy_document_extractions'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='extractedfindings',
+            name='raw_extraction_data',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0013_remove_extractedfindings_raw_extraction_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='practitioner_notes_thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text="Small preview of the practitioner's notes photo", null=True, upload_to='practitioner_notes/thumbnails/%Y/%m/%d/'),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='prescription_thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text='Small preview of the prescription photo', null=True, upload_to='prescriptions/thumbnails/%Y/%m/%d/'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicians', '0009_query_indexes'),
+        ('health_records', '0014_image_thumbnails'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['user', '-assessment_date', '-created_at'], name='assessment_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='condition',
+            index=models.Index(fields=['user', 'status'], name='condition_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='extractedfindings',
+            index=models.Index(fields=['assessment', 'category', 'extracted_at'], name='finding_assessment_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user'], name='medication_active_user_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .image_processing import normalize_image_field
 from .validators import validate_image_file
 
 
@@ -25,6 +26,10 @@ class Condition(models.Model):
 
     class Meta:
         ordering = ['-diagnosis_date', '-created_at']
+        indexes = [
+            # Per-patient counts of conditions by status (client list)
+            models.Index(fields=['user', 'status'], name='condition_user_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.name}"
@@ -50,6 +55,13 @@ class Medication(models.Model):
         validators=[validate_image_file],
         help_text="Photo of prescription if available"
     )
+    prescription_thumbnail = models.ImageField(
+        upload_to='prescriptions/thumbnails/%Y/%m/%d/',
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Small preview of the prescription photo"
+    )
     notes = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -57,11 +69,30 @@ class Medication(models.Model):
 
     class Meta:
         ordering = ['-is_active', '-start_date', '-created_at']
+        indexes = [
+            # Per-patient counts of active medications (client list)
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_active=True),
+                name='medication_active_user_idx',
+            ),
+        ]
 
     def __str__(self):
         prescribed_status = "Prescribed" if self.is_prescribed else "Non-prescribed"
         return f"{self.user.username} - {self.name} ({prescribed_status})"
 
+    def save(self, *args, **kwargs):
+        # Downscale and strip metadata from a newly uploaded photo before storing it
+        normalize_image_field(self, 'prescription_image', 'prescription_thumbnail')
+        super().save(*args, **kwargs)
+    
+    @property
+    def prescription_preview_url(self):
+        """URL of the prescription thumbnail, or of the full photo if it has none"""
+        image = self.prescription_thumbnail or self.prescription_image
+        return image.url if image else None
+
 
 class Allergy(models.Model):
     """Allergies and adverse reactions"""
@@ -165,6 +196,13 @@ class Assessment(models.Model):
         validators=[validate_image_file],
         help_text="Photo of practitioner's notes if available"
     )
+    practitioner_notes_thumbnail = models.ImageField(
+        upload_to='practitioner_notes/thumbnails/%Y/%m/%d/',
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Small preview of the practitioner's notes photo"
+    )
     completed_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -176,6 +214,10 @@ class Assessment(models.Model):
 
     class Meta:
         ordering = ['-assessment_date', '-symptom_date', '-created_at']
+        indexes = [
+            # A patient's assessments newest first, and their latest visit
+            models.Index(fields=['user', '-assessment_date', '-created_at'], name='assessment_user_date_idx'),
+        ]
 
     def __str__(self):
         if self.assessment_date:
@@ -185,10 +227,21 @@ class Assessment(models.Model):
         else:
             return f"{self.user.username} - Assessment Entry"
     
+    def save(self, *args, **kwargs):
+        # Downscale and strip metadata from a newly uploaded photo before storing it
+        normalize_image_field(self, 'practitioner_notes_image', 'practitioner_notes_thumbnail')
+        super().save(*args, **kwargs)
+    
+    @property
+    def notes_image_preview_url(self):
+        """URL of the notes photo thumbnail, or of the full photo if it has none"""
+        image = self.practitioner_notes_thumbnail or self.practitioner_notes_image
+        return image.url if image else None
+    
     @property
     def has_practitioner_data(self):
         """Check if practitioner has added objective assessment data"""
-        return bool(self.clinician or self.objective_findings or self.treatment_plan)
+        return bool(self.clinician_id or self.objective_findings or self.treatment_plan)
     
     @property
     def has_user_symptoms(self):
@@ -261,6 +314,26 @@ class WorkHistory(models.Model):
         return [activity_dict.get(activity, activity) for activity in self.activities]
 
 
+class DocumentExtraction(models.Model):
+    """Raw Azure Document Intelligence output for one analysis of an assessment's notes"""
+    assessment = models.ForeignKey(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='document_extractions',
+        help_text="Assessment whose notes image was analysed"
+    )
+    data = models.JSONField(
+        help_text="Raw data from Azure Document Intelligence"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Extraction for assessment {self.assessment_id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
 class ExtractedFindings(models.Model):
     """Extracted findings from therapist notes using Azure Document Intelligence"""
     assessment = models.ForeignKey(
@@ -305,10 +378,13 @@ class ExtractedFindings(models.Model):
     )
     
     # Metadata
-    raw_extraction_data = models.JSONField(
+    extraction = models.ForeignKey(
+        DocumentExtraction,
+        on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        help_text="Raw data from Azure Document Intelligence"
+        related_name='findings',
+        help_text="Document analysis this finding was extracted from"
     )
     
     extracted_at = models.DateTimeField(
@@ -339,6 +415,102 @@ class ExtractedFindings(models.Model):
     class Meta:
         ordering = ['-extracted_at', 'category']
         verbose_name_plural = 'Extracted Findings'
+        indexes = [
+            # An assessment's findings grouped by category (findings page and JSON)
+            models.Index(fields=['assessment', 'category', 'extracted_at'], name='finding_assessment_cat_idx'),
+        ]
     
     def __str__(self):
         return f"Finding: {self.text[:50]}... ({self.get_category_display()})"
+
+
+class DocumentAnalysisJob(models.Model):
+    """Queued Azure Document Intelligence job for an assessment's notes image"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    assessment = models.ForeignKey(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='analysis_jobs',
+        help_text="Assessment whose notes image is being analysed"
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='analysis_jobs',
+        help_text="User who requested the analysis"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Current state of the job"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times a worker has claimed this job"
+    )
+    findings_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of findings extracted when the job completed"
+    )
+    error = models.TextField(
+        blank=True,
+        help_text="Error message if the job failed"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='analysis_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Analysis job {self.pk} for assessment {self.assessment_id} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        """Check if the job has reached a terminal state"""
+        return self.status in ('completed', 'failed')
+
+
+class ExtractionResult(models.Model):
+    """Cached document analysis result keyed by file content hash and model"""
+    content_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 hex digest of the analysed file's bytes"
+    )
+    model_id = models.CharField(
+        max_length=100,
+        help_text="Document analysis model that produced the result"
+    )
+    result = models.JSONField(
+        help_text="Layout data extracted from the document (text, pages, tables, key-value pairs)"
+    )
+    file_size = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Size of the analysed file in bytes"
+    )
+    hit_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times this result was reused instead of calling the OCR service"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-last_used_at']
+        unique_together = ['content_hash', 'model_id']
+    
+    def __str__(self):
+        return f"{self.model_id} result for {self.content_hash[:12]}"
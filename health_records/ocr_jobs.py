@@ -0,0 +1,203 @@
+"""
+Database-backed job queue for Azure Document Intelligence processing.
+
+Upload views enqueue a DocumentAnalysisJob and return immediately; the
+`manage.py ocr_worker` command claims jobs and runs the slow OCR call
+outside the web workers.
+"""
+import logging
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentAnalysisJob, DocumentExtraction, ExtractedFindings
+
+logger = logging.getLogger(__name__)
+
+# Jobs stuck in 'processing' longer than this are assumed to belong to a dead worker
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+# A job is given up on after this many claims
+MAX_ATTEMPTS = 3
+
+
+def save_extracted_findings(assessment, extracted_data: Dict) -> int:
+    """
+    Replace an assessment's extracted findings with those in extracted_data.
+
+    The raw OCR payload is stored once in a DocumentExtraction that the
+    findings reference, and the findings are inserted in a single query.
+
+    Returns:
+        Number of findings created
+    """
+    with transaction.atomic():
+        # Delete existing extracted findings for this assessment (if any)
+        ExtractedFindings.objects.filter(assessment=assessment).delete()
+        DocumentExtraction.objects.filter(assessment=assessment).defer('data').delete()
+
+        extraction = DocumentExtraction.objects.create(assessment=assessment, data=extracted_data)
+        findings = ExtractedFindings.objects.bulk_create([
+            ExtractedFindings(
+                assessment=assessment,
+                extraction=extraction,
+                category=finding_data.get('category', 'general'),
+                finding_type=finding_data.get('type', 'observation'),
+                text=finding_data.get('text', ''),
+            )
+            for finding_data in extracted_data.get('findings', [])
+        ])
+
+    return len(findings)
+
+
+def enqueue_analysis(assessment, requested_by=None) -> DocumentAnalysisJob:
+    """
+    Queue an assessment's notes image for analysis.
+
+    If a job for the assessment is already waiting, it is reused so that
+    repeated clicks do not queue duplicate OCR calls.
+    """
+    existing = DocumentAnalysisJob.objects.filter(
+        assessment=assessment,
+        status='pending'
+    ).first()
+    if existing:
+        return existing
+
+    job = DocumentAnalysisJob.objects.create(
+        assessment=assessment,
+        requested_by=requested_by if requested_by and requested_by.is_authenticated else None,
+    )
+    logger.info(f"Queued analysis job {job.pk} for assessment {assessment.pk}")
+    return job
+
+
+def claim_next_job() -> Optional[DocumentAnalysisJob]:
+    """
+    Atomically claim the oldest pending job, or return None if the queue is empty.
+
+    On databases with row locking (PostgreSQL) this uses
+    SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never block on
+    or double-claim the same row. SQLite has no row locks, so there a job
+    is claimed with a conditional UPDATE that only one worker can win.
+    """
+    now = timezone.now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = (
+                DocumentAnalysisJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('created_at', 'pk')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = 'processing'
+            job.attempts += 1
+            job.started_at = now
+            job.save(update_fields=['status', 'attempts', 'started_at'])
+            return job
+
+    pending_ids = (
+        DocumentAnalysisJob.objects
+        .filter(status='pending')
+        .order_by('created_at', 'pk')
+        .values_list('pk', flat=True)[:10]
+    )
+    for job_id in pending_ids:
+        claimed = DocumentAnalysisJob.objects.filter(pk=job_id, status='pending').update(
+            status='processing',
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if claimed:
+            return DocumentAnalysisJob.objects.get(pk=job_id)
+    return None
+
+
+def release_stale_jobs() -> int:
+    """
+    Return jobs abandoned by a crashed worker to the queue.
+
+    Jobs that have already been claimed MAX_ATTEMPTS times are marked failed.
+
+    Returns:
+        Number of jobs released or failed
+    """
+    now = timezone.now()
+    stale = DocumentAnalysisJob.objects.filter(
+        status='processing',
+        started_at__lt=now - STALE_JOB_TIMEOUT
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed',
+        error='Job timed out too many times.',
+        finished_at=now,
+    )
+    released = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='pending', started_at=None)
+    if failed or released:
+        logger.warning(f"Released {released} and failed {failed} stale analysis jobs")
+    return failed + released
+
+
+def process_job(job: DocumentAnalysisJob, doc_service=None) -> DocumentAnalysisJob:
+    """
+    Run Azure Document Intelligence for a claimed job and store its findings.
+
+    Errors are recorded on the job rather than raised, so one bad document
+    does not stop the worker.
+    """
+    from .azure_doc_intelligence import AzureDocumentIntelligenceService
+
+    assessment = job.assessment
+    doc_service = doc_service or AzureDocumentIntelligenceService()
+
+    try:
+        if not assessment.practitioner_notes_image:
+            raise ValueError('No notes image found for this assessment.')
+        if not doc_service.is_configured():
+            raise ValueError('Azure Document Intelligence is not configured.')
+
+        # Read through the storage backend, not a local path: the worker may run
+        # on another host from the web process that saved the upload
+        with assessment.practitioner_notes_image.open('rb') as notes_image:
+            extracted_data = doc_service.analyze_document(notes_image)
+        if not extracted_data:
+            raise ValueError('Failed to extract data from the notes image.')
+
+        job.findings_count = save_extracted_findings(assessment, extracted_data)
+        job.status = 'completed'
+        job.error = ''
+        logger.info(f"Analysis job {job.pk} extracted {job.findings_count} findings")
+    except Exception as e:
+        logger.error(f"Analysis job {job.pk} failed: {e}")
+        logger.exception("Full traceback:")
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'findings_count', 'error', 'finished_at'])
+    return job
+
+
+def run_pending_jobs(max_jobs: Optional[int] = None, doc_service=None) -> int:
+    """
+    Claim and process jobs until the queue is empty or max_jobs is reached.
+
+    Returns:
+        Number of jobs processed
+    """
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        process_job(job, doc_service=doc_service)
+        processed += 1
+    return processed
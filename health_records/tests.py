@@ -1,7 +1,11 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
-from .models import Medication, Condition, Allergy, Assessment
+from .models import Medication, Condition, Allergy, Assessment, DocumentAnalysisJob, DocumentExtraction, ExtractedFindings, ExtractionResult
+from .ocr_jobs import claim_next_job, enqueue_analysis, run_pending_jobs, save_extracted_findings
+from .azure_doc_intelligence import AzureDocumentIntelligenceService, LocalLayoutBackend, get_backend
+from .finding_matcher import match_line
+from .measurement_extractor import extract_measurements, measurement_fields
 from accounts.models import UserProfile
 
 
@@ -170,3 +174,887 @@ class AssessmentTests(TestCase):
         )
         self.assertEqual(assessment.user, self.user)
         self.assertIn(assessment, self.user.assessments.all())
+    
+    def test_practitioner_views_reject_non_clinicians(self):
+        """Test that a patient cannot add to or edit an assessment that has no clinician"""
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        assessment = Assessment.objects.create(user=other, current_symptoms='Test symptoms')
+        for url in (
+            reverse('health_records:add_practitioner_assessment', args=[assessment.pk]),
+            reverse('health_records:edit_practitioner_assessment', args=[assessment.pk]),
+        ):
+            response = self.client.post(url, {'objective_findings': 'Tampered'})
+            self.assertRedirects(response, reverse('health_records:dashboard'), fetch_redirect_response=False)
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.objective_findings, '')
+
+
+class FakeDocumentService:
+    """Stand-in for AzureDocumentIntelligenceService that returns canned results"""
+    
+    def __init__(self, extracted_data=None, error=None):
+        self.extracted_data = extracted_data
+        self.error = error
+        self.calls = []
+    
+    def is_configured(self):
+        return True
+    
+    def analyze_document(self, document):
+        self.calls.append(document.read())
+        if self.error:
+            raise Exception(self.error)
+        return self.extracted_data
+
+
+@override_settings(
+    AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT='https://example.cognitiveservices.azure.com/',
+    AZURE_DOCUMENT_INTELLIGENCE_KEY='test-key',
+    # A storage with no local paths, like the remote storage a separate worker dyno needs
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+class DocumentAnalysisJobTests(TestCase):
+    """Test the background OCR job queue"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        self.assessment = Assessment.objects.create(
+            user=self.user,
+            practitioner_notes_image=default_storage.save('practitioner_notes/notes.png', ContentFile(b'notes image'))
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.extracted_data = {
+            'raw_text': 'Knee flexion 90 degrees',
+            'findings': [
+                {'category': 'measurements', 'type': 'measurement', 'text': 'Knee flexion 90 degrees'},
+            ],
+        }
+    
+    def test_process_notes_image_queues_job(self):
+        """Test that processing returns immediately with a job id instead of running OCR"""
+        response = self.client.get(
+            reverse('health_records:process_notes_image', args=[self.assessment.pk]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        job = DocumentAnalysisJob.objects.get(pk=data['job_id'])
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.assessment, self.assessment)
+        self.assertEqual(data['status_url'], reverse('health_records:analysis_job_status', args=[job.pk]))
+    
+    def test_repeat_requests_reuse_pending_job(self):
+        """Test that clicking process twice does not queue duplicate jobs"""
+        first = enqueue_analysis(self.assessment, requested_by=self.user)
+        second = enqueue_analysis(self.assessment, requested_by=self.user)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(DocumentAnalysisJob.objects.count(), 1)
+    
+    def test_claim_next_job_claims_oldest_once(self):
+        """Test that jobs are claimed in order and never twice"""
+        other = Assessment.objects.create(user=self.user, practitioner_notes_image='practitioner_notes/other.png')
+        first = enqueue_analysis(self.assessment)
+        second = enqueue_analysis(other)
+        self.assertEqual(claim_next_job().pk, first.pk)
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, second.pk)
+        self.assertEqual(claimed.status, 'processing')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_next_job())
+    
+    def test_worker_stores_findings(self):
+        """Test that the worker runs OCR and saves findings"""
+        job = enqueue_analysis(self.assessment)
+        doc_service = FakeDocumentService(extracted_data=self.extracted_data)
+        self.assertEqual(run_pending_jobs(doc_service=doc_service), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.findings_count, 1)
+        self.assertEqual(doc_service.calls, [b'notes image'])
+        self.assertEqual(ExtractedFindings.objects.filter(assessment=self.assessment).count(), 1)
+    
+    def test_worker_records_failures(self):
+        """Test that OCR errors mark the job as failed without raising"""
+        job = enqueue_analysis(self.assessment)
+        run_pending_jobs(doc_service=FakeDocumentService(error='Service unavailable'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Service unavailable', job.error)
+    
+    def test_job_status_endpoint(self):
+        """Test that the owner can poll job status and other users cannot"""
+        job = enqueue_analysis(self.assessment)
+        run_pending_jobs(doc_service=FakeDocumentService(extracted_data=self.extracted_data))
+        response = self.client.get(reverse('health_records:analysis_job_status', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'completed')
+        self.assertTrue(data['is_finished'])
+        self.assertEqual(data['findings_count'], 1)
+        
+        User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.login(username='otheruser', password='testpass123')
+        response = self.client.get(reverse('health_records:analysis_job_status', args=[job.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class LocalLayoutBackendTests(TestCase):
+    """Test the offline fixture-driven OCR backend"""
+    
+    def setUp(self):
+        """Write a sample document to disk"""
+        import tempfile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_path = f'{self.tmp_dir.name}/notes.png'
+        with open(self.file_path, 'wb') as f:
+            f.write(b'sample notes image')
+    
+    def test_results_match_prebuilt_layout_shape(self):
+        """Test that the local engine yields content, pages, tables and key-value pairs"""
+        service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend())
+        self.assertTrue(service.is_configured())
+        extracted_data = service.analyze_document(self.file_path)
+        self.assertTrue(extracted_data['raw_text'])
+        self.assertTrue(extracted_data['pages'])
+        self.assertTrue(extracted_data['tables'][0]['cells'])
+        self.assertTrue(extracted_data['key_value_pairs'])
+        self.assertTrue(extracted_data['findings'])
+    
+    def test_results_are_deterministic(self):
+        """Test that the same document always returns the same result"""
+        service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend())
+        self.assertEqual(service.analyze_document(self.file_path), service.analyze_document(self.file_path))
+    
+    def test_file_from_storage_matches_path(self):
+        """Test that a document opened through a storage backend is analysed like one read by path"""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import InMemoryStorage
+        storage = InMemoryStorage()
+        with open(self.file_path, 'rb') as f:
+            name = storage.save('notes.png', ContentFile(f.read()))
+        
+        service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend(), use_cache=False)
+        with storage.open(name, 'rb') as document:
+            self.assertEqual(service.analyze_document(document), service.analyze_document(self.file_path))
+    
+    def test_latency_is_configurable(self):
+        """Test that the simulated latency is applied"""
+        import time
+        service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend(latency=0.05))
+        start = time.perf_counter()
+        service.analyze_document(self.file_path)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+    
+    @override_settings(DOCUMENT_INTELLIGENCE_BACKEND='local')
+    def test_backend_selected_from_settings(self):
+        """Test that DOCUMENT_INTELLIGENCE_BACKEND selects the engine"""
+        self.assertIsInstance(AzureDocumentIntelligenceService().backend, LocalLayoutBackend)
+        with self.assertRaises(ValueError):
+            get_backend('unknown')
+    
+    def test_azure_backend_sends_raw_bytes(self):
+        """Test that the Azure backend streams the file as application/octet-stream"""
+        from unittest import mock
+        from .azure_doc_intelligence import AzureLayoutBackend
+        backend = AzureLayoutBackend(endpoint='https://example.invalid/', api_key='key')
+        with open(self.file_path, 'rb') as document, \
+                mock.patch.object(backend.client, 'begin_analyze_document') as begin:
+            backend.analyze(document)
+        self.assertIs(begin.call_args.kwargs['body'], document)
+        self.assertEqual(begin.call_args.kwargs['content_type'], 'application/octet-stream')
+
+
+class CountingLayoutBackend(LocalLayoutBackend):
+    """Local backend that records how many times the OCR engine was called"""
+    
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+    
+    def analyze(self, document):
+        self.calls += 1
+        return super().analyze(document)
+
+
+class ExtractionResultCacheTests(TestCase):
+    """Test the content-hash cache of document analysis results"""
+    
+    def setUp(self):
+        """Write sample documents to disk"""
+        import tempfile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.backend = CountingLayoutBackend()
+        self.service = AzureDocumentIntelligenceService(backend=self.backend)
+    
+    def _write_document(self, name, content):
+        file_path = f'{self.tmp_dir.name}/{name}'
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+    
+    def test_repeat_analysis_uses_cache(self):
+        """Test that identical file content is only sent to the OCR engine once"""
+        first = self._write_document('first.png', b'same notes image')
+        copy = self._write_document('copy.png', b'same notes image')
+        
+        original = self.service.analyze_document(first)
+        cached = self.service.analyze_document(copy)
+        
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(cached, original)
+        self.assertTrue(cached['findings'])
+        result = ExtractionResult.objects.get()
+        self.assertEqual(result.model_id, self.backend.model_id)
+        self.assertEqual(result.hit_count, 1)
+        self.assertNotIn('findings', result.result)
+    
+    def test_cache_is_keyed_by_model(self):
+        """Test that a result from another model is not reused"""
+        file_path = self._write_document('notes.png', b'notes image')
+        self.service.analyze_document(file_path)
+        ExtractionResult.objects.update(model_id='prebuilt-read')
+        
+        self.service.analyze_document(file_path)
+        self.assertEqual(self.backend.calls, 2)
+    
+    @override_settings(DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_results_are_evicted(self):
+        """Test that the cache stays within its size limit"""
+        service = AzureDocumentIntelligenceService(backend=self.backend)
+        first = self._write_document('1.png', b'first')
+        second = self._write_document('2.png', b'second')
+        third = self._write_document('3.png', b'third')
+        
+        service.analyze_document(first)
+        service.analyze_document(second)
+        service.analyze_document(first)  # first is now more recently used than second
+        service.analyze_document(third)
+        
+        self.assertEqual(ExtractionResult.objects.count(), 2)
+        self.assertEqual(self.backend.calls, 3)
+        service.analyze_document(first)
+        self.assertEqual(self.backend.calls, 3)
+        service.analyze_document(second)
+        self.assertEqual(self.backend.calls, 4)
+    
+    @override_settings(DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES=0)
+    def test_cache_can_be_disabled(self):
+        """Test that a zero size limit turns the cache off"""
+        service = AzureDocumentIntelligenceService(backend=self.backend)
+        file_path = self._write_document('notes.png', b'notes image')
+        service.analyze_document(file_path)
+        service.analyze_document(file_path)
+        self.assertEqual(self.backend.calls, 2)
+        self.assertFalse(ExtractionResult.objects.exists())
+
+
+class SaveExtractedFindingsTests(TestCase):
+    """Test storing OCR findings against a single extraction record"""
+    
+    def setUp(self):
+        """Set up an assessment and an OCR payload with several findings"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.assessment = Assessment.objects.create(user=user)
+        self.extracted_data = {
+            'raw_text': 'Knee flexion 110 degrees\nQuadriceps strength grade 4/5\nPain on stairs',
+            'tables': [],
+            'findings': [
+                {'category': 'measurements', 'type': 'measurement', 'text': 'Knee flexion 110 degrees'},
+                {'category': 'measurements', 'type': 'strength', 'text': 'Quadriceps strength grade 4/5'},
+                {'category': 'symptoms', 'type': 'symptom', 'text': 'Pain on stairs'},
+            ],
+        }
+    
+    def test_payload_is_stored_once(self):
+        """Test that all findings reference one copy of the raw data"""
+        with self.assertNumQueries(6):
+            self.assertEqual(save_extracted_findings(self.assessment, self.extracted_data), 3)
+        
+        extraction = DocumentExtraction.objects.get()
+        self.assertEqual(extraction.data, self.extracted_data)
+        self.assertEqual(extraction.findings.count(), 3)
+        self.assertEqual(
+            list(self.assessment.extracted_findings.order_by('pk').values_list('finding_type', flat=True)),
+            ['measurement', 'strength', 'symptom']
+        )
+    
+    def test_reprocessing_replaces_previous_extraction(self):
+        """Test that saving again leaves only the latest extraction and findings"""
+        save_extracted_findings(self.assessment, self.extracted_data)
+        self.extracted_data['findings'] = self.extracted_data['findings'][:1]
+        save_extracted_findings(self.assessment, self.extracted_data)
+        
+        self.assertEqual(DocumentExtraction.objects.count(), 1)
+        self.assertEqual(self.assessment.extracted_findings.count(), 1)
+
+
+class FindingMatcherTests(TestCase):
+    """Test the compiled keyword matcher used to parse findings"""
+    
+    def test_matches_reference_parser(self):
+        """Test that parsing gives the same findings as the original keyword lists"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .management.commands.benchmark_findings_parser import reference_parse_findings
+        
+        text = '\n'.join([
+            'Assessment',
+            'Knee range of motion limited to 95 degrees',
+            'Patient promotion at work',  # 'rom' and 'motion' overlap
+            'Quadriceps strength grade 4/5',
+            'Plan',
+            '  Home exercise programme, improved tolerance  ',
+            'Pain',
+            'Short pain',
+            'Reports discomfort on stairs',
+            'Full ROM',
+            'Tenderness over the İT band',  # lowercases to a longer string
+        ])
+        service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend())
+        self.assertEqual(service._parse_findings(text), reference_parse_findings(text))
+        
+        output = StringIO()
+        call_command('benchmark_findings_parser', lines=200, rounds=1, stdout=output)
+        self.assertIn('Speedup', output.getvalue())
+    
+    def test_line_match(self):
+        """Test that one scan yields category, finding flag and type"""
+        match = match_line('Hip range of motion: flexion 110 degrees')
+        self.assertEqual(match, ('measurements', True, 'measurement'))
+        self.assertEqual(match_line('Treatment plan'), ('treatment', False, 'treatment'))
+        self.assertEqual(match_line('Nothing to note here'), (None, False, 'observation'))
+
+
+class MeasurementExtractionTests(TestCase):
+    """Test structured ROM and strength extraction from notes"""
+    
+    def test_text_measurements(self):
+        """Test joint, movement, side, degrees and grades in free text"""
+        text = '\n'.join([
+            'Left shoulder flexion 150 degrees, abduction 120° with painful arc',
+            'Hamstring power grade 4/5 bilaterally',
+            'Lumbar flexion limited to 40 degrees',
+            'Cervical rotation left 70°, right 60°',
+            'Straight leg raise 60 degrees left',  # no joint, so not a form field
+            'Ankle dorsiflexion 15 degrees',  # no side for a bilateral joint
+        ])
+        self.assertEqual(measurement_fields(extract_measurements(text)), {
+            'shoulder_flexion_rom_left': '150',
+            'shoulder_abduction_rom_left': '120',
+            'knee_flexion_strength_left': '4/5',
+            'knee_flexion_strength_right': '4/5',
+            'lumbar_flexion_rom': '40',
+            'cervical_rotation_left_rom': '70',
+            'cervical_rotation_right_rom': '60',
+        })
+    
+    def test_trailing_side(self):
+        """Test that a side after a value applies to it unless a new mention follows"""
+        fields = measurement_fields(extract_measurements(
+            'Quadriceps strength 4/5 right, 5/5 left\nRight knee flexion 110 degrees left knee flexion 135 degrees'
+        ))
+        self.assertEqual(fields['knee_extension_strength_right'], '4/5')
+        self.assertEqual(fields['knee_extension_strength_left'], '5/5')
+        self.assertEqual(fields['knee_flexion_rom_right'], '110')
+        self.assertEqual(fields['knee_flexion_rom_left'], '135')
+    
+    def test_table_measurements_override_text(self):
+        """Test that side columns in tables are read and win over the text"""
+        tables = [{
+            'row_count': 3,
+            'column_count': 3,
+            'cells': [
+                {'row_index': 0, 'column_index': 0, 'content': 'Movement'},
+                {'row_index': 0, 'column_index': 1, 'content': 'Left'},
+                {'row_index': 0, 'column_index': 2, 'content': 'Right'},
+                {'row_index': 1, 'column_index': 0, 'content': 'Shoulder flexion'},
+                {'row_index': 1, 'column_index': 1, 'content': '150°'},
+                {'row_index': 1, 'column_index': 2, 'content': '180°'},
+                {'row_index': 2, 'column_index': 0, 'content': 'External rotation'},
+                {'row_index': 2, 'column_index': 1, 'content': '45°'},
+                {'row_index': 2, 'column_index': 2, 'content': '90'},
+            ],
+        }]
+        fields = measurement_fields(extract_measurements('Left shoulder flexion 140 degrees', tables))
+        self.assertEqual(fields, {
+            'shoulder_flexion_rom_left': '150',
+            'shoulder_flexion_rom_right': '180',
+            'shoulder_external_rotation_rom_left': '45',
+            'shoulder_external_rotation_rom_right': '90',
+        })
+    
+    def test_analyze_document_includes_measurements(self):
+        """Test that analysed documents carry measurements for the draft"""
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix='.png') as f:
+            f.write(b'sample notes image')
+            f.flush()
+            service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend(), use_cache=False)
+            extracted_data = service.analyze_document(f.name)
+        self.assertTrue(extracted_data['measurements'])
+        self.assertTrue(all('field' in measurement for measurement in extracted_data['measurements']))
+    
+    def test_long_notes(self):
+        """Test that a 20-page document is tokenised in one pass"""
+        page = '\n'.join(['Right knee flexion 110 degrees, left knee flexion 135 degrees'] + ['Patient discussed work.'] * 40)
+        measurements = extract_measurements('\n'.join([page] * 20))
+        self.assertEqual(len(measurements), 40)
+
+
+# Analyses a document in a fresh interpreter and prints its RSS growth in KB
+# (ru_maxrss is a high-water mark, so it has to be measured in its own process)
+PEAK_RSS_SCRIPT = """
+import resource, sys
+import django
+django.setup()
+from health_records.azure_doc_intelligence import AzureDocumentIntelligenceService, LocalLayoutBackend
+service = AzureDocumentIntelligenceService(backend=LocalLayoutBackend(), use_cache=False)
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+service.analyze_document(sys.argv[1])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+"""
+
+
+class DocumentStreamingTests(TestCase):
+    """Test that documents are size-checked up front and streamed to the OCR backend"""
+    
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+    
+    def _sparse_document(self, size):
+        file_path = f'{self.tmp_dir.name}/notes.png'
+        with open(file_path, 'wb') as f:
+            f.truncate(size)
+        return file_path
+    
+    def test_oversized_document_is_rejected_before_reading(self):
+        """Test that the size limit is enforced from file metadata"""
+        from unittest import mock
+        from . import azure_doc_intelligence
+        file_path = self._sparse_document(2048)
+        service = AzureDocumentIntelligenceService(backend=CountingLayoutBackend(), use_cache=False)
+        with mock.patch.object(azure_doc_intelligence, 'MAX_DOCUMENT_SIZE', 1024), \
+                mock.patch('builtins.open', side_effect=AssertionError('file was opened')):
+            with self.assertRaisesMessage(Exception, 'File too large'):
+                service.analyze_document(file_path)
+        self.assertEqual(service.backend.calls, 0)
+    
+    def test_backend_receives_a_file_object(self):
+        """Test that the backend is given a stream, not the document's bytes"""
+        file_path = self._sparse_document(1024)
+        received = []
+        
+        class RecordingBackend(LocalLayoutBackend):
+            def analyze(self, document):
+                received.append(document)
+                return super().analyze(document)
+        
+        service = AzureDocumentIntelligenceService(backend=RecordingBackend(), use_cache=False)
+        service.analyze_document(file_path)
+        self.assertTrue(hasattr(received[0], 'read'))
+        self.assertNotIsInstance(received[0], bytes)
+    
+    def test_peak_rss_is_bounded(self):
+        """Test that analysing a 200MB document does not load it into memory"""
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        
+        document_size = 200 * 1024 * 1024
+        file_path = self._sparse_document(document_size)
+        result = subprocess.run(
+            [sys.executable, '-c', PEAK_RSS_SCRIPT, file_path],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'sharemycare.settings'},
+            check=True,
+        )
+        rss_growth = int(result.stdout.strip().splitlines()[-1]) * 1024
+        self.assertLess(rss_growth, 32 * 1024 * 1024)
+
+
+class ImageNormalisationTests(TestCase):
+    """Test that uploaded photos are downscaled, stripped and thumbnailed"""
+    
+    def setUp(self):
+        """Use a temporary media directory"""
+        import tempfile
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_dir.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+    
+    def _photo(self, name='notes.jpg', size=(4000, 3000), image_format='JPEG', mode='RGB'):
+        """A phone-style photo with EXIF orientation and GPS data"""
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        image = Image.new(mode, size, 'white')
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+        exif[0x8825] = {1: 'N', 2: (51.0, 30.0, 0.0)}  # GPS info
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, exif=exif.tobytes())
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+    
+    def test_notes_photo_is_normalised(self):
+        """Test downscaling, upright rotation, EXIF removal and thumbnail generation"""
+        from PIL import Image
+        upload = self._photo()
+        assessment = Assessment.objects.create(user=self.user, practitioner_notes_image=upload)
+        
+        self.assertTrue(assessment.practitioner_notes_image.name.endswith('.jpg'))
+        with Image.open(assessment.practitioner_notes_image.path) as image:
+            # Rotated upright from portrait orientation, then fitted within 3000px
+            self.assertEqual(image.size, (2250, 3000))
+            self.assertFalse(image.getexif())
+        with Image.open(assessment.practitioner_notes_thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 600)
+        self.assertLess(assessment.practitioner_notes_image.size, upload.size)
+        self.assertEqual(assessment.notes_image_preview_url, assessment.practitioner_notes_thumbnail.url)
+    
+    def test_transparent_prescription_is_flattened(self):
+        """Test that PNG uploads with transparency are re-encoded as JPEG"""
+        medication = Medication.objects.create(
+            user=self.user,
+            name='Aspirin',
+            prescription_image=self._photo('prescription.png', size=(800, 600), image_format='PNG', mode='RGBA'),
+        )
+        self.assertTrue(medication.prescription_image.name.endswith('.jpg'))
+        self.assertTrue(medication.prescription_thumbnail)
+    
+    def test_stored_image_is_not_reprocessed(self):
+        """Test that saving a record again leaves its stored photo untouched"""
+        assessment = Assessment.objects.create(user=self.user, practitioner_notes_image=self._photo())
+        name = assessment.practitioner_notes_image.name
+        assessment.treatment_plan = 'Home exercises'
+        assessment.save()
+        self.assertEqual(assessment.practitioner_notes_image.name, name)
+        
+        assessment.practitioner_notes_image = None
+        assessment.save()
+        self.assertFalse(assessment.practitioner_notes_thumbnail)
+    
+    def test_unreadable_files_are_stored_unchanged(self):
+        """Test that files Pillow cannot open are kept as uploaded"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        upload = SimpleUploadedFile('notes.pdf', b'%PDF-1.4 not an image', content_type='application/pdf')
+        assessment = Assessment.objects.create(user=self.user, practitioner_notes_image=upload)
+        self.assertTrue(assessment.practitioner_notes_image.name.endswith('.pdf'))
+        self.assertFalse(assessment.practitioner_notes_thumbnail)
+    
+    def test_oversized_images_are_stored_unchanged(self):
+        """Test that an image over Pillow's decompression bomb limit is kept as uploaded instead of failing"""
+        from unittest import mock
+        from PIL import Image
+        upload = self._photo('prescription.png', size=(100, 100), image_format='PNG')
+        # 100x100 is over twice this limit, so Pillow raises DecompressionBombError
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            medication = Medication.objects.create(user=self.user, name='Aspirin', prescription_image=upload)
+        self.assertTrue(medication.prescription_image.name.endswith('.png'))
+        self.assertFalse(medication.prescription_thumbnail)
+    
+    def test_non_image_replacing_photo_clears_thumbnail(self):
+        """Test that a PDF replacing a photo does not keep the photo's thumbnail"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        assessment = Assessment.objects.create(user=self.user, practitioner_notes_image=self._photo())
+        self.assertTrue(assessment.practitioner_notes_thumbnail)
+        
+        assessment.practitioner_notes_image = SimpleUploadedFile(
+            'notes.pdf', b'%PDF-1.4 not an image', content_type='application/pdf'
+        )
+        assessment.save()
+        assessment.refresh_from_db()
+        self.assertFalse(assessment.practitioner_notes_thumbnail)
+        self.assertEqual(assessment.notes_image_preview_url, assessment.practitioner_notes_image.url)
+
+
+class InviteClinicianTests(TestCase):
+    """Test connecting with a clinician by practitioner code"""
+    
+    def setUp(self):
+        """Set up a patient and a clinician with a practitioner code"""
+        from clinicians.models import Clinician
+        self.client = Client()
+        self.patient = User.objects.create_user(username='testpatient', password='testpass123')
+        self.clinician = Clinician.objects.create(
+            first_name='John',
+            last_name='Doe',
+            title='physiotherapist',
+            email='clinician@test.com'
+        )
+        self.client.login(username='testpatient', password='testpass123')
+    
+    def test_consent_choices_are_saved(self):
+        """Test that unticked record types are saved as not consented"""
+        from clinicians.models import ConsentFlag, PatientClinicianAccess
+        response = self.client.post(reverse('health_records:invite_clinician'), {
+            'submit_consent': '1',
+            'practitioner_code': self.clinician.practitioner_code,
+            'consent_medications': 'on',
+            'consent_conditions': 'on',
+        })
+        self.assertRedirects(response, reverse('health_records:dashboard'), fetch_redirect_response=False)
+        access = PatientClinicianAccess.objects.get(patient=self.patient, clinician=self.clinician)
+        self.assertEqual(access.consent, ConsentFlag.MEDICATIONS | ConsentFlag.CONDITIONS)
+        self.assertIsNotNone(access.consent_given_at)
+    
+    def test_regranted_access_survives_expiry_sweep(self):
+        """Test that reconnecting after a grant expired clears the old expiry"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from clinicians.expiry import sweep_expired
+        from clinicians.models import PatientClinicianAccess
+        access = PatientClinicianAccess.objects.create(
+            patient=self.patient, clinician=self.clinician, expires_at=timezone.now() - timedelta(days=1)
+        )
+        sweep_expired()
+        access.refresh_from_db()
+        self.assertFalse(access.is_active)
+        
+        self.client.post(reverse('health_records:invite_clinician'), {
+            'submit_consent': '1',
+            'practitioner_code': self.clinician.practitioner_code,
+            'consent_medications': 'on',
+        })
+        sweep_expired()
+        access.refresh_from_db()
+        self.assertTrue(access.is_active)
+        self.assertIsNone(access.expires_at)
+
+
+class TimelineTests(TestCase):
+    """Test the merged, cursor-paginated patient timeline"""
+    
+    def setUp(self):
+        """Set up a patient with records of several types"""
+        from datetime import date
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Medication.objects.create(user=self.user, name='Ibuprofen', dosage='200mg', start_date=date(2024, 3, 1))
+        Condition.objects.create(user=self.user, name='Asthma', diagnosis_date=date(2019, 6, 1))
+        Allergy.objects.create(user=self.user, allergen='Penicillin', reaction='Rash', date_identified=date(2021, 1, 5))
+        Assessment.objects.create(user=self.user, symptom_date=date(2024, 5, 2), current_symptoms='Knee pain')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def read_all(self, limit, **kwargs):
+        from .timeline import get_timeline
+        entries, cursor = [], None
+        while True:
+            page = get_timeline(self.user.pk, cursor=cursor, limit=limit, **kwargs)
+            entries += page['entries']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return entries
+    
+    def test_record_types_are_merged_newest_first(self):
+        """Test that entries from every table come back in one date order"""
+        from .timeline import get_timeline
+        page = get_timeline(self.user.pk)
+        self.assertEqual(
+            [entry['title'] for entry in page['entries']],
+            ['Assessment', 'Started Ibuprofen', 'Allergy to Penicillin identified', 'Diagnosed with Asthma'],
+        )
+        self.assertIsNone(page['next_cursor'])
+    
+    def test_pages_cover_every_entry_once(self):
+        """Test that paging with cursors, including through tied keys, returns each entry exactly once"""
+        from datetime import date
+        from django.utils import timezone
+        for i in range(4):
+            Assessment.objects.create(user=self.user, assessment_date=date(2023, 1, 1))
+            Medication.objects.create(user=self.user, name=f'Drug {i}', start_date=date(2023, 1, 1))
+        # Identical dates and creation times leave only the kind and id to order by
+        created_at = timezone.now()
+        Assessment.objects.filter(assessment_date=date(2023, 1, 1)).update(created_at=created_at)
+        Medication.objects.filter(start_date=date(2023, 1, 1)).update(created_at=created_at)
+        
+        everything = self.read_all(limit=100)
+        self.assertEqual(len(everything), 12)
+        for limit in (1, 3, 5):
+            paged = self.read_all(limit=limit)
+            self.assertEqual([(e['kind'], e['id']) for e in paged], [(e['kind'], e['id']) for e in everything])
+    
+    def test_page_queries_do_not_grow_with_history(self):
+        """Test that a page costs one query per record type however long the history is"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .timeline import get_timeline
+        with CaptureQueriesContext(connection) as before:
+            get_timeline(self.user.pk, limit=2)
+        Assessment.objects.bulk_create(Assessment(user=self.user, current_symptoms='Review') for _ in range(50))
+        with CaptureQueriesContext(connection) as after:
+            page = get_timeline(self.user.pk, limit=2)
+        self.assertEqual(len(before.captured_queries), 5)
+        self.assertEqual(len(after.captured_queries), 5)
+        self.assertEqual(len(page['entries']), 2)
+    
+    def test_timeline_endpoint(self):
+        """Test the JSON endpoint for a patient's own timeline"""
+        response = self.client.get(reverse('health_records:timeline'), {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([entry['kind'] for entry in data['entries']], ['assessment', 'medication'])
+        self.assertEqual(data['entries'][0]['date'], '2024-05-02')
+        
+        response = self.client.get(reverse('health_records:timeline'), {'cursor': data['next_cursor']})
+        self.assertEqual([entry['kind'] for entry in response.json()['entries']], ['allergy', 'condition'])
+        
+        response = self.client.get(reverse('health_records:timeline'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_clinician_timeline_respects_consent(self):
+        """Test that clinicians get only shared record types and need an active grant"""
+        from clinicians.models import Clinician, ConsentFlag, PatientClinicianAccess
+        clinician_user = User.objects.create_user(username='testclinician', password='testpass123')
+        clinician = Clinician.objects.create(
+            user=clinician_user, first_name='John', last_name='Doe', title='physiotherapist', email='c@test.com'
+        )
+        url = reverse('health_records:timeline_patient', args=[self.user.pk])
+        self.client.login(username='testclinician', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        
+        PatientClinicianAccess.objects.create(
+            patient=self.user, clinician=clinician, consent=ConsentFlag.ALL & ~ConsentFlag.MEDICATIONS
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [entry['kind'] for entry in response.json()['entries']], ['assessment', 'allergy', 'condition']
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """Test keyset pagination of record lists"""
+    
+    def setUp(self):
+        """Set up a patient with medications that tie and lack start dates"""
+        from datetime import date
+        from django.utils import timezone
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        profile, _ = UserProfile.objects.get_or_create(user=self.user)
+        profile.onboarding_completed = True
+        profile.save()
+        for i in range(12):
+            Medication.objects.create(
+                user=self.user,
+                name=f'Drug {i}',
+                is_active=i % 3 != 0,
+                start_date=date(2024, 1, 1 + i % 4) if i % 5 else None,
+            )
+        # Identical creation times leave only the id to break ties
+        Medication.objects.filter(user=self.user).update(created_at=timezone.now())
+        self.client.login(username='testuser', password='testpass123')
+    
+    def read_all(self, queryset, per_page):
+        from sharemycare.pagination import paginate
+        rows, cursor = [], None
+        while True:
+            page = paginate(queryset, cursor, per_page=per_page)
+            rows += page
+            cursor = page.next_cursor
+            if cursor is None:
+                return rows
+    
+    def test_pages_follow_meta_ordering(self):
+        """Test that pages, including through NULLs and ties, cover the Meta.ordering exactly once"""
+        medications = Medication.objects.filter(user=self.user)
+        expected = list(medications.order_by('-is_active', '-start_date', '-created_at', '-pk'))
+        for per_page in (1, 4, 5, 12, 20):
+            self.assertEqual(self.read_all(medications, per_page), expected)
+        
+        ascending = Medication.objects.filter(user=self.user).order_by('start_date', 'name')
+        self.assertEqual(self.read_all(ascending, 5), list(ascending.order_by('start_date', 'name', 'pk')))
+    
+    def test_cursor_is_stable_when_rows_change(self):
+        """Test that rows added before a cursor neither shift nor repeat the next page"""
+        from datetime import date
+        from sharemycare.pagination import paginate
+        medications = Medication.objects.filter(user=self.user)
+        first = paginate(medications, per_page=5)
+        Medication.objects.create(user=self.user, name='Newest', is_active=True, start_date=date(2025, 1, 1))
+        second = paginate(medications, first.next_cursor, per_page=5)
+        self.assertEqual(
+            list(first) + list(second),
+            list(medications.exclude(name='Newest').order_by('-is_active', '-start_date', '-created_at', '-pk'))[:10],
+        )
+        self.assertEqual(second.count, 13)
+    
+    def test_invalid_cursor(self):
+        """Test that a bad cursor raises, and falls back to the first page for a request"""
+        from django.test import RequestFactory
+        from sharemycare.pagination import InvalidCursor, paginate, paginate_request
+        medications = Medication.objects.filter(user=self.user)
+        for cursor in ('not-a-cursor', paginate(medications.order_by('name'), per_page=1).next_cursor):
+            with self.assertRaises(InvalidCursor):
+                paginate(medications, cursor)
+        page = paginate_request(RequestFactory().get('/', {'cursor': 'not-a-cursor'}), medications, per_page=5)
+        self.assertTrue(page.is_first)
+        self.assertEqual(len(page), 5)
+    
+    def test_cursor_values_of_the_wrong_type(self):
+        """Test that a well-formed cursor whose values do not fit the ordering columns is rejected"""
+        import base64
+        from sharemycare.pagination import InvalidCursor, encode_cursor, paginate
+        medications = Medication.objects.filter(user=self.user)
+        bad_decimal = base64.urlsafe_b64encode(b'[["n","abc"],null,null,["i",1]]').decode().rstrip('=')
+        cursors = [
+            encode_cursor(['x', 'y', 'z', 1]),  # Not a boolean
+            encode_cursor([True, '2024-13-45', None, 1]),  # Not a date
+            encode_cursor([True, None, None, 'one']),  # Not an id
+            bad_decimal,  # Not a number
+        ]
+        for cursor in cursors:
+            with self.assertRaises(InvalidCursor):
+                paginate(medications, cursor)
+            response = self.client.get(reverse('health_records:dashboard'), {'medications': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['medications'].is_first)
+    
+    def test_dashboard_pages_each_list(self):
+        """Test that the dashboard shows one page per list and links to the next"""
+        response = self.client.get(reverse('health_records:dashboard'))
+        medications = response.context['medications']
+        self.assertEqual(len(medications), 10)
+        self.assertEqual(medications.count, 12)
+        self.assertContains(response, '12 medications')
+        self.assertContains(response, f'?{medications.next_querystring}')
+        
+        response = self.client.get(reverse('health_records:dashboard'), {'medications': medications.next_cursor})
+        self.assertEqual(len(response.context['medications']), 2)
+        self.assertContains(response, "toggleCard('medications'); });")
+        self.assertContains(response, '← Newest')
+    
+    def test_feedback_list_is_paginated(self):
+        """Test that the feedback page shows one page and follows its cursor"""
+        from clinicians.models import HealthcareFeedback
+        for i in range(25):
+            HealthcareFeedback.objects.create(
+                patient=self.user, organisation=f'Clinic {i}', feedback_type='general', rating=4, feedback_text='Good'
+            )
+        response = self.client.get(reverse('health_records:view_feedback'))
+        feedback = response.context['feedback']
+        self.assertEqual(len(feedback), 20)
+        response = self.client.get(reverse('health_records:view_feedback'), {'cursor': feedback.next_cursor})
+        self.assertEqual(len(response.context['feedback']), 5)
+        self.assertIsNone(response.context['feedback'].next_cursor)
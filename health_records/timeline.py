@@ -0,0 +1,210 @@
+"""
+A patient's records as one chronological timeline.
+
+Medications started, conditions diagnosed, allergies identified,
+assessments and objective measures each come from their own table. Every
+table is read as a stream already ordered newest first, and the streams are
+merged with a k-way heap merge, so no table is loaded in full.
+
+Entries are ordered by (date, created_at, kind, id), newest first. A page
+ends with a cursor holding that key for its last entry; the next page asks
+each stream only for rows after the cursor, at most one page of each. The
+work per page depends on the page size and the number of record types, not
+on how long the patient's history is.
+"""
+import heapq
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, TruncDate
+
+from clinicians.models import ObjectiveMeasures
+from sharemycare.pagination import InvalidCursor, decode_cursor, encode_cursor
+from .models import Allergy, Assessment, Condition, Medication
+
+# Entries per page by default, and the most a caller may ask for
+TIMELINE_PAGE_SIZE = 20
+MAX_TIMELINE_PAGE_SIZE = 100
+
+
+class TimelineStream(NamedTuple):
+    """One record type's rows as timeline entries"""
+    kind: str
+    record_type: str  # Consent record type (see clinicians.consent.RECORD_CONSENT)
+    queryset: Callable  # patient_id -> queryset of the patient's rows
+    date: object  # Expression giving the entry's date
+    fields: Tuple[str, ...]  # Values read for the title and detail
+    describe: Callable  # values -> (title, detail)
+
+
+def _medication(values):
+    detail = ' '.join(part for part in (values['dosage'], values['frequency']) if part)
+    return f"Started {values['name']}", detail
+
+
+def _condition(values):
+    return f"Diagnosed with {values['name']}", values['status'].title()
+
+
+def _allergy(values):
+    return f"Allergy to {values['allergen']} identified", values['severity'].replace('_', '-').title()
+
+
+def _assessment(values):
+    if values['assessment_type']:
+        title = f"{values['assessment_type'].replace('_', ' ').title()} assessment"
+    else:
+        title = 'Assessment'
+    detail = values['current_symptoms'] or values['objective_findings']
+    if values['pain_level'] is not None:
+        detail = f"{detail} (pain {values['pain_level']}/10)" if detail else f"Pain {values['pain_level']}/10"
+    return title, detail
+
+
+def _objective_measures(values):
+    return 'Objective measures recorded', values['additional_notes']
+
+
+STREAMS = [
+    TimelineStream(
+        kind='medication',
+        record_type='medications',
+        queryset=lambda patient_id: Medication.objects.filter(user_id=patient_id),
+        date=Coalesce('start_date', TruncDate('created_at')),
+        fields=('name', 'dosage', 'frequency'),
+        describe=_medication,
+    ),
+    TimelineStream(
+        kind='condition',
+        record_type='conditions',
+        queryset=lambda patient_id: Condition.objects.filter(user_id=patient_id),
+        date=Coalesce('diagnosis_date', TruncDate('created_at')),
+        fields=('name', 'status'),
+        describe=_condition,
+    ),
+    TimelineStream(
+        kind='allergy',
+        record_type='allergies',
+        queryset=lambda patient_id: Allergy.objects.filter(user_id=patient_id),
+        date=Coalesce('date_identified', TruncDate('created_at')),
+        fields=('allergen', 'severity'),
+        describe=_allergy,
+    ),
+    TimelineStream(
+        kind='assessment',
+        record_type='assessments',
+        queryset=lambda patient_id: Assessment.objects.filter(user_id=patient_id),
+        date=Coalesce('assessment_date', 'symptom_date', TruncDate('created_at')),
+        fields=('assessment_type', 'current_symptoms', 'objective_findings', 'pain_level'),
+        describe=_assessment,
+    ),
+    TimelineStream(
+        kind='objective_measures',
+        record_type='assessments',
+        queryset=lambda patient_id: ObjectiveMeasures.objects.filter(assessment__user_id=patient_id),
+        date=F('assessment_date'),
+        fields=('additional_notes',),
+        describe=_objective_measures,
+    ),
+]
+
+
+def _entry_cursor(entry: Dict) -> str:
+    """Opaque cursor for the page that follows entry"""
+    return encode_cursor([entry['date'], entry['created_at'], entry['kind'], entry['id']])
+
+
+def _cursor_key(cursor: str) -> Tuple[date, datetime, str, int]:
+    """The (date, created_at, kind, id) key in a cursor from _entry_cursor()"""
+    entry_date, created_at, kind, pk = decode_cursor(cursor, 4)
+    types = (type(entry_date), type(created_at), type(kind), type(pk))
+    if types != (date, datetime, str, int):
+        raise InvalidCursor(f"Invalid timeline cursor: {cursor!r}")
+    return entry_date, created_at, kind, pk
+
+
+def _after(stream: TimelineStream, cursor: Tuple) -> Q:
+    """Rows of a stream that come after the cursor in (date, created_at, kind, id) descending order"""
+    cursor_date, cursor_created_at, cursor_kind, cursor_pk = cursor
+    after = Q(timeline_date__lt=cursor_date) | Q(timeline_date=cursor_date, created_at__lt=cursor_created_at)
+    # Ties on (date, created_at) are broken by kind, then by id within a kind
+    if stream.kind < cursor_kind:
+        after |= Q(timeline_date=cursor_date, created_at=cursor_created_at)
+    elif stream.kind == cursor_kind:
+        after |= Q(timeline_date=cursor_date, created_at=cursor_created_at, pk__lt=cursor_pk)
+    return after
+
+
+def _read_stream(stream: TimelineStream, patient_id: int, cursor: Optional[Tuple], limit: int) -> Iterable[Dict]:
+    rows = stream.queryset(patient_id).annotate(timeline_date=stream.date)
+    if cursor:
+        rows = rows.filter(_after(stream, cursor))
+    rows = rows.order_by('-timeline_date', '-created_at', '-pk').values(
+        'pk', 'timeline_date', 'created_at', *stream.fields
+    )[:limit]
+    for values in rows:
+        title, detail = stream.describe(values)
+        yield {
+            'kind': stream.kind,
+            'id': values['pk'],
+            'date': values['timeline_date'],
+            'created_at': values['created_at'],
+            'title': title,
+            'detail': detail,
+        }
+
+
+def get_timeline(patient_id: int, record_types=None, cursor: Optional[str] = None,
+                 limit: int = TIMELINE_PAGE_SIZE) -> Dict:
+    """
+    One page of a patient's timeline, newest first.
+
+    Args:
+        patient_id: The patient's user id
+        record_types: Record types to include (e.g. those the patient has
+            shared with a clinician); all types if None
+        cursor: The 'next_cursor' of the previous page, or None for the first page
+        limit: Entries per page
+
+    Returns:
+        Dict with 'entries' and 'next_cursor' (None on the last page)
+
+    Raises:
+        InvalidCursor: If cursor was not issued by this module
+    """
+    after = _cursor_key(cursor) if cursor else None
+    streams = [
+        _read_stream(stream, patient_id, after, limit + 1)
+        for stream in STREAMS
+        if record_types is None or stream.record_type in record_types
+    ]
+    merged = heapq.merge(
+        *streams,
+        key=lambda entry: (entry['date'], entry['created_at'], entry['kind'], entry['id']),
+        reverse=True,
+    )
+
+    entries: List[Dict] = []
+    for entry in merged:
+        if len(entries) == limit:
+            return {'entries': entries, 'next_cursor': _entry_cursor(entries[-1])}
+        entries.append(entry)
+    return {'entries': entries, 'next_cursor': None}
+
+
+def timeline_json(page: Dict) -> Dict:
+    """A page from get_timeline() in JSON-serialisable form"""
+    return {
+        'entries': [
+            {
+                'kind': entry['kind'],
+                'id': entry['id'],
+                'date': entry['date'].isoformat(),
+                'title': entry['title'],
+                'detail': entry['detail'],
+            }
+            for entry in page['entries']
+        ],
+        'next_cursor': page['next_cursor'],
+    }
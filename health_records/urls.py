@@ -9,6 +9,8 @@ urlpatterns = [
     path('onboarding/', views.onboarding, name='onboarding'),
     path('passport/', views.passport_view, name='passport'),
     path('passport/<int:patient_id>/', views.passport_view, name='passport_patient'),
+    path('timeline/', views.patient_timeline, name='timeline'),
+    path('timeline/<int:patient_id>/', views.patient_timeline, name='timeline_patient'),
     path('emergency-card/', views.emergency_card, name='emergency_card'),
     path('verify-clinician/<int:clinician_id>/', views.verify_clinician, name='verify_clinician'),
     path('verify-clinician/', views.verify_clinician_registration, name='verify_clinician_registration'),
@@ -61,5 +63,6 @@ urlpatterns = [
     path('assessments/<int:assessment_pk>/findings/json/', views.get_extracted_findings_json, name='get_extracted_findings_json'),
     path('findings/<int:finding_pk>/verify/', views.verify_finding, name='verify_finding'),
     path('findings/<int:finding_pk>/delete/', views.delete_finding, name='delete_finding'),
+    path('analysis-jobs/<int:job_pk>/status/', views.analysis_job_status, name='analysis_job_status'),
 ]
 
@@ -5,15 +5,27 @@ from django.contrib import messages
 from django.utils import timezone
 from django.conf import settings
 from django.urls import reverse
-from .models import Medication, Condition, Allergy, Assessment, WorkHistory, ExtractedFindings
+from .models import Medication, Condition, Allergy, Assessment, WorkHistory, ExtractedFindings, DocumentAnalysisJob
 from accounts.models import UserProfile
 from .forms import (
     MedicationForm, ConditionForm, AllergyForm, 
     AssessmentForm, PractitionerAssessmentForm, UserProfileForm, WorkHistoryForm
 )
+from clinicians.access import get_access_grant, has_patient_access
+from clinicians.consent import project_profile, project_records, shared_record_types, withheld_labels
 from clinicians.models import PatientClinicianAccess, Clinician, ClinicianInvitation
 from clinicians.forms import HealthcareFeedbackForm, ClinicianInvitationForm
 from .azure_doc_intelligence import AzureDocumentIntelligenceService
+from .ocr_jobs import enqueue_analysis
+from .timeline import MAX_TIMELINE_PAGE_SIZE, TIMELINE_PAGE_SIZE, InvalidCursor, get_timeline, timeline_json
+from sharemycare.pagination import paginate_request
+
+# Record types shown on the health passport
+PASSPORT_RECORDS = ['profile', 'emergency_contact', 'medications', 'conditions', 'allergies', 'assessments']
+
+# Rows per page of each dashboard list and of the invitation list
+LIST_PAGE_SIZE = 10
+FEEDBACK_PAGE_SIZE = 20
 
 
 def home(request):
@@ -71,32 +83,40 @@ def passport_view(request, patient_id=None):
     """Passport-style card view of health records"""
     # Check if this is a clinician viewing a patient's passport
     if patient_id:
-        from clinicians.models import PatientClinicianAccess
         patient = get_object_or_404(User, pk=patient_id)
         
         # Verify clinician has access
-        if hasattr(request.user, 'clinician_profile'):
-            clinician = request.user.clinician_profile
-            access = PatientClinicianAccess.objects.filter(
-                patient=patient,
-                clinician=clinician,
-                is_active=True
-            ).first()
-            
-            if not access:
-                messages.error(request, 'You do not have access to this patient\'s records.')
-                return redirect('clinicians:dashboard')
-            
-            # Use patient's data
-            user = patient
-            is_clinician_view = True
-        else:
+        if not request.role.is_clinician:
             messages.error(request, 'Access denied.')
             return redirect('health_records:dashboard')
-    else:
-        # User viewing their own passport
-        user = request.user
-        is_clinician_view = False
+        
+        access = get_access_grant(request, patient.pk)
+        if not access:
+            messages.error(request, 'You do not have access to this patient\'s records.')
+            return redirect('clinicians:dashboard')
+        
+        # Only the record types the patient has consented to share are loaded
+        records = project_records(access, {
+            'medications': patient.medications.filter(is_active=True),
+            'conditions': patient.conditions.filter(status='active'),
+            'allergies': patient.allergies.all(),
+            'assessments': patient.assessments.all().order_by('-assessment_date', '-created_at')[:5],
+        })
+        profile, emergency_contact = project_profile(access)
+        
+        context = {
+            **records,
+            'profile': profile,
+            'emergency_contact': emergency_contact,
+            'shared_records': shared_record_types(access),
+            'withheld_records': withheld_labels(access, PASSPORT_RECORDS),
+            'is_clinician_view': True,
+            'patient': patient,
+        }
+        return render(request, 'health_records/passport.html', context)
+    
+    # User viewing their own passport
+    user = request.user
     
     # Get profile
     try:
@@ -110,14 +130,46 @@ def passport_view(request, patient_id=None):
         'allergies': user.allergies.all(),
         'assessments': user.assessments.all().order_by('-assessment_date', '-created_at')[:5],
         'profile': profile,
+        'emergency_contact': {
+            'name': profile.emergency_contact_name,
+            'relationship': profile.emergency_contact_relationship,
+            'phone': profile.emergency_contact_phone,
+        } if profile else None,
         'clinician_accesses': user.clinician_accesses.filter(is_active=True).count(),
-        'is_clinician_view': is_clinician_view,
-        'patient': user if is_clinician_view else None,
+        'is_clinician_view': False,
+        'patient': None,
     }
     
     return render(request, 'health_records/passport.html', context)
 
 
+@login_required
+def patient_timeline(request, patient_id=None):
+    """One page of a patient's timeline as JSON: the user's own, or a client's for a clinician"""
+    from django.http import JsonResponse
+    record_types = None
+    if patient_id is not None and patient_id != request.user.pk:
+        # Clinicians only see the record types the patient has shared with them
+        access = get_access_grant(request, patient_id)
+        if access is None:
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        record_types = shared_record_types(access)
+    else:
+        patient_id = request.user.pk
+    
+    try:
+        limit = int(request.GET.get('limit', TIMELINE_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a whole number.'}, status=400)
+    limit = min(max(limit, 1), MAX_TIMELINE_PAGE_SIZE)
+    
+    try:
+        page = get_timeline(patient_id, record_types, cursor=request.GET.get('cursor') or None, limit=limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse(timeline_json(page))
+
+
 @login_required
 def verify_clinician(request, clinician_id):
     """Verify a clinician's registration number"""
@@ -291,9 +343,15 @@ def dashboard(request):
     # Get clinicians the user has access relationships with
     from clinicians.models import HealthcareFeedback
     clinician_accesses = user.clinician_accesses.filter(is_active=True).select_related('clinician')
-    feedback = user.healthcare_feedback.all()
     invitations = ClinicianInvitation.objects.filter(patient=user).order_by('-created_at')
     
+    # One page of each list, in Meta.ordering; each list pages through its own query parameter
+    medications = paginate_request(request, user.medications.all(), param='medications', per_page=LIST_PAGE_SIZE)
+    conditions = paginate_request(request, user.conditions.all(), param='conditions', per_page=LIST_PAGE_SIZE)
+    allergies = paginate_request(request, user.allergies.all(), param='allergies', per_page=LIST_PAGE_SIZE)
+    assessments = paginate_request(request, user.assessments.all(), param='assessments', per_page=LIST_PAGE_SIZE)
+    feedback = paginate_request(request, user.healthcare_feedback.all(), param='feedback', per_page=LIST_PAGE_SIZE)
+    
     # Calculate profile completion
     completed_items = 0
     total_items = 6
@@ -303,18 +361,18 @@ def dashboard(request):
         completed_items += 1
     if profile.emergency_contact_name:
         completed_items += 1
-    if user.medications.count() > 0:
+    if medications.count > 0:
         completed_items += 1
-    if user.conditions.count() > 0:
+    if conditions.count > 0:
         completed_items += 1
-    if user.allergies.count() > 0:
+    if allergies.count > 0:
         completed_items += 1
     
     context = {
-        'medications': user.medications.all(),
-        'conditions': user.conditions.all(),
-        'allergies': user.allergies.all(),
-        'assessments': user.assessments.all(),
+        'medications': medications,
+        'conditions': conditions,
+        'allergies': allergies,
+        'assessments': assessments,
         'work_history': work_history,
         'current_work': current_work,
         'previous_work': previous_work,
@@ -322,6 +380,8 @@ def dashboard(request):
         'clinician_accesses': clinician_accesses,
         'feedback': feedback,
         'invitations': invitations,
+        'timeline': get_timeline(user.pk),
+        'timeline_url': reverse('health_records:timeline'),
         'profile_completion': {
             'completed': completed_items,
             'total': total_items,
@@ -573,21 +633,15 @@ def add_practitioner_assessment(request, assessment_pk):
     assessment = get_object_or_404(Assessment, pk=assessment_pk)
     
     # Check if current user is a clinician with access
-    try:
-        clinician = request.user.clinician_profile
-        access = PatientClinicianAccess.objects.filter(
-            patient=assessment.user,
-            clinician=clinician,
-            is_active=True
-        ).first()
-        
-        if not access:
-            messages.error(request, 'You do not have access to add assessments for this patient.')
-            return redirect('health_records:dashboard')
-    except Clinician.DoesNotExist:
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to add objective assessments.')
         return redirect('health_records:dashboard')
     
+    clinician = request.role.clinician
+    if not has_patient_access(request, assessment.user_id):
+        messages.error(request, 'You do not have access to add assessments for this patient.')
+        return redirect('health_records:dashboard')
+    
     if request.method == 'POST':
         form = PractitionerAssessmentForm(request.POST, request.FILES, instance=assessment)
         if form.is_valid():
@@ -599,7 +653,7 @@ def add_practitioner_assessment(request, assessment_pk):
             assessment.save()
             messages.success(request, 'Objective assessment added successfully!')
             # Redirect to clinician dashboard if user is a clinician
-            if hasattr(request.user, 'clinician_profile'):
+            if request.role.is_clinician:
                 return redirect('clinicians:dashboard')
             return redirect('health_records:dashboard')
     else:
@@ -618,15 +672,15 @@ def edit_practitioner_assessment(request, pk):
     assessment = get_object_or_404(Assessment, pk=pk)
     
     # Check if current user is the clinician who added this assessment
-    try:
-        clinician = request.user.clinician_profile
-        if assessment.clinician != clinician:
-            messages.error(request, 'You can only edit assessments you have created.')
-            return redirect('health_records:dashboard')
-    except Clinician.DoesNotExist:
+    if not request.role.is_clinician:
         messages.error(request, 'You must be a registered clinician to edit assessments.')
         return redirect('health_records:dashboard')
     
+    clinician = request.role.clinician
+    if assessment.clinician != clinician:
+        messages.error(request, 'You can only edit assessments you have created.')
+        return redirect('health_records:dashboard')
+    
     if request.method == 'POST':
         form = PractitionerAssessmentForm(request.POST, request.FILES, instance=assessment)
         if form.is_valid():
@@ -637,7 +691,7 @@ def edit_practitioner_assessment(request, pk):
             assessment.save()
             messages.success(request, 'Assessment updated successfully!')
             # Redirect to clinician dashboard if user is a clinician
-            if hasattr(request.user, 'clinician_profile'):
+            if request.role.is_clinician:
                 return redirect('clinicians:dashboard')
             return redirect('health_records:dashboard')
     else:
@@ -767,8 +821,7 @@ def add_feedback(request, access_pk=None):
 @login_required
 def view_feedback(request):
     """View user's submitted feedback"""
-    from clinicians.models import HealthcareFeedback
-    feedback = request.user.healthcare_feedback.all()
+    feedback = paginate_request(request, request.user.healthcare_feedback.all(), per_page=FEEDBACK_PAGE_SIZE)
     return render(request, 'health_records/feedback_list.html', {'feedback': feedback})
 
 
@@ -826,6 +879,7 @@ def invite_clinician(request):
             # Both form and code are valid - process consent
             try:
                 clinician = Clinician.objects.get(practitioner_code=practitioner_code)
+                consent = consent_form.consent_flags()
                 # Check if access already exists
                 access, created = PatientClinicianAccess.objects.get_or_create(
                     patient=request.user,
@@ -834,31 +888,17 @@ def invite_clinician(request):
                         'access_granted_by': request.user,
                         'access_level': 'full',
                         'is_active': True,
-                        # Unchecked checkboxes don't appear in cleaned_data, so default to False
-                        'consent_medications': consent_form.cleaned_data.get('consent_medications', False),
-                        'consent_conditions': consent_form.cleaned_data.get('consent_conditions', False),
-                        'consent_allergies': consent_form.cleaned_data.get('consent_allergies', False),
-                        'consent_symptoms': consent_form.cleaned_data.get('consent_symptoms', False),
-                        'consent_personal_info': consent_form.cleaned_data.get('consent_personal_info', False),
-                        'consent_emergency_contacts': consent_form.cleaned_data.get('consent_emergency_contacts', False),
-                        'consent_work_history': consent_form.cleaned_data.get('consent_work_history', False),
-                        'consent_feedback': consent_form.cleaned_data.get('consent_feedback', False),
+                        'consent': consent,
                         'consent_given_at': timezone.now(),
                     }
                 )
                 
                 if not created:
-                    # Update existing access with new consent preferences
+                    # Update existing access with new consent preferences; a renewed grant
+                    # is open-ended, so the expiry sweep does not take it away again
                     access.is_active = True
-                    # Unchecked checkboxes don't appear in cleaned_data, so default to False
-                    access.consent_medications = consent_form.cleaned_data.get('consent_medications', False)
-                    access.consent_conditions = consent_form.cleaned_data.get('consent_conditions', False)
-                    access.consent_allergies = consent_form.cleaned_data.get('consent_allergies', False)
-                    access.consent_symptoms = consent_form.cleaned_data.get('consent_symptoms', False)
-                    access.consent_personal_info = consent_form.cleaned_data.get('consent_personal_info', False)
-                    access.consent_emergency_contacts = consent_form.cleaned_data.get('consent_emergency_contacts', False)
-                    access.consent_work_history = consent_form.cleaned_data.get('consent_work_history', False)
-                    access.consent_feedback = consent_form.cleaned_data.get('consent_feedback', False)
+                    access.expires_at = None
+                    access.consent = consent
                     access.consent_given_at = timezone.now()
                     access.save()
                 
@@ -912,19 +952,17 @@ def invite_clinician(request):
                     messages.error(request, f'No practitioner found with code: {practitioner_code}. Please check the code and try again.')
                     # Return early to prevent processing invitation form
                     form = ClinicianInvitationForm(patient=request.user)
-                    invitations = ClinicianInvitation.objects.filter(patient=request.user).order_by('-created_at')
                     return render(request, 'health_records/invite_clinician.html', {
                         'form': form,
-                        'invitations': invitations
+                        'invitations': _invitation_page(request)
                     })
             else:
                 messages.error(request, 'Please enter a valid 5-character practitioner code.')
                 # Return early to prevent processing invitation form
                 form = ClinicianInvitationForm(patient=request.user)
-                invitations = ClinicianInvitation.objects.filter(patient=request.user).order_by('-created_at')
                 return render(request, 'health_records/invite_clinician.html', {
                     'form': form,
-                    'invitations': invitations
+                    'invitations': _invitation_page(request)
                 })
         
         # Otherwise, use invitation form (only if not processing code search)
@@ -948,15 +986,18 @@ def invite_clinician(request):
     else:
         form = ClinicianInvitationForm(patient=request.user)
     
-    # Get existing invitations
-    invitations = ClinicianInvitation.objects.filter(patient=request.user).order_by('-created_at')
-    
     return render(request, 'health_records/invite_clinician.html', {
         'form': form,
-        'invitations': invitations
+        'invitations': _invitation_page(request)
     })
 
 
+def _invitation_page(request):
+    """The page of the user's previous invitations named by the request, newest first"""
+    invitations = ClinicianInvitation.objects.filter(patient=request.user).order_by('-created_at')
+    return paginate_request(request, invitations, param='invitations', per_page=LIST_PAGE_SIZE)
+
+
 @login_required
 def revoke_clinician_access(request, access_pk):
     """Revoke a clinician's access to patient records"""
@@ -988,7 +1029,7 @@ def revoke_clinician_access(request, access_pk):
 
 @login_required
 def process_notes_image(request, assessment_pk):
-    """Process uploaded therapist notes image using Azure Document Intelligence"""
+    """Queue uploaded therapist notes image for Azure Document Intelligence processing"""
     assessment = get_object_or_404(Assessment, pk=assessment_pk)
     
     # Check permissions - user must own the assessment or be a clinician with access
@@ -996,14 +1037,9 @@ def process_notes_image(request, assessment_pk):
     is_clinician = False
     clinician = None
     
-    if hasattr(request.user, 'clinician_profile'):
-        clinician = request.user.clinician_profile
-        has_access = PatientClinicianAccess.objects.filter(
-            patient=assessment.user,
-            clinician=clinician,
-            is_active=True
-        ).exists()
-        is_clinician = has_access
+    if request.role.is_clinician:
+        clinician = request.role.clinician
+        is_clinician = has_patient_access(request, assessment.user_id)
     
     if not (is_owner or is_clinician):
         messages.error(request, 'You do not have permission to process this assessment.')
@@ -1028,81 +1064,23 @@ def process_notes_image(request, assessment_pk):
             return redirect('clinicians:dashboard')
         return redirect('health_records:dashboard')
     
-    # Get the full path to the image
-    image_path = assessment.practitioner_notes_image.path
+    # Queue the document for the OCR worker instead of blocking this request
+    job = enqueue_analysis(assessment, requested_by=request.user)
+    message = 'Notes image queued for processing. Findings will appear here shortly.'
     
-    # Process the document
-    try:
-        extracted_data = doc_service.analyze_document(image_path)
-        
-        if not extracted_data:
-            error_msg = 'Failed to extract data from the notes image.'
-            messages.error(request, error_msg)
-            
-            # If AJAX request, return JSON
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                from django.http import JsonResponse
-                return JsonResponse({
-                    'success': False,
-                    'error': error_msg
-                }, status=400)
-            
-            if is_clinician:
-                return redirect('clinicians:dashboard')
-            return redirect('health_records:dashboard')
-        
-        # Delete existing extracted findings for this assessment
-        ExtractedFindings.objects.filter(assessment=assessment).delete()
-        
-        # Create ExtractedFindings records
-        findings_created = 0
-        for finding_data in extracted_data.get('findings', []):
-            finding = ExtractedFindings.objects.create(
-                assessment=assessment,
-                category=finding_data.get('category', 'general'),
-                finding_type=finding_data.get('type', 'observation'),
-                text=finding_data.get('text', ''),
-                raw_extraction_data=extracted_data,
-            )
-            findings_created += 1
-        
-        messages.success(
-            request,
-            f'Successfully extracted {findings_created} findings from the notes image!'
-        )
-        
-        # If AJAX request, return JSON
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            from django.http import JsonResponse
-            return JsonResponse({
-                'success': True,
-                'findings_count': findings_created,
-                'message': f'Successfully extracted {findings_created} findings from the notes image!'
-            })
-        
-        # Redirect to view findings
-        return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
-        
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        error_msg = str(e)
-        logger.error(f"Error processing notes image: {error_msg}")
-        logger.exception("Full traceback:")
-        error_message = f'Error processing image: {error_msg}. Please check the image format (JPEG, PNG, PDF supported) and try again.'
-        messages.error(request, error_message)
-        
-        # If AJAX request, return JSON
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            from django.http import JsonResponse
-            return JsonResponse({
-                'success': False,
-                'error': error_message
-            }, status=500)
-        
-        if is_clinician:
-            return redirect('clinicians:dashboard')
-        return redirect('health_records:dashboard')
+    # If AJAX request, return JSON so the page can poll the job status
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        from django.http import JsonResponse
+        return JsonResponse({
+            'success': True,
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('health_records:analysis_job_status', args=[job.pk]),
+            'message': message,
+        }, status=202)
+    
+    messages.info(request, message)
+    return redirect('health_records:view_extracted_findings', assessment_pk=assessment.pk)
 
 
 @login_required
@@ -1115,21 +1093,21 @@ def view_extracted_findings(request, assessment_pk):
     is_clinician = False
     clinician = None
     
-    if hasattr(request.user, 'clinician_profile'):
-        clinician = request.user.clinician_profile
-        has_access = PatientClinicianAccess.objects.filter(
-            patient=assessment.user,
-            clinician=clinician,
-            is_active=True
-        ).exists()
-        is_clinician = has_access
+    if request.role.is_clinician:
+        clinician = request.role.clinician
+        is_clinician = has_patient_access(request, assessment.user_id)
     
     if not (is_owner or is_clinician):
         messages.error(request, 'You do not have permission to view this assessment.')
         return redirect('health_records:dashboard')
     
     # Get extracted findings grouped by category
-    findings = ExtractedFindings.objects.filter(assessment=assessment).order_by('category', 'extracted_at')
+    findings = (
+        ExtractedFindings.objects
+        .filter(assessment=assessment)
+        .select_related('verified_by')
+        .order_by('category', 'extracted_at')
+    )
     
     # Group findings by category
     findings_by_category = {}
@@ -1146,6 +1124,7 @@ def view_extracted_findings(request, assessment_pk):
         'is_clinician': is_clinician,
         'clinician': clinician,
         'has_image': bool(assessment.practitioner_notes_image),
+        'analysis_job': assessment.analysis_jobs.order_by('-created_at').first(),
     }
     
     return render(request, 'health_records/extracted_findings.html', context)
@@ -1161,20 +1140,20 @@ def get_extracted_findings_json(request, assessment_pk):
     is_owner = assessment.user == request.user
     is_clinician = False
     
-    if hasattr(request.user, 'clinician_profile'):
-        clinician = request.user.clinician_profile
-        has_access = PatientClinicianAccess.objects.filter(
-            patient=assessment.user,
-            clinician=clinician,
-            is_active=True
-        ).exists()
-        is_clinician = has_access
+    if request.role.is_clinician:
+        clinician = request.role.clinician
+        is_clinician = has_patient_access(request, assessment.user_id)
     
     if not (is_owner or is_clinician):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
     # Get extracted findings grouped by category
-    findings = ExtractedFindings.objects.filter(assessment=assessment).order_by('category', 'extracted_at')
+    findings = (
+        ExtractedFindings.objects
+        .filter(assessment=assessment)
+        .select_related('verified_by')
+        .order_by('category', 'extracted_at')
+    )
     
     # Group findings by category
     findings_by_category = {}
@@ -1197,7 +1176,7 @@ def get_extracted_findings_json(request, assessment_pk):
         'assessment_date': assessment.assessment_date.strftime('%B %d, %Y') if assessment.assessment_date else 'N/A',
         'has_image': bool(assessment.practitioner_notes_image),
         'image_url': assessment.practitioner_notes_image.url if assessment.practitioner_notes_image else None,
-        'findings_count': findings.count(),
+        'findings_count': len(findings),
         'findings_by_category': findings_by_category,
         'is_clinician': is_clinician,
     })
@@ -1209,20 +1188,14 @@ def verify_finding(request, finding_pk):
     finding = get_object_or_404(ExtractedFindings, pk=finding_pk)
     
     # Only clinicians can verify findings
-    if not hasattr(request.user, 'clinician_profile'):
+    if not request.role.is_clinician:
         messages.error(request, 'Only clinicians can verify findings.')
         return redirect('health_records:view_extracted_findings', assessment_pk=finding.assessment.pk)
     
-    clinician = request.user.clinician_profile
+    clinician = request.role.clinician
     
     # Check if clinician has access to this patient
-    has_access = PatientClinicianAccess.objects.filter(
-        patient=finding.assessment.user,
-        clinician=clinician,
-        is_active=True
-    ).exists()
-    
-    if not has_access:
+    if not has_patient_access(request, finding.assessment.user_id):
         messages.error(request, 'You do not have access to this patient\'s records.')
         return redirect('health_records:dashboard')
     
@@ -1255,14 +1228,9 @@ def delete_finding(request, finding_pk):
     is_owner = assessment.user == request.user
     is_clinician = False
     
-    if hasattr(request.user, 'clinician_profile'):
-        clinician = request.user.clinician_profile
-        has_access = PatientClinicianAccess.objects.filter(
-            patient=assessment.user,
-            clinician=clinician,
-            is_active=True
-        ).exists()
-        is_clinician = has_access
+    if request.role.is_clinician:
+        clinician = request.role.clinician
+        is_clinician = has_patient_access(request, assessment.user_id)
     
     if not (is_owner or is_clinician):
         messages.error(request, 'You do not have permission to delete this finding.')
@@ -1277,3 +1245,32 @@ def delete_finding(request, finding_pk):
         'item': finding,
         'item_type': 'finding'
     })
+
+
+@login_required
+def analysis_job_status(request, job_pk):
+    """Get the status of a queued document analysis job as JSON for polling"""
+    from django.http import JsonResponse
+    job = get_object_or_404(DocumentAnalysisJob.objects.select_related('assessment'), pk=job_pk)
+    assessment = job.assessment
+    
+    # Check permissions
+    is_owner = assessment.user == request.user
+    is_clinician = False
+    
+    if request.role.is_clinician:
+        clinician = request.role.clinician
+        is_clinician = has_patient_access(request, assessment.user_id)
+    
+    if not (is_owner or is_clinician):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    return JsonResponse({
+        'job_id': job.pk,
+        'assessment_id': assessment.pk,
+        'status': job.status,
+        'is_finished': job.is_finished,
+        'findings_count': job.findings_count,
+        'error': job.error or None,
+        'findings_url': reverse('health_records:view_extracted_findings', args=[assessment.pk]),
+    })
@@ -0,0 +1,320 @@
+"""
+Keyset (seek) pagination over a queryset's ordering.
+
+A page after the first is read by filtering on the ordering key of the last
+row already shown, not with OFFSET, so every page costs one indexed range
+read however deep it is, and rows added or removed meanwhile never shift a
+page or repeat a row.
+
+The ordering is the queryset's own order_by(), or else the model's
+Meta.ordering, with the primary key appended so every row has a distinct
+key. NULLs are treated as the smallest value of their column (first when
+ascending, last when descending, as SQLite and MySQL already sort them) on
+every database, so the seek filter and the ORDER BY always agree.
+
+A cursor is an opaque URL-safe string holding the key of the last row of a
+page; it stays valid however the rows around it change.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from typing import List, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Field, Q, QuerySet
+from django.utils.functional import cached_property
+
+# Rows per page when a view does not choose
+DEFAULT_PAGE_SIZE = 25
+
+# JSON tags for the key values that JSON has no type for
+_ENCODERS = [
+    (bool, 'b', lambda value: value),
+    (datetime, 'dt', lambda value: value.isoformat()),
+    (date, 'd', lambda value: value.isoformat()),
+    (time, 't', lambda value: value.isoformat()),
+    (Decimal, 'n', str),
+    (UUID, 'u', str),
+    (int, 'i', lambda value: value),
+    (float, 'f', lambda value: value),
+    (str, 's', lambda value: value),
+]
+_DECODERS = {
+    'b': bool,
+    'dt': datetime.fromisoformat,
+    'd': date.fromisoformat,
+    't': time.fromisoformat,
+    'n': Decimal,
+    'u': UUID,
+    'i': int,
+    'f': float,
+    's': str,
+}
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not issued by encode_cursor()"""
+
+
+class SortKey(NamedTuple):
+    """One column of a page's ordering"""
+    path: str  # Field name, lookup path (e.g. 'patient__last_name') or annotation
+    descending: bool
+    nullable: bool
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque cursor holding a row's key values"""
+    encoded = []
+    for value in values:
+        if value is None:
+            encoded.append(None)
+            continue
+        for value_type, tag, encode in _ENCODERS:
+            if isinstance(value, value_type):
+                encoded.append([tag, encode(value)])
+                break
+        else:
+            raise TypeError(f"Cannot put a {type(value).__name__} in a cursor")
+    raw = json.dumps(encoded, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, length: Optional[int] = None) -> List:
+    """
+    The key values in a cursor from encode_cursor().
+
+    Raises:
+        InvalidCursor: If the cursor is malformed, or does not hold `length` values
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        encoded = json.loads(raw)
+        if not isinstance(encoded, list) or (length is not None and len(encoded) != length):
+            raise ValueError("Wrong number of key values")
+        return [None if value is None else _DECODERS[value[0]](value[1]) for value in encoded]
+    except (binascii.Error, UnicodeDecodeError, KeyError, IndexError, TypeError, ValueError, ArithmeticError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def _path_fields(queryset: QuerySet, path: str) -> Optional[List[Field]]:
+    """The fields a lookup path passes through, or None if it names an annotation"""
+    model = queryset.model
+    fields = []
+    try:
+        for part in path.split('__'):
+            if fields:
+                model = fields[-1].related_model
+            fields.append(model._meta.pk if part == 'pk' else model._meta.get_field(part))
+    except (FieldDoesNotExist, AttributeError):
+        return None
+    return fields
+
+
+def _is_nullable(queryset: QuerySet, path: str) -> bool:
+    """Whether the column at path can be NULL, including through a nullable relation"""
+    fields = _path_fields(queryset, path)
+    # An annotation; only its expression knows, so allow for NULLs
+    return fields is None or any(field.null for field in fields)
+
+
+def _cursor_values(queryset: QuerySet, keys: Sequence[SortKey], cursor: str) -> List:
+    """
+    The key values in a cursor, converted to the types of their columns.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed, or a value does not fit its column
+    """
+    values = decode_cursor(cursor, len(keys))
+    for index, (key, value) in enumerate(zip(keys, values)):
+        fields = _path_fields(queryset, key.path)
+        if value is None or fields is None:
+            continue
+        try:
+            values[index] = fields[-1].to_python(value)
+        except (ValidationError, ValueError, TypeError, ArithmeticError) as e:
+            raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    return values
+
+
+def sort_keys(queryset: QuerySet, ordering: Optional[Sequence[str]] = None) -> List[SortKey]:
+    """
+    The ordering a page of queryset is read in.
+
+    Args:
+        queryset: The rows to page through
+        ordering: Field names, '-' prefixed for descending; defaults to the
+            queryset's order_by(), then the model's Meta.ordering
+
+    Raises:
+        ValueError: If the ordering is not made of field names
+    """
+    query = queryset.query
+    if ordering is None:
+        ordering = query.order_by or (queryset.model._meta.ordering if query.default_ordering else ())
+
+    pk_name = queryset.model._meta.pk.name
+    keys = []
+    for field in ordering:
+        if not isinstance(field, str) or field == '?' or '.' in field:
+            raise ValueError(f"Keyset pagination needs field names to order by, not {field!r}")
+        descending = field.startswith('-')
+        path = field.lstrip('-+')
+        keys.append(SortKey(path, descending, _is_nullable(queryset, path)))
+        if path in ('pk', pk_name):
+            # Already unique; later columns can never break a tie
+            return keys
+    keys.append(SortKey('pk', keys[-1].descending if keys else False, False))
+    return keys
+
+
+def _order_by(key: SortKey):
+    if not key.nullable:
+        return F(key.path).desc() if key.descending else F(key.path).asc()
+    if key.descending:
+        return F(key.path).desc(nulls_last=True)
+    return F(key.path).asc(nulls_first=True)
+
+
+def _beyond(key: SortKey, value) -> Optional[Q]:
+    """Rows strictly after value in this column's order, or None if there are none"""
+    if value is None:
+        # NULL is the smallest value: nothing follows it descending, everything else ascending
+        return None if key.descending else Q(**{f'{key.path}__isnull': False})
+    if not key.descending:
+        return Q(**{f'{key.path}__gt': value})
+    beyond = Q(**{f'{key.path}__lt': value})
+    if key.nullable:
+        beyond |= Q(**{f'{key.path}__isnull': True})
+    return beyond
+
+
+def _after(keys: Sequence[SortKey], values: Sequence) -> Q:
+    """Rows whose key comes after values, compared column by column"""
+    clauses = []
+    same = Q()
+    for key, value in zip(keys, values):
+        beyond = _beyond(key, value)
+        if beyond is not None:
+            clauses.append(same & beyond)
+        same &= Q(**{f'{key.path}__isnull': True}) if value is None else Q(**{key.path: value})
+    return reduce(or_, clauses) if clauses else Q(pk__in=[])
+
+
+def _key_value(row, path: str):
+    if isinstance(row, dict):
+        return row[path]
+    value = row
+    for part in path.split('__'):
+        value = getattr(value, part)
+        if value is None:
+            return None
+    return value
+
+
+class KeysetPage:
+    """
+    One page of rows, plus the cursor that continues after it.
+
+    Iterates, indexes and has a length like the list of rows, so templates
+    that looped over a queryset can loop over a page. `count` is the number
+    of rows on all pages, counted the first time it is read.
+    """
+
+    def __init__(self, object_list: list, queryset: QuerySet, cursor: Optional[str],
+                 next_cursor: Optional[str], param: str = 'cursor'):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.param = param
+        self.next_querystring = ''
+        self.first_querystring = ''
+        self._queryset = queryset
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self) -> bool:
+        return self.cursor is None
+
+    @cached_property
+    def count(self) -> int:
+        return self._queryset.count()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} {self._queryset.model.__name__} rows>"
+
+
+def paginate(queryset: QuerySet, cursor: Optional[str] = None, per_page: int = DEFAULT_PAGE_SIZE,
+             ordering: Optional[Sequence[str]] = None) -> KeysetPage:
+    """
+    Read one page of queryset.
+
+    Args:
+        queryset: The rows to page through; any filtering, select_related()
+            and annotations are kept
+        cursor: The next_cursor of the previous page, or None for the first page
+        per_page: Rows per page
+        ordering: Overrides the queryset's ordering (see sort_keys())
+
+    Returns:
+        KeysetPage of at most per_page rows
+
+    Raises:
+        InvalidCursor: If cursor was not issued for this ordering, or holds
+            values of the wrong type for its columns
+    """
+    keys = sort_keys(queryset, ordering)
+    rows = queryset.order_by(*[_order_by(key) for key in keys])
+    if cursor:
+        rows = rows.filter(_after(keys, _cursor_values(queryset, keys, cursor)))
+
+    # One row more than the page tells whether another page follows
+    object_list = list(rows[:per_page + 1])
+    next_cursor = None
+    if len(object_list) > per_page:
+        object_list = object_list[:per_page]
+        next_cursor = encode_cursor([_key_value(object_list[-1], key.path) for key in keys])
+    return KeysetPage(object_list, queryset, cursor, next_cursor)
+
+
+def paginate_request(request, queryset: QuerySet, param: str = 'cursor', per_page: int = DEFAULT_PAGE_SIZE,
+                     ordering: Optional[Sequence[str]] = None) -> KeysetPage:
+    """
+    The page of queryset named by the request's `param` query parameter.
+
+    A missing, stale or tampered cursor shows the first page. The page's
+    next_querystring and first_querystring keep the request's other query
+    parameters, so several lists on one page are paged independently.
+    """
+    cursor = request.GET.get(param) or None
+    try:
+        page = paginate(queryset, cursor, per_page, ordering)
+    except InvalidCursor:
+        page = paginate(queryset, None, per_page, ordering)
+    page.param = param
+
+    query = request.GET.copy()
+    query.pop(param, None)
+    page.first_querystring = query.urlencode()
+    if page.next_cursor:
+        query[param] = page.next_cursor
+        page.next_querystring = query.urlencode()
+    return page
+
@@ -77,6 +77,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleMiddleware',  # request.role; must be after AuthenticationMiddleware
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -84,9 +85,23 @@ MIDDLEWARE = [
     'accounts.middleware.SecurityHeadersMiddleware',
 ]
 
-# Enable rate limiting middleware if enabled
+# Enable rate limiting middleware if enabled (after authentication, so signed-in users can be limited per user)
 if RATE_LIMIT_ENABLED:
-    MIDDLEWARE.insert(1, 'accounts.middleware.RateLimitMiddleware')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'accounts.middleware.RateLimitMiddleware'
+    )
+
+# Per-route limits: path prefix -> 'limit' (max requests, window seconds) per IP
+# address, and optionally 'user_limit' counted per signed-in user instead
+RATE_LIMITS = {
+    '/accounts/login/': {'limit': (5, 300)},  # 5 attempts per 5 minutes
+    '/clinicians/send-practitioner-code/': {'limit': (10, 3600), 'user_limit': (10, 3600)},  # 10 emails per hour
+}
+
+# Where rate limit counters are kept: 'database' (shared by all workers, no extra
+# services) or 'cache' (only use with a shared cache such as Redis or Memcached)
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'database')
 
 ROOT_URLCONF = 'sharemycare.urls'
 
@@ -131,6 +146,12 @@ except ImportError:
         }
     }
 
+# SQLite's default in-memory test database raises "table is locked" instead of
+# waiting when tests use several connections at once (concurrency tests), so
+# test against a temporary file instead
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -215,6 +236,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT = os.environ.get('AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT', '')
 AZURE_DOCUMENT_INTELLIGENCE_KEY = os.environ.get('AZURE_DOCUMENT_INTELLIGENCE_KEY', '')
 
+# OCR backend: 'azure' calls the service above, 'local' returns recorded results
+# from health_records/ocr_fixtures for offline testing and benchmarking
+DOCUMENT_INTELLIGENCE_BACKEND = os.environ.get('DOCUMENT_INTELLIGENCE_BACKEND', 'azure')
+DOCUMENT_INTELLIGENCE_LOCAL_LATENCY = float(os.environ.get('DOCUMENT_INTELLIGENCE_LOCAL_LATENCY', '0'))  # Simulated seconds per document
+
+# Analysis results are cached by file content hash so re-processing a document
+# doesn't call the OCR service again. Least recently used entries are evicted
+# beyond this limit; set to 0 to disable the cache.
+DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('DOCUMENT_ANALYSIS_CACHE_MAX_ENTRIES', '1000'))
+
+# SECURITY WARNING: keep the practitioner code key used in production secret!
+# It selects the permutation practitioner codes are allocated from
+# (clinicians.code_allocator), so anyone who knows it can list issued codes in
+# order. Never change it once codes are issued. The fallback is for development
+# only; `manage.py check --deploy` fails while it is in use.
+PRACTITIONER_CODE_KEY = os.environ.get('PRACTITIONER_CODE_KEY', 'insecure-development-practitioner-codes')
+
+# Grants and invitations past their expires_at are deactivated by
+# `manage.py sweep_expired_access` (the Procfile's sweeper process). Setting
+# this runs the sweep this often on a background thread in each web process
+# as well, for single-process deployments; off by default
+ACCESS_EXPIRY_SWEEP_INTERVAL = float(os.environ.get('ACCESS_EXPIRY_SWEEP_INTERVAL', '0'))  # Seconds
+
 # ============================================
 # SECURITY SETTINGS
 # ============================================
@@ -243,10 +287,57 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 # Session Security
 SESSION_COOKIE_AGE = 86400  # 24 hours in seconds
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
-SESSION_SAVE_EVERY_REQUEST = True  # Reset session expiry on each request
+# Sessions are stored in the database and their expiry is refreshed once
+# SESSION_REFRESH_FRACTION of SESSION_COOKIE_AGE has passed (about every 15
+# minutes), rather than writing the session on every request. They are not
+# cached: a per-host cache would keep logged-out sessions alive on other hosts.
+SESSION_ENGINE = 'accounts.session_store'
+SESSION_REFRESH_FRACTION = float(os.environ.get('SESSION_REFRESH_FRACTION', '0.01'))
+SESSION_SAVE_EVERY_REQUEST = False  # accounts.session_store refreshes expiry itself
 
 # Content Security Policy (CSP) - helps prevent XSS attacks
 # Note: This is a basic CSP. Adjust based on your needs.
+CONTENT_SECURITY_POLICY = {
+    'default-src': "'self'",
+    'script-src': "'self' 'unsafe-inline' 'unsafe-eval'",  # unsafe-inline/eval needed for Django admin
+    'style-src': "'self' 'unsafe-inline' https://fonts.googleapis.com",
+    'font-src': "'self' https://fonts.gstatic.com",
+    'img-src': "'self' data: blob:",
+    'connect-src': "'self'",
+    'frame-ancestors': "'none'",
+}
+
+# Stricter policy for pages showing medical records (no eval, forms only post back to the site)
+MEDICAL_RECORD_CONTENT_SECURITY_POLICY = {
+    **CONTENT_SECURITY_POLICY,
+    'script-src': "'self' 'unsafe-inline'",
+    'object-src': "'none'",
+    'base-uri': "'self'",
+    'form-action': "'self'",
+}
+
+# Headers added to every response by accounts.middleware.SecurityHeadersMiddleware.
+# Values are strings, or for Content-Security-Policy a dict of directives.
+SECURITY_HEADERS = {
+    'Content-Security-Policy': CONTENT_SECURITY_POLICY,
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+    'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
+}
+
+# Per-route overrides of SECURITY_HEADERS: path prefix -> headers to replace
+# (None removes the header). The most specific prefix wins.
+SECURITY_HEADER_ROUTES = {
+    # Static assets are cached and never rendered as documents
+    '/' + STATIC_URL.lstrip('/'): {'Content-Security-Policy': None, 'Permissions-Policy': None},
+    '/passport/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/emergency-card/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/assessments/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/findings/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/clinicians/clients/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/clinicians/patient/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+    '/clinicians/objective-measures/': {'Content-Security-Policy': MEDICAL_RECORD_CONTENT_SECURITY_POLICY},
+}
+
 SECURE_CONTENT_TYPE_NOSNIFF = True  # Prevent MIME type sniffing
 SECURE_BROWSER_XSS_FILTER = True  # Enable browser's XSS filter
 X_FRAME_OPTIONS = 'DENY'  # Prevent clickjacking
@@ -268,6 +359,13 @@ ALLOWED_IMAGE_MIME_TYPES = [
 # Maximum file size for image uploads (50MB)
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Uploaded photos are downscaled to this longest edge (enough for OCR of a
+# full page), re-encoded as JPEG without EXIF metadata, and given a thumbnail
+UPLOAD_IMAGE_MAX_DIMENSION = int(os.environ.get('UPLOAD_IMAGE_MAX_DIMENSION', '3000'))
+UPLOAD_IMAGE_QUALITY = 85
+UPLOAD_THUMBNAIL_SIZE = 600
+UPLOAD_THUMBNAIL_QUALITY = 75
+
 # Password Security
 AUTH_PASSWORD_VALIDATORS = [
     {
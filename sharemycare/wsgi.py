@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sharemycare.settings')
 
 application = get_wsgi_application()
+
+# Deactivate expired access grants in the background if ACCESS_EXPIRY_SWEEP_INTERVAL is set (see clinicians.expiry)
+from clinicians.expiry import start_expiry_sweeper  # noqa: E402
+
+start_expiry_sweeper()